@@ -1,9 +1,30 @@
 import streamlit as st
 import pandas as pd
-from ortools.sat.python import cp_model
-import io
 import datetime
+import io
 import math
+import re
+import time
+import uuid
+
+import numpy as np
+
+from scheduler import build_result_frame, normalize_spec
+from scheduler.engine import FAIL_MESSAGE, FAMILY_LABELS, PENALTY_FAMILIES, hint_from_frame, matrix_to_hint
+from scheduler.audit import render_html
+from scheduler.precheck import precheck
+from scheduler.profiles import SOLVER_PROFILES
+from scheduler.engine import get_date_tuple
+from scheduler.audit import schedule_array
+from scheduler.horizon import windows
+from scheduler.repair import repair
+from scheduler.scenarios import run_scenarios
+from scheduler.jobs import ACTIVE, JobQueue
+from scheduler.runlog import PHASE_LABELS, append as append_run_log, phase_record, run_record
+from scheduler.export import to_xlsx_bytes, workbook_bytes
+from scheduler.importer import read_tables, validate
+from scheduler.history import DEFAULT_STORE, ScheduleHistory
+from scheduler.coverage import WEEKDAYS
 
 # --- 0. 页面配置 ---
 st.set_page_config(page_title="AI智能排班系统 V19.0 [DAIXUAN]", layout="wide", page_icon="💎")
@@ -12,6 +33,22 @@ if 'result_df' not in st.session_state:
     st.session_state.result_df = None
 if 'audit_report' not in st.session_state:
     st.session_state.audit_report = []
+if 'last_hint' not in st.session_state:
+    st.session_state.last_hint = None
+if 'solve_job' not in st.session_state:
+    st.session_state.solve_job = None
+if 'scenario_rows' not in st.session_state:
+    st.session_state.scenario_rows = None
+if 'alternatives' not in st.session_state:
+    st.session_state.alternatives = None
+if 'owner' not in st.session_state:
+    st.session_state.owner = uuid.uuid4().hex  # 任务队列按提交人轮流调度
+if 'run_stats' not in st.session_state:
+    st.session_state.run_stats = None
+if 'result_src' not in st.session_state:
+    st.session_state.result_src = None  # (ns, 结果矩阵)：导出 Excel 直接从这里写，不经过结果表
+if 'scenario_sheets' not in st.session_state:
+    st.session_state.scenario_sheets = None
 
 st.markdown("""
     <style>
@@ -97,21 +134,20 @@ st.markdown("""
 
 st.title("💎 AI智能排班系统 V19.0 [DAIXUAN]")
 
-# --- 工具函数 ---
-def get_date_tuple(start_date, end_date):
-    delta = end_date - start_date
-    week_map = {0: "周一", 1: "周二", 2: "周三", 3: "周四", 4: "周五", 5: "周六", 6: "周日"}
-    return [( (start_date + datetime.timedelta(days=i)).strftime('%m-%d'), 
-              week_map[(start_date + datetime.timedelta(days=i)).weekday()] ) 
-            for i in range(delta.days + 1)]
-
 # --- 1. 侧边栏 ---
+@st.cache_resource
+def get_history():
+    # 全局共享的已发布排班历史 (本地 SQLite)，跨期公平从这里取累计量
+    return ScheduleHistory()
+
 with st.sidebar:
     st.markdown('<div class="css-card"><div class="card-title">📂 基础档案</div>', unsafe_allow_html=True)
     default_employees = "张三\n李四\n王五\n赵六\n钱七\n孙八\n周九\n吴十\n郑十一\n王十二"
     emp_input = st.text_area("员工名单 (Excel直接粘贴)", default_employees, height=150, 
                              help="直接粘贴一列名字，系统会自动识别。")
     employees = [e.strip() for e in emp_input.replace('\n', ',').replace('，', ',').split(",") if e.strip()]
+    import_files = st.file_uploader("📥 批量导入 (Excel/CSV)", type=["xlsx", "csv"], accept_multiple_files=True,
+                                    help="员工表 (姓名 + 个人需求列)、技能表 (姓名 + 各班次一列，能上填 1)、活动表 (活动名称 / 日期 / 指定班次 / 所需人数)、时段需求表 (日期 / 时段 / 人数，或 日期 + 每个时段一列)。有员工表时替换上面的名单和下方的需求表格。")
     
     shifts_input = st.text_input("班次定义 (须含'休')", "早班, 中班, 晚班, 休", help="用逗号分隔，必须包含'休'字")
     shifts = [s.strip() for s in shifts_input.split(",")]
@@ -119,6 +155,13 @@ with st.sidebar:
         off_shift_name = next(s for s in shifts if "休" in s)
     except: st.error("❌ 班次中必须包含'休'字！"); st.stop()
     shift_work = [s for s in shifts if s != off_shift_name] 
+    with st.expander("⏱️ 班次时间 (按时段排班用)"):
+        times_input = st.text_area("每行一个班次：名称 起止时间", "", height=100, placeholder="早班 08:00-16:00\n晚班 16:00-24:00\n通宵 22:00-06:00",
+                                   help="给了班次时间后，可以在「时段需求」里按时段填在岗人数；结束早于开始表示跨午夜。")
+        shift_times = dict(line.split(None, 1) for line in times_input.splitlines() if len(line.split(None, 1)) == 2)
+        slot_minutes = st.selectbox("时段粒度 (分钟)", [15, 30, 60], index=1)
+        demand_enables_zero = st.checkbox("时段需求可启用基线为 0 的班次", value=False,
+                                          help="默认基线为 0 的班次照常禁排，不算时段覆盖；勾选后由时段需求决定这些班次排多少人。")
     
     st.markdown("---")
     # 小问号回归
@@ -127,6 +170,12 @@ with st.sidebar:
         c1, c2 = st.columns(2)
         with c1: night_shift = st.selectbox("晚班", shift_work, index=len(shift_work)-1, help="选择哪个是晚班")
         with c2: day_shift = st.selectbox("早班", shift_work, index=0, help="选择哪个是早班")
+    refuse_hard = st.toggle("⛔ 拒绝班次按硬性处理", value=False, help="开启后「拒绝班次(强)」等同于不可排：这些格子直接不排，而不是罚 20000 分。")
+    store_name = st.text_input("门店", DEFAULT_STORE, help="排班历史按门店分开保存。").strip() or DEFAULT_STORE
+    cross_period = st.toggle("📚 跨期公平", value=True, help="参考本店已发布的历史排班：以往晚班、周末上得多的人本期少排，上期末尾的连班接着算。结果满意后在结果区点「发布」记入历史。")
+    last_publish = get_history().publishes(store_name, limit=1)
+    if cross_period and last_publish:
+        st.caption(f"最近发布：{last_publish[0]['start_date']} → {last_publish[0]['end_date']} ({last_publish[0]['employees']} 人)")
     st.markdown('</div>', unsafe_allow_html=True)
 
 # --- 2. 顶部逻辑 ---
@@ -138,23 +187,21 @@ with col_logic_1:
         # 小问号回归
         with p1: diff_daily_threshold = st.number_input("每日人数允许差值", 0, 5, 0, help="例如设为0：每天的早班人数必须完全一样。")
         with p2: diff_period_threshold = st.number_input("员工工时允许差值", 0, 5, 2, help="例如设为2：张三和李四的总工时差距不能超过2天。")
+HARD_RULES = [("🔥", "活动/大促需求"), ("🚫", "0排班禁令"), ("🚫", "每日班次基准线 (平时)"), ("🚫", "周期内休息日安排")]
+FAMILY_NOTES = {
+    "baseline_flex": ("🧱", "有活动的日子基线让位给活动"), "daily_balance": ("⚖️", "强力抹平"),
+    "consecutive": ("🔄", "红线"), "coverage": ("⏱️", "每缺一人·一个时段"), "period_balance": ("⚖️", "强力平均"),
+    "req_off": ("⚖️", "会在硬约束下失效"), "fatigue": ("⚖️", "会在活动需求下失效"), "refuse": ("⚖️", ""),
+    "weekend_relief": ("🏖️", "跨期公平"), "reduce": ("⚖️", ""), "stability": ("📌", "热启动时尽量保留旧排班"),
+}
 with col_logic_2:
     with st.expander("📜 查看底层逻辑权重"):
-        st.markdown("""
-        1. 🔥 **活动/大促需求** (硬约束)
-        2. 🚫 **0排班禁令** (硬约束)
-        3. 🚫 **每日班次基准线** (硬约束)
-        4. 🚫 **周期内休息日安排** (硬约束)
-        3. ⚖️ **每日波动** (5,000,000) - *强力抹平*
-        5. 🔄 **最大连班** (2,000,000) - *红线*
-        6. 🧱 **每日基线** (1,000,000) - *保运营*
-        7. 🛌 **休息模式** (500,000) - *保休息*
-        7. ⚖️ **工时平衡** (100,000) - *强力平均*
-        8. ⚖️ **指定休息日** (50,000) - *会在硬约束下失效*
-        8. ⚖️ **禁止晚转早** (50,000) - *会在活动需求下失效*
-        8. ⚖️ **个人拒绝班次** (20,000) - 
-        8. ⚖️ **个人减少班次** (1000) - 
-        """)
+        # 软约束按 PENALTY_FAMILIES 的顺序和权重生成，改权重时这里自动跟着变
+        lines = [f"{icon} **{name}** (硬约束)" for icon, name in HARD_RULES]
+        for family, weight in PENALTY_FAMILIES:
+            icon, note = FAMILY_NOTES.get(family, ("⚖️", ""))
+            lines.append(f"{icon} **{FAMILY_LABELS.get(family, family)}** ({weight:,})" + (f" - *{note}*" if note else ""))
+        st.markdown("\n".join(f"{i}. {line}" for i, line in enumerate(lines, 1)))
 
 # --- 3. 主控制区 ---
 col_ctrl, col_data = st.columns([1, 1.2])
@@ -176,8 +223,63 @@ with col_ctrl:
     else: target_off_days = st.number_input(f"周期内应休几天?", min_value=0, value=1)
     
     max_consecutive = st.number_input("最大连班限制", 1, 14, 6, help="连续工作超过此天数将触发严重警告。")
+    with st.expander("⏱️ 求解档位与停止条件"):
+        profile_names = list(SOLVER_PROFILES) + ["auto"]
+        solver_profile = st.selectbox("求解档位", profile_names, index=profile_names.index("balanced"),
+                                      format_func=lambda p: SOLVER_PROFILES[p]["label"] if p in SOLVER_PROFILES else "🤖 按规模自动 (调优表)",
+                                      help="快速预览：几秒出个大概；均衡：日常使用；深度优化：大门店、长周期，用更多时间和更强的推理。")
+        profile_time = int(SOLVER_PROFILES.get(solver_profile, SOLVER_PROFILES["balanced"])["max_time_in_seconds"])
+        t1, t2, t3 = st.columns(3)
+        with t1: time_limit = st.number_input("时间上限(秒)", 1, 600, profile_time, key=f"time_limit_{solver_profile}", help="无论如何，到点即停，输出当前最优方案。")
+        with t2: gap_limit_pct = st.number_input("Gap 达标(%)", 0.0, 100.0, 0.0, step=0.5, help="当前方案与理论下界的差距小于该值就停止；0 表示不启用。")
+        with t3: no_improve_seconds = st.number_input("无改进即停(秒)", 0, 600, 0, help="连续这么多秒没有找到更优方案就停止；0 表示不启用。")
+        lexicographic = st.toggle("🪜 分层优化", value=False, help="按「底层逻辑权重」的优先级逐层求解：先把高优先级做到最好并锁定，再优化下一层。大门店更快收敛，严格遵守优先级。")
+        rolling = st.toggle("🧭 滚动排班", value=num_days > 21, key=f"rolling_{num_days > 21}", help="长周期 (月/季度) 拆成重叠的窗口逐段求解，连班、休息、工时公平跨窗口结转。时间上限按每个窗口计。")
+        if rolling:
+            w1, w2 = st.columns(2)
+            with w1: rolling_window = st.number_input("窗口天数", 7, 60, 14)
+            with w2: rolling_overlap = st.number_input("重叠天数", 0, 59, 7)
+            if rolling_overlap >= rolling_window: st.error("重叠天数必须小于窗口天数"); st.stop()
+        alt_k = st.number_input("🎲 备选方案数", 1, 5, 1, disabled=rolling, help="一次给出几套彼此明显不同的方案 (至少相差 5% 的格子)，在结果区直接切换，不用重新排班。时间上限按每套方案计。")
+        if rolling: alt_k = 1
     st.markdown('</div>', unsafe_allow_html=True)
 
+# 由输入推导出的数据按真正的依赖缓存，改别的控件引起的重跑直接复用
+@st.cache_data(show_spinner=False, max_entries=32)
+def date_options(start_date, end_date):
+    return [f"{d} {w}" for d, w in get_date_tuple(start_date, end_date)]
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def preference_frame(employees, off_shift_name):
+    n = len(employees)
+    return pd.DataFrame({
+        "姓名": list(employees), "上期末班": [off_shift_name]*n, "近期班次": [""]*n,
+        "指定休息日": [""]*n, "拒绝班次(强)": [""]*n, "减少班次(弱)": [""]*n, "不可排班次": [""]*n
+    })
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def activity_frame(first_shift, n):
+    return pd.DataFrame({"活动名称": ["大促预热", "双11爆发"], "日期": [None, None], "指定班次": [first_shift, first_shift], "所需人数": [n, n]})
+
+@st.cache_data(show_spinner=False)
+def demand_frame():
+    return pd.DataFrame({"日期": pd.Series(dtype=object), "开始": pd.Series(dtype=object), "结束": pd.Series(dtype=object),
+                         "人数": pd.Series(dtype="Int64")})
+
+# 批量导入：上传的文件只解析一次 (按内容缓存)，校验要用到班次和日期，每次重跑都做一遍 (整列校验，很快)
+@st.cache_data(show_spinner=False, max_entries=16)
+def read_upload(name, data):
+    return read_tables(io.BytesIO(data), name)
+
+imported = None
+if import_files:
+    tables = []
+    for f in import_files:
+        try: tables += read_upload(f.name, f.getvalue())
+        except Exception as e: st.error(f"❌ 无法读取 {f.name}：{e}")
+    imported = validate(tables, shifts, start_date, end_date)
+    if imported["employees"]: employees = imported["employees"]
+
 # 智能计算
 total_capacity = len(employees) * (num_days - target_off_days)
 daily_capacity = total_capacity / num_days
@@ -193,6 +295,7 @@ with col_data:
     m3, m4 = st.columns(2)
     m3.metric("日均运力", f"{daily_capacity:.1f} 人")
     m4.metric("建议单班基线", f"{suggested_min} 人", delta="推荐值")
+    precheck_box = st.empty()  # 输入都读完后再填：实时可行性预检
     st.markdown('</div>', unsafe_allow_html=True)
 
 # --- 4. 详细配置区 ---
@@ -209,35 +312,51 @@ with col_base:
     st.markdown('</div>', unsafe_allow_html=True)
     
     st.markdown("###")
+    warm_start = st.toggle("♻️ 热启动", value=True, help="以上次排班结果（或上传的旧排班表）为起点求解：小改动后更快出解，排班变动更少。")
+    prior_file = None
+    if warm_start:
+        prior_file = st.file_uploader("上传旧排班表 (可选)", type=["xlsx"], help="使用本系统导出的 Excel，优先于上次结果。")
     generate_btn = st.button("🚀 开始AI智能排班")
 
 with col_req:
     st.markdown('<div class="css-card">', unsafe_allow_html=True)
     st.markdown('<div class="card-title">1. 🙋‍♂️ 员工个性化需求</div>', unsafe_allow_html=True)
-    init_data = {
-        "姓名": employees, "上期末班": [off_shift_name]*len(employees),
-        "指定休息日": [""]*len(employees), "拒绝班次(强)": [""]*len(employees), "减少班次(弱)": [""]*len(employees)
-    }
-    edited_df = st.data_editor(
-        pd.DataFrame(init_data),
+    if imported and imported["employees"]:
+        # 导入的需求直接进 spec，不再经过表格控件 (上千人时表格本身就很慢)
+        edited_df = None
+        n_pref = sum(1 for p in imported["preferences"] if len(p) > 1)
+        n_avail = sum(1 for e in employees if e in imported["availability"])
+        st.success(f"已从文件导入 {len(employees)} 人，其中 {n_pref} 人有个人需求，{n_avail} 人限定了可排班次。清空上传即恢复手工填写。")
+        st.dataframe(pd.DataFrame(imported["preferences"][:200]), hide_index=True, use_container_width=True, height=240)
+    else: edited_df = st.data_editor(
+        preference_frame(tuple(employees), off_shift_name),
         column_config={
             "姓名": st.column_config.TextColumn(disabled=True),
             "上期末班": st.column_config.SelectboxColumn(options=shifts, help="用于衔接昨日班次"),
+            "近期班次": st.column_config.TextColumn(help="可选：上期最后几天的班次，旧→新，如 早班,早班,晚班。填写后优先于上期末班，用于跨期连班与晚转早判断"),
             "指定休息日": st.column_config.TextColumn(help="填数字如 1,3"),
             "拒绝班次(强)": st.column_config.SelectboxColumn(options=[""]+shift_work, help="权重 20000"),
-            "减少班次(弱)": st.column_config.SelectboxColumn(options=[""]+shift_work, help="权重 100")
+            "减少班次(弱)": st.column_config.SelectboxColumn(options=[""]+shift_work, help="权重 100"),
+            "不可排班次": st.column_config.TextColumn(help="硬性：技能不足或无法出勤的班次，逗号分隔，如 晚班。这些班次完全不给此人排")
         }, hide_index=True, use_container_width=True
     )
+    if imported:
+        kinds = {"employees": "员工表", "availability": "技能表", "activities": "活动表", "demand": "时段需求表", None: "未识别"}
+        st.caption("导入：" + "，".join(f"{t['sheet']} ({kinds[t['kind']]} {t['rows']} 行)" for t in imported["sheets"])
+                   + (f"，另有活动 {len(imported['activities'])} 条并入下方活动需求" if imported["activities"] else ""))
+        if imported["errors"]:
+            st.warning(f"⚠️ 导入时有 {len(imported['errors'])} 处问题，对应的单元格已清空 (活动表为整行忽略)：")
+            st.dataframe(pd.DataFrame(imported["errors"]).rename(columns={
+                "sheet": "工作表", "row": "行号", "column": "列", "value": "内容", "message": "原因"}),
+                hide_index=True, use_container_width=True, height=200)
     st.markdown('</div>', unsafe_allow_html=True)
 
     st.markdown('<div class="css-card">', unsafe_allow_html=True)
     st.markdown('<div class="card-title">2. 🔥 活动/大促需求</div>', unsafe_allow_html=True)
-    activity_data = {"活动名称": ["大促预热", "双11爆发"], "日期": [None, None], "指定班次": [shift_work[0], shift_work[0]], "所需人数": [len(employees), len(employees)]}
-    date_tuples = get_date_tuple(start_date, end_date)
-    date_headers_simple = [f"{d} {w}" for d, w in date_tuples]
+    date_headers_simple = date_options(start_date, end_date)
     
     edited_activity = st.data_editor(
-        pd.DataFrame(activity_data), num_rows="dynamic",
+        activity_frame(shift_work[0], len(employees)), num_rows="dynamic",
         column_config={
             "日期": st.column_config.SelectboxColumn(options=date_headers_simple),
             "指定班次": st.column_config.SelectboxColumn(options=shift_work),
@@ -246,369 +365,267 @@ with col_req:
     )
     st.markdown('</div>', unsafe_allow_html=True)
 
+    st.markdown('<div class="css-card">', unsafe_allow_html=True)
+    st.markdown('<div class="card-title">3. ⏱️ 时段需求 (可选)</div>', unsafe_allow_html=True)
+    if not shift_times: st.caption("先在侧边栏「班次时间」里写上各班次的起止时间，才能按时段核算在岗人数。")
+    edited_demand = st.data_editor(
+        demand_frame(), num_rows="dynamic",
+        column_config={
+            "日期": st.column_config.SelectboxColumn(options=["每天"] + list(WEEKDAYS) + date_headers_simple, help="每天 / 周X / 具体日期"),
+            "开始": st.column_config.TextColumn(help="如 10:00"),
+            "结束": st.column_config.TextColumn(help="如 14:00，早于开始表示跨午夜"),
+            "人数": st.column_config.NumberColumn(min_value=0, help="这段时间里至少要有几人在岗")
+        }, use_container_width=True, key="demand_editor"
+    )
+    if imported and imported["demand"]: st.caption(f"另有导入的时段需求 {len(imported['demand'])} 条")
+    st.markdown('</div>', unsafe_allow_html=True)
+
 # --- 5. 核心算法 ---
-def solve_schedule_v19():
-    model = cp_model.CpModel()
-    shift_vars = {}
-    s_map = {s: i for i, s in enumerate(shifts)}
-    off_idx = s_map[off_shift_name]
-    penalties = []
-    
-    # === 权重体系 ===
-    W_ACTIVITY = 10000000
-    W_DAILY_BALANCE = 5000000 
-    W_CONSECUTIVE = 2000000
-    W_BASELINE = 1000000
-    W_REST_STRICT = 500000
-    W_PERIOD_BALANCE = 100000
-    W_FATIGUE = 50000
-    W_REFUSE = 20000
-
-    # 1. 变量
-    for e in range(len(employees)):
-        for d in range(num_days):
-            for s in range(len(shifts)):
-                shift_vars[(e, d, s)] = model.NewBoolVar(f's_{e}_{d}_{s}')
-                
-    # --- 0. 预处理：找出哪些天有活动 (为了实现基线智能让路) ---
-    # 只要这天有活动需求，就标记为“战时状态”
-    activity_day_indices = set()
-    for idx, row in edited_activity.iterrows():
-        if row["日期"] and row["指定班次"]:
-            try:
-                # 找到这天在日期列表里的索引 (0, 1, 2...)
-                d_idx = date_headers_simple.index(row["日期"])
-                activity_day_indices.add(d_idx)
-            except: pass
+@st.cache_data(show_spinner=False, max_entries=16)
+def history_targets(spec, version):
+    # version 为最近一次发布的时间，有新发布才重新取累计量
+    try:
+        return get_history().carry_over(spec)
+    except ValueError:
+        return {}
+
+def build_spec():
+    """把当前页面输入收拢成引擎使用的 spec。"""
+    spec = {
+        "store": store_name, "employees": employees, "shifts": shifts,
+        "start_date": start_date, "end_date": end_date,
+        "target_off_days": target_off_days, "max_consecutive": max_consecutive,
+        "min_staff_per_shift": min_staff_per_shift,
+        "diff_daily_threshold": diff_daily_threshold, "diff_period_threshold": diff_period_threshold,
+        "no_night_to_day": enable_no_night_to_day,
+        "night_shift": night_shift if enable_no_night_to_day else None,
+        "day_shift": day_shift if enable_no_night_to_day else None,
+        "preferences": imported["preferences"] if edited_df is None else edited_df.to_dict("records"),
+        "availability": imported["availability"] if imported else {},
+        "refuse_hard": refuse_hard,
+        "activities": edited_activity.to_dict("records") + (imported["activities"] if imported else []),
+        "shift_times": shift_times, "slot_minutes": slot_minutes, "demand_enables_zero": demand_enables_zero,
+        "demand": edited_demand.to_dict("records") + (imported["demand"] if imported else []),
+    }
+    if cross_period and last_publish: spec.update(history_targets(spec, last_publish[0]["published"]))
+    return spec
+
+@st.cache_resource
+def get_job_queue():
+    # 全局共享：所有会话的排班都进同一个队列，子进程求解，并发数有上限
+    return JobQueue()
+
+def job_view(job_id):
+    """页面上跟踪一个任务所需的信息；任务不存在 (已被清理) 时返回 None。"""
+    rec = get_job_queue().get(job_id)
+    if rec is None: return None
+    opts = rec["options"]
+    n_win = len(windows(normalize_spec(rec["spec"])["num_days"], opts["window"], opts.get("overlap", 7))) if rec["mode"] == "rolling" else None
+    return {"id": job_id, "budget": opts["time_limit"] * (n_win or 1) * opts.get("k", 1), "windows": n_win}
+
+def start_solve_job():
+    """把求解提交到后台任务队列 (独立子进程)，页面每次重跑只读取进度；任务号写进网址，刷新页面后照样取回结果。"""
+    spec = build_spec()
+    try:
+        normalize_spec(spec)
+    except ValueError as exc:
+        st.error(f"❌ {exc}")
+        return None
+    hint = None
+    if warm_start:
+        hint = hint_from_frame(pd.read_excel(prior_file)) if prior_file is not None else st.session_state.last_hint
+    kw = dict(time_limit=time_limit, hint=hint, profile=solver_profile,
+              objective="lexicographic" if lexicographic else "weighted",
+              gap_limit=gap_limit_pct / 100 or None, no_improve_seconds=no_improve_seconds or None)
+    if rolling: mode, kw = "rolling", {**kw, "window": rolling_window, "overlap": rolling_overlap}
+    elif alt_k > 1: mode, kw = "alternatives", {**kw, "k": alt_k}
+    else: mode = "solve"
+    job_id = get_job_queue().submit(spec, owner=st.session_state.owner, mode=mode, **kw)
+    st.query_params["job"] = job_id
+    return job_view(job_id)
+
+def collect_solve_result(job):
+    if job["error"] is not None:
+        return None, [f"<div class='log-item log-err'>❌ 求解异常：{job['error']}</div>"]
+    ns, result = job["ns"], job["result"]
+    if result["matrix"] is None:
+        return None, []
+    st.session_state.last_hint = matrix_to_hint(ns, result["matrix"])
+    logs = render_html(ns, result["audit"])
+    if result["hint"]:
+        h = result["hint"]
+        logs = [f"<div class='log-item log-pass'>♻️ 热启动：沿用旧排班 {h['kept']}/{h['cells']} 格 ({h['ratio']:.0%})</div>"] + logs
+    if result["stages"]:
+        done = " → ".join(f"{'+'.join(FAMILY_LABELS[f] for f in st_['tier']) or '可行解'}={st_['value']}" for st_ in result["stages"])
+        logs = [f"<div class='log-item log-pass'>🪜 分层优化：{done}</div>"] + logs
+    agg = result.get("aggregate")
+    if agg and agg["status"]:
+        note = "，完整模型未及出解，采用展开结果" if agg.get("fallback") else ""
+        logs = [f"<div class='log-item log-pass'>🧩 分组聚合：{len(ns['employees'])} 人按输入合并为 {agg['groups']} 组 (最大组 {agg['largest']} 人){note}</div>"] + logs
+    if result.get("windows"):
+        w = result["windows"]
+        logs = [f"<div class='log-item log-pass'>🧭 滚动排班：{len(w)} 个窗口 ({w[0]['start']} → {w[-1]['end']})，共用时 {result['wall_time']:.1f} 秒</div>"] + logs
+    if result["stopped"]:
+        gap = f" (Gap {result['gap']:.1%})" if result["gap"] is not None else ""
+        logs = [f"<div class='log-item log-warn'>✋ 已手动采用第 {len(result['incumbents'])} 个方案{gap}</div>"] + logs
+    if result["cached"]:
+        logs = ["<div class='log-item log-pass'>⚡ 输入与历史排班完全一致，已直接复用缓存结果</div>"] + logs
+    return build_result_frame(ns, result["matrix"]), logs
+
+def show_precheck(issues, limit=5):
+    for i in issues[:limit]:
+        (st.error if i["severity"] == "error" else st.warning)(f"预检：{i['message']}")
+    if len(issues) > limit: st.caption(f"…… 另有 {len(issues) - limit} 条")
+
+# 人力资源看板上的实时预检 (毫秒级，不建模)；按 spec 内容缓存，只有排班输入变了才重算
+@st.cache_data(show_spinner=False, max_entries=32)
+def live_precheck(spec):
+    try:
+        return precheck(normalize_spec(spec))
+    except ValueError:
+        return []
 
-    
-    # H1. 物理约束
-    for e in range(len(employees)):
-        for d in range(num_days):
-            model.Add(sum(shift_vars[(e, d, s)] for s in range(len(shifts))) == 1)
-
-    # H2. 0排班禁令
-    for d in range(num_days):
-        for s_name, min_val in min_staff_per_shift.items():
-            if min_val == 0:
-                s_idx = s_map[s_name]
-                model.Add(sum(shift_vars[(e, d, s_idx)] for e in range(len(employees))) == 0)
-
-    # S0. 连班限制
-    work_indices = [i for i, s in enumerate(shifts) if s != off_shift_name]
-    for e in range(len(employees)):
-        for d in range(num_days - max_consecutive):
-            window = [sum(shift_vars[(e, d+k, w)] for w in work_indices) for k in range(max_consecutive + 1)]
-            is_violation = model.NewBoolVar(f'cons_vio_{e}_{d}')
-            model.Add(sum(window) > max_consecutive).OnlyEnforceIf(is_violation)
-            model.Add(sum(window) <= max_consecutive).OnlyEnforceIf(is_violation.Not())
-            penalties.append(is_violation * W_CONSECUTIVE)
-
-   # S1. 每日基线 (V23 终极版: 智能条件硬约束)
-    # 逻辑：
-    # 1. 平时 (无活动日): 硬约束。必须达标，少一人都不行。
-    # 2. 战时 (有活动日): 软约束(权重1000万)。给活动让路，避免无解。
-    # ----------------------------------------------------------
-    W_BASELINE_FLEX = 10000000 # 战时权重：一千万分，依然很高，但可以被牺牲
-    
-    for d in range(num_days):
-        # 判断今天是不是“战时”
-        is_war_time = (d in activity_day_indices)
-        
-        for s_name, min_val in min_staff_per_shift.items():
-            if min_val > 0:
-                s_idx = s_map[s_name]
-                # 计算实际安排的人数
-                actual = sum(shift_vars[(e, d, s_idx)] for e in range(len(employees)))
-                
-                if not is_war_time:
-                    # 【平时】：硬约束！
-                    # 没有活动的日子，必须严守基线，少一个人直接报错。
-                    model.Add(actual >= min_val)
-                else:
-                    # 【战时】：智能降级为软约束。
-                    # 有活动的日子，虽然也想守基线，但如果人被活动抢光了，允许基线不达标。
-                    shortage = model.NewIntVar(0, len(employees), f'short_{d}_{s_name}')
-                    # shortage = 目标 - 实际 (如果实际够了，shortage就是0)
-                    model.Add(shortage >= min_val - actual)
-                    model.Add(shortage >= 0)
-                    # 只有在缺人的时候才罚分
-                    penalties.append(shortage * W_BASELINE_FLEX)
-
-    # S2. 休息模式
-    for e in range(len(employees)):
-        actual_rest = sum(shift_vars[(e, d, off_idx)] for d in range(num_days))
-        model.Add(actual_rest == target_off_days)
-
-    # S3. 活动需求
-    for idx, row in edited_activity.iterrows():
-        if not row["日期"] or not row["指定班次"]: continue
-        try:
-            d_idx = date_headers_simple.index(row["日期"])
-            s_idx = s_map[row["指定班次"]]
-            req = int(row["所需人数"])
-            if req > 0:
-                model.Add(sum(shift_vars[(e, d_idx, s_idx)] for e in range(len(employees))) >= req)
-        except: continue
-
-    # S4. 晚转早
-    if enable_no_night_to_day:
-        n_idx, d_idx = s_map[night_shift], s_map[day_shift]
-        for e in range(len(employees)):
-            for d in range(num_days - 1):
-                vio = model.NewBoolVar(f'fat_{e}_{d}')
-                model.Add(shift_vars[(e, d, n_idx)] + shift_vars[(e, d+1, d_idx)] <= 1 + vio)
-                penalties.append(vio * W_FATIGUE)
-    
-    # S5. 个人拒绝与减少
-    for idx, row in edited_df.iterrows():
-        ref = row["拒绝班次(强)"]
-        if ref and ref in shift_work:
-            r_idx = s_map[ref]
-            for d in range(num_days):
-                is_s = shift_vars[(idx, d, r_idx)]
-                penalties.append(is_s * W_REFUSE)
-        
-        red = row["减少班次(弱)"]
-        if red and red in shift_work:
-            rd_idx = s_map[red]
-            cnt = sum(shift_vars[(idx, d, rd_idx)] for d in range(num_days))
-            penalties.append(cnt * 100)
-
-        # 指定休息日
-        req_off = str(row["指定休息日"])
-        if req_off.strip():
-            try:
-                days = [int(x)-1 for x in req_off.replace("，",",").split(",") if x.strip().isdigit()]
-                for d in days:
-                    if 0 <= d < num_days:
-                        is_work = model.NewBoolVar(f'vio_off_{idx}_{d}')
-                        model.Add(shift_vars[(idx, d, off_idx)] == 0).OnlyEnforceIf(is_work)
-                        model.Add(shift_vars[(idx, d, off_idx)] == 1).OnlyEnforceIf(is_work.Not())
-                        penalties.append(is_work * 50000)
-            except: pass
-
-    # S6. 强力平衡 (BUG FIX HERE)
-    for s_name in shift_work:
-        if min_staff_per_shift.get(s_name, 0) == 0: continue
-        s_idx = s_map[s_name]
-        
-        # 1. 每日波动修复
-        d_counts = [sum(shift_vars[(e, d, s_idx)] for e in range(len(employees))) for d in range(num_days)]
-        # 必须分两行定义IntVar
-        max_d = model.NewIntVar(0, len(employees), f'max_d_{s_name}')
-        min_d = model.NewIntVar(0, len(employees), f'min_d_{s_name}')
-        model.AddMaxEquality(max_d, d_counts)
-        model.AddMinEquality(min_d, d_counts)
-        
-        excess_d = model.NewIntVar(0, len(employees), f'ex_d_{s_name}')
-        model.Add(excess_d >= (max_d - min_d) - diff_daily_threshold)
-        penalties.append(excess_d * W_DAILY_BALANCE)
-
-        # 2. 员工公平修复
-        e_counts = [sum(shift_vars[(e, d, s_idx)] for d in range(num_days)) for e in range(len(employees))]
-        # 必须分两行定义IntVar
-        max_e = model.NewIntVar(0, num_days, f'max_e_{s_name}')
-        min_e = model.NewIntVar(0, num_days, f'min_e_{s_name}')
-        model.AddMaxEquality(max_e, e_counts)
-        model.AddMinEquality(min_e, e_counts)
-        
-        excess_e = model.NewIntVar(0, num_days, f'ex_e_{s_name}')
-        model.Add(excess_e >= (max_e - min_e) - diff_period_threshold)
-        penalties.append(excess_e * W_PERIOD_BALANCE)
-
-    model.Minimize(sum(penalties))
-    solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = 25.0
-    status = solver.Solve(model)
-
-    if status in [cp_model.OPTIMAL, cp_model.FEASIBLE]:
-        # --- 6. 全维度审计逻辑 ---
-        audit_logs = []
-        
-        res_matrix = [] 
-        name_map = {name: i for i, name in enumerate(employees)}
-
-        for e in range(len(employees)):
-            row = []
-            for d in range(num_days):
-                for s in range(len(shifts)):
-                    if solver.Value(shift_vars[(e, d, s)]):
-                        row.append(shifts[s])
-                        break
-            res_matrix.append(row)
-        
-        # 1. 活动需求
-        audit_logs.append("<div class='log-header'>1. 🔥 活动需求检测</div>")
-        act_fail = 0
-        for idx, row in edited_activity.iterrows():
-            if not row["日期"] or not row["指定班次"]: continue
-            try:
-                d_idx = date_headers_simple.index(row["日期"])
-                s_name = row["指定班次"]
-                req = int(row["所需人数"])
-                actual = sum(1 for e in range(len(employees)) if res_matrix[e][d_idx] == s_name)
-                if actual < req:
-                    audit_logs.append(f"<div class='log-item log-err'>❌ {row['日期']} {s_name}: 实到{actual} / 需{req}</div>")
-                    act_fail += 1
-            except: pass
-        if act_fail == 0: audit_logs.append("<div class='log-item log-pass'>✅ 所有活动需求已满足</div>")
-
-        # 2. 每日基线
-        audit_logs.append("<div class='log-header'>2. 🧱 每日基线检测</div>")
-        base_fail = 0
-        for d in range(num_days):
-            for s_name, min_val in min_staff_per_shift.items():
-                if min_val == 0: continue
-                cnt = sum(1 for e in range(len(employees)) if res_matrix[e][d] == s_name)
-                if cnt < min_val:
-                    audit_logs.append(f"<div class='log-item log-err'>❌ 第{d+1}天 {s_name}: 实到{cnt} / 需{min_val}</div>")
-                    base_fail += 1
-        if base_fail == 0: audit_logs.append("<div class='log-item log-pass'>✅ 每日基线全部达标</div>")
-
-        # 3. 休息模式
-        audit_logs.append("<div class='log-header'>3. 🛌 休息模式检测</div>")
-        rest_fail = 0
-        for e_idx, e_name in enumerate(employees):
-            cnt = sum(1 for d in range(num_days) if res_matrix[e_idx][d] == off_shift_name)
-            if cnt != target_off_days:
-                audit_logs.append(f"<div class='log-item log-err'>❌ {e_name}: 休了 {cnt} 天 (目标 {target_off_days})</div>")
-                rest_fail += 1
-        if rest_fail == 0: audit_logs.append(f"<div class='log-item log-pass'>✅ 全员休息天数达标 ({target_off_days}天)</div>")
-
-        
-        # 审计4: 指定休息日 (增强版：含越界检查)
-        audit_logs.append("<div class='log-header'>4. 🧘 指定休息日检测</div>")
-        spec_rest_fail = 0
-        for idx, row in edited_df.iterrows():
-            name = row["姓名"]
-            real_idx = name_map.get(name)
-            if real_idx is None: continue
-            
-            req_off = str(row["指定休息日"])
-            if req_off.strip():
-                try:
-                    # 解析用户输入的数字
-                    days = [int(x)-1 for x in req_off.replace("，",",").split(",") if x.strip().isdigit()]
-                    for d in days:
-                        # 情况A: 用户填写的数字在当前日期范围内 (正常检查)
-                        if 0 <= d < num_days:
-                            actual = res_matrix[real_idx][d]
-                            if actual != off_shift_name:
-                                date_str = date_headers_simple[d] # 获取具体日期显示，如 "02-13 周五"
-                                audit_logs.append(f"<div class='log-item log-err'>❌ {name} 指定在 {date_str} (第{d+1}天) 休息，但排了: {actual}</div>")
-                                spec_rest_fail += 1
-                        
-                        # 情况B: 用户填写的数字超出了当前日期范围 (新增报错)
-                        else:
-                            audit_logs.append(f"<div class='log-item log-warn'>⚠️ {name} 指定第 {d+1} 天休息，但当前排班只有 {num_days} 天 (已忽略)</div>")
-                            # 注意：这里不算 fail，但要提示用户
-                except: 
-                    audit_logs.append(f"<div class='log-item log-warn'>⚠️ {name} 的休息日格式输入错误</div>")
-        
-        if spec_rest_fail == 0: audit_logs.append("<div class='log-item log-pass'>✅ 指定休息日全部满足 (范围内)</div>")
-
-        # 5. 每日平衡
-        audit_logs.append("<div class='log-header'>5. ⚖️ 每日平衡检测</div>")
-        for s_name in shift_work:
-            if min_staff_per_shift.get(s_name, 0) == 0: continue
-            counts = []
-            for d in range(num_days):
-                c = sum(1 for e in range(len(employees)) if res_matrix[e][d] == s_name)
-                counts.append(c)
-            diff = max(counts) - min(counts)
-            if diff > diff_daily_threshold:
-                 audit_logs.append(f"<div class='log-item log-err'>❌ {s_name}: 波动 {diff} (阈值 {diff_daily_threshold})</div>")
-            else:
-                 audit_logs.append(f"<div class='log-item log-pass'>✅ {s_name}: 波动 {diff} (达标)</div>")
-
-        # 6. 工时公平
-        audit_logs.append("<div class='log-header'>6. ⚖️ 工时公平检测</div>")
-        for s_name in shift_work:
-            e_counts = []
-            for e in range(len(employees)):
-                c = sum(1 for d in range(num_days) if res_matrix[e][d] == s_name)
-                e_counts.append(c)
-            diff = max(e_counts) - min(e_counts)
-            if diff > diff_period_threshold:
-                audit_logs.append(f"<div class='log-item log-err'>❌ {s_name}: 差异 {diff} (阈值 {diff_period_threshold})</div>")
-            else:
-                audit_logs.append(f"<div class='log-item log-pass'>✅ {s_name}: 差异 {diff} (达标)</div>")
-
-        # 7. 连班检测
-        audit_logs.append("<div class='log-header'>7. 🔄 连班检测</div>")
-        cons_fail = 0
-        for e_idx, e_name in enumerate(employees):
-            curr = 0; m_c = 0
-            for d in range(num_days):
-                if res_matrix[e_idx][d] != off_shift_name: curr+=1
-                else: curr=0
-                m_c = max(m_c, curr)
-            if m_c > max_consecutive:
-                audit_logs.append(f"<div class='log-item log-err'>❌ {e_name} 连班 {m_c} 天 (限 {max_consecutive})</div>")
-                cons_fail += 1
-        if cons_fail == 0: audit_logs.append(f"<div class='log-item log-pass'>✅ 连班检测通过 (上限 {max_consecutive})</div>")
-            
-        # 8. 新增：晚转早检测 (疲劳审计)
-        if enable_no_night_to_day: # 只有开启了这个功能才检测
-            audit_logs.append("<div class='log-header'>8. 🌙 晚转早检测 (Fatigue)</div>")
-            fatigue_fail = 0
-            for e_idx, e_name in enumerate(employees):
-                for d in range(num_days - 1):
-                    today_shift = res_matrix[e_idx][d]
-                    tomorrow_shift = res_matrix[e_idx][d+1]
-                    
-                    # 检查：今天晚班 AND 明天早班
-                    if today_shift == night_shift and tomorrow_shift == day_shift:
-                        audit_logs.append(f"<div class='log-item log-err'>❌ {e_name}: 第{d+1}天{night_shift} -> 第{d+2}天{day_shift} (严重疲劳 硬性条件规则导致)</div>")
-                        fatigue_fail += 1
-            
-            if fatigue_fail == 0:
-                audit_logs.append(f"<div class='log-item log-pass'>✅ 无晚转早违规</div>")
-        
-        # 数据构建
-        data_rows = []
-        for e in range(len(employees)):
-            row = [employees[e]]
-            stats = {s: 0 for s in shifts}
-            for d in range(num_days):
-                s_name = res_matrix[e][d]
-                row.append(s_name)
-                stats[s_name] += 1
-            for s in shift_work: row.append(stats[s])
-            row.append(stats[off_shift_name])
-            data_rows.append(row)
-            
-        footer_rows = []
-        for s in shifts:
-            r_s = [f"【{s}】"]
-            for d in range(num_days):
-                cnt = sum(1 for e in range(len(employees)) if res_matrix[e][d] == s)
-                r_s.append(cnt)
-            r_s.extend([""] * (len(shift_work)+1))
-            footer_rows.append(r_s)
-
-        date_tuples = get_date_tuple(start_date, end_date)
-        cols = [("基本信息", "姓名")] + date_tuples + [("工时统计", s) for s in shift_work] + [("工时统计", "休息天数")]
-        return pd.DataFrame(data_rows + footer_rows, columns=pd.MultiIndex.from_tuples(cols)), audit_logs
-    
-    return None, ["❌ 求解失败：硬性冲突无法解决。"]
+live_issues = live_precheck(build_spec())
+with precheck_box.container():
+    if live_issues: show_precheck(live_issues)
+    else: st.success("✅ 预检通过：人力足以覆盖基线与活动需求")
 
 # --- 6. 执行 ---
+# 刷新页面后 session_state 清空了，按网址里的任务号接着跟踪 / 取回结果
+if st.session_state.solve_job is None and st.session_state.result_df is None and "job" in st.query_params:
+    st.session_state.solve_job = job_view(st.query_params["job"])
+
 if generate_btn:
     # 【新增】强制清空旧状态，防止逻辑残留
     st.session_state.result_df = None
+    st.session_state.result_src = None
     st.session_state.audit_report = []
-if generate_btn:
-    with st.spinner("🚀 AI 正在运算 (V21 Core)..."):
-        df, logs = solve_schedule_v19()
-        st.session_state.result_df = df
-        st.session_state.audit_report = logs
-
-if st.session_state.result_df is not None:
+    st.session_state.alternatives = None
+    st.session_state.run_stats = None
+    old_job = st.session_state.solve_job
+    if old_job is not None: get_job_queue().cancel(old_job["id"])
+    st.session_state.solve_job = start_solve_job()
+
+# 运算中只重跑进度卡片：每半秒读一次任务状态，整页不动；任务一结束就整页重跑一次，由下面取回结果
+@st.fragment(run_every=0.5)
+def job_monitor():
+    job = st.session_state.solve_job
+    if job is None: return
+    queue = get_job_queue()
+    rec = queue.get(job["id"])
+    if rec is None or rec["status"] not in ACTIVE: st.rerun(scope="app")
+    st.markdown('<div class="css-card">', unsafe_allow_html=True)
+    st.markdown('<div class="card-title">🚀 AI 正在运算 (V21 Core)...</div>', unsafe_allow_html=True)
+    if rec["status"] == "queued": st.info(f"⏳ 排队中：前面还有 {rec['position']} 个排班任务，轮到后自动开始")
+    last = rec["progress"]
+    g1, g2, g3, g4 = st.columns(4)
+    g1.metric("已找到方案", f"{rec['solutions']} 个")
+    g2.metric("当前目标值", f"{last['objective']:,.0f}" if last else "—")
+    g3.metric("理论下界", f"{last['bound']:,.0f}" if last else "—", delta=f"第 {last['stage']} 层" if last and "stage" in last else None, delta_color="off")
+    if job["windows"]: g1.caption(f"滚动窗口 {last['window'] if last else 1} / {job['windows']}")
+    if last and "alternative" in last: g1.caption(f"第 {last['alternative']} 套方案")
+    g4.metric("Gap", f"{last['gap']:.1%}" if last else "—")
+    elapsed = time.time() - rec["started"] if rec["started"] else 0.0
+    st.progress(min(1.0, elapsed / job["budget"]), text=f"已用时 {elapsed:.1f} 秒")
+    b1, b2 = st.columns(2)
+    # 滚动排班要等所有窗口排完才有完整方案
+    with b1: accept_btn = st.button("✅ 采用当前方案", disabled=last is None or bool(job["windows"]))
+    with b2: cancel_btn = st.button("⛔ 取消")
+    st.markdown('</div>', unsafe_allow_html=True)
+    if accept_btn: queue.stop(job["id"])
+    elif cancel_btn: queue.cancel(job["id"])
+
+job = st.session_state.solve_job
+if job is not None:
+    rec = get_job_queue().get(job["id"])
+    if rec is not None and rec["status"] in ACTIVE:
+        job_monitor()
+    else:
+        st.session_state.solve_job = None
+        if rec is None or rec["status"] == "cancelled":
+            st.toast("已取消本次排班")
+        else:
+            job = {"ns": normalize_spec(rec["spec"]), "result": rec["result"], "alternatives": rec["alternatives"],
+                   "error": rec["error"]}
+            t0 = time.perf_counter()
+            df, logs = collect_solve_result(job)
+            table_seconds = time.perf_counter() - t0
+            st.session_state.result_df = df
+            st.session_state.audit_report = logs
+            if df is not None: st.session_state.result_src = (job["ns"], job["result"]["matrix"])
+            if df is not None and job["alternatives"] and len(job["alternatives"]) > 1:
+                # 每套方案的表格和审计都先备好，切换时不用再算
+                ns = job["ns"]
+                st.session_state.alternatives = [{
+                    "df": build_result_frame(ns, r["matrix"]) if i else df,
+                    "logs": render_html(ns, r["audit"]) if i else logs,
+                    "hint": matrix_to_hint(ns, r["matrix"]), "matrix": r["matrix"], "objective": r["objective"], "distance": r["distance"],
+                } for i, r in enumerate(job["alternatives"])]
+                st.session_state.alt_pick = 0
+            result = job["result"]
+            if result is not None:
+                st.session_state.run_stats = run_record(job["ns"], result, {"table": table_seconds})
+                append_run_log(st.session_state.run_stats)
+            if df is None and result is not None and result["status"] == "PRECHECK_FAILED":
+                st.error("❌ 预检未通过，硬性条件不可能同时满足，已跳过求解：")
+                show_precheck(result["precheck"], limit=20)
+            elif df is None:
+                st.error(FAIL_MESSAGE if job["error"] is None else f"❌ 求解异常：{job['error']}")
+            if df is None and result is not None and result.get("conflicts"):
+                # 最小冲突集：这几条硬性条件放在一起必然无解，放宽其中任意一条即可
+                st.warning("🧩 最小冲突集 (放宽其中任意一条即可有解)：\n\n" + " + ".join(c["message"] for c in result["conflicts"]))
+
+# 结果表的底色：每格一个编号，按结果矩阵整体一次算出，翻页 / 筛选只切片，不再逐格跑 Styler 的回调
+GRID_CSS = np.array(["", "background-color: #f8f9fa; color: #adb5bd", "background-color: #fff3cd; color: #856404",
+                     "font-weight: bold; background-color: #ebf8ff; color: #2b6cb0"], dtype=object)
+
+def grid_codes(ns, res_matrix):
+    """与 build_result_frame 同形的底色编号矩阵 (GRID_CSS 的下标)：休息灰、晚班黄，汇总行的班次名加粗。"""
+    arr = schedule_array(ns, res_matrix)
+    shift_code = np.array([1 if s == ns["off_idx"] else 2 if "晚" in name else 0 for s, name in enumerate(ns["shifts"])], dtype=np.int8)
+    n_emp, n_days = arr.shape
+    n_stat = len(ns["work_idx"]) + 1
+    codes = np.zeros((n_emp + len(ns["shifts"]), 1 + n_days + n_stat), dtype=np.int8)
+    codes[:n_emp, 1:1 + n_days] = shift_code[arr]
+    codes[n_emp:, 0] = np.where(shift_code == 0, 3, shift_code)
+    return codes
+
+def result_grid(df, ns, res_matrix):
+    """按姓名筛选 + 分页显示结果表，只给当前页的格子上色；汇总行始终跟在最后一页。"""
+    codes = grid_codes(ns, res_matrix)
+    n_emp = len(ns["employees"])
+    f1, f2, f3 = st.columns([2, 1, 1])
+    with f1: name_filter = st.text_input("🔍 筛选员工", key="grid_filter", placeholder="姓名关键字，多个用逗号分隔")
+    rows = np.arange(n_emp)
+    keys = [k.strip() for k in name_filter.replace("，", ",").split(",") if k.strip()]
+    if keys: rows = rows[df.iloc[:n_emp, 0].astype(str).str.contains("|".join(map(re.escape, keys))).to_numpy()]
+    with f2: page_size = st.selectbox("每页人数", [50, 100, 200, 500], key="grid_page_size")
+    pages = max(1, math.ceil(len(rows) / page_size))
+    with f3: page = st.number_input(f"页码 (共 {pages} 页)", 1, pages, 1, key=f"grid_page_{pages}")
+    rows = rows[(page - 1) * page_size:page * page_size]
+    if page == pages: rows = np.concatenate([rows, np.arange(n_emp, len(df))])
+    css = GRID_CSS[codes[rows]]
+    view = df.iloc[rows]
+    st.dataframe(view.style.apply(lambda _: css, axis=None), use_container_width=True, height=min(600, 38 + 35 * len(rows)))
+    if keys: st.caption(f"筛选出 {len(rows) - (len(df) - n_emp if page == pages else 0)} 人")
+
+# 结果区单独重跑：切换方案、筛选翻页、修复和导出都不会重跑整页的输入区；
+# 运算期间的定时刷新只重跑进度卡片 (job_monitor)，整页只在任务结束时重跑一次
+@st.fragment
+def result_view():
     st.markdown('<div class="css-card">', unsafe_allow_html=True)
     st.markdown('<div class="card-title">📋 审计日志 & 排班结果</div>', unsafe_allow_html=True)
 
+    alts = st.session_state.alternatives
+    if alts:
+        labels = [f"方案 {i + 1} · 罚分 {a['objective']:,.0f}" + (f" · 相差 {a['distance']} 格" if a["distance"] else "")
+                  for i, a in enumerate(alts)]
+        pick = st.radio("🎲 备选方案", range(len(alts)), format_func=labels.__getitem__, horizontal=True, key="alt_pick")
+        st.session_state.result_df = alts[pick]["df"]
+        st.session_state.audit_report = alts[pick]["logs"]
+        st.session_state.last_hint = alts[pick]["hint"]
+        st.session_state.result_src = (st.session_state.result_src[0], alts[pick]["matrix"])
+
     st.session_state.result_df.index = range(1, len(st.session_state.result_df) + 1)
     
     # 审计日志区
@@ -616,19 +633,124 @@ if st.session_state.result_df is not None:
     st.markdown(log_html, unsafe_allow_html=True)
     st.markdown("###")
     
-    def style_map(val):
-        s = str(val)
-        if off_shift_name in s: return 'background-color: #f8f9fa; color: #adb5bd'
-        if "晚" in s: return 'background-color: #fff3cd; color: #856404'
-        if "【" in s: return 'font-weight: bold; background-color: #ebf8ff; color: #2b6cb0'
-        return ''
-    
-    st.dataframe(st.session_state.result_df.style.applymap(style_map), use_container_width=True, height=600)
+    result_grid(st.session_state.result_df, *st.session_state.result_src)
+
+    # 临时调整：有人请假或新增了活动行时，只在受影响的前后几天里就近修补，其余格子不动
+    with st.expander("🩹 临时调整 (局部修复)"):
+        r1, r2 = st.columns(2)
+        with r1: sick_names = st.multiselect("请假人员", employees, key="repair_names")
+        with r2: sick_days = st.multiselect("请假日期", date_headers_simple, key="repair_days")
+        st.caption("新增的活动需求直接加到上方活动表里再点修复。")
+        repair_btn = st.button("🩹 修复当前排班", disabled=st.session_state.last_hint is None)
+    if repair_btn:
+        spec = build_spec()
+        try:
+            ns = normalize_spec(spec)
+            fixed = repair(spec, st.session_state.last_hint, absences={n: sick_days for n in sick_names})
+        except ValueError as exc:
+            fixed = None
+            st.error(f"❌ {exc}")
+        if fixed is not None and fixed["matrix"] is None:
+            st.error("❌ 局部修复失败：放开整个周期也排不出来，请重新排班。")
+        elif fixed is not None:
+            st.session_state.alternatives = None  # 修复的是当前这一套，其余备选方案作废
+            st.session_state.last_hint = matrix_to_hint(ns, fixed["matrix"])
+            st.session_state.result_df = build_result_frame(ns, fixed["matrix"])
+            st.session_state.result_src = (ns, fixed["matrix"])
+            moved = "、".join(f"{c['employee']} {c['date']} {c['before']}→{c['after']}" for c in fixed["changes"][:20])
+            if len(fixed["changes"]) > 20: moved += " ……"
+            st.session_state.audit_report = [f"<div class='log-item log-pass'>🩹 局部修复：改动 {len(fixed['changes'])} 格，用时 {fixed['wall_time']:.1f} 秒 ({moved or '无需改动'})</div>"] + render_html(ns, fixed["audit"])
+            st.rerun()
     
-    output = io.BytesIO()
-    df_exp = st.session_state.result_df.copy()
-    df_exp.columns = [f"{c[0]}\n{c[1]}" if "信息" not in c[0] else c[1] for c in st.session_state.result_df.columns]
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df_exp.to_excel(writer, index=False)
-    st.download_button("📥 导出 Excel", output.getvalue(), "智能排班系统_V18.xlsx")
+    # 点击时才生成 (在单独的线程里)，页面平时重跑不再反复写 Excel
+    def export_xlsx(src=st.session_state.result_src):
+        t0 = time.perf_counter()
+        data = to_xlsx_bytes(*src)
+        append_run_log(phase_record(src[0], {"export": time.perf_counter() - t0}))
+        return data
+    x1, x2 = st.columns(2)
+    with x1: st.download_button("📥 导出 Excel", export_xlsx, "智能排班系统_V18.xlsx",
+                                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    with x2: publish_btn = st.button("📌 发布到排班历史", help="记入本店历史，之后的排班据此做跨期公平。同一日期重复发布时以最后一次为准。")
+    if publish_btn:
+        info = get_history().publish(*st.session_state.result_src, store=store_name)
+        replaced = f"，覆盖了之前发布的 {info['replaced']} 格" if info["replaced"] else ""
+        st.toast(f"已发布 {info['store']} {info['start_date']} → {info['end_date']}，共 {info['cells']} 格{replaced}")
     st.markdown('</div>', unsafe_allow_html=True)
+
+
+if st.session_state.result_df is not None:
+    result_view()
+
+# 运行诊断：各阶段耗时、模型规模、求解器统计和各惩罚族罚分 (同一份数据也写进了本地运行日志)
+if st.session_state.run_stats is not None:
+    rec = st.session_state.run_stats
+    with st.expander("🔬 运行诊断"):
+        d1, d2 = st.columns(2)
+        with d1:
+            st.caption("阶段耗时 (秒)")
+            st.dataframe(pd.DataFrame([{"阶段": PHASE_LABELS.get(k, k), "耗时": round(v, 3)} for k, v in rec["phases"].items()]), hide_index=True, use_container_width=True)
+            sv = rec["solver"]
+            if sv:
+                st.caption("求解器统计")
+                st.dataframe(pd.DataFrame([
+                    {"项目": "状态", "值": sv["status"]}, {"项目": "目标值", "值": sv["objective"]}, {"项目": "下界", "值": sv["bound"]},
+                    {"项目": "用时 (秒)", "值": round(sv["wall_time"], 3)}, {"项目": "预处理 (秒)", "值": sv["presolve_seconds"]},
+                    {"项目": "分支数", "值": sv["branches"]}, {"项目": "冲突数", "值": sv["conflicts"]}, {"项目": "布尔变量", "值": sv["booleans"]},
+                ]).astype({"值": str}), hide_index=True, use_container_width=True)
+        with d2:
+            if rec["model"]:
+                st.caption(f"模型规模：{rec['model']['variables']:,} 个变量，{rec['model']['constraints']:,} 条约束")
+                st.dataframe(pd.DataFrame([{"约束族": f["family"], "变量": f["variables"], "约束": f["constraints"], "建模耗时": round(f["seconds"], 3)}
+                                           for f in rec["model"]["families"]]), hide_index=True, use_container_width=True)
+            if rec["penalties"]:
+                st.caption("罚分构成")
+                st.dataframe(pd.DataFrame([{"惩罚项": p["label"], "违规量": p["value"], "权重": p["weight"], "罚分": p["weighted"]}
+                                           for p in rec["penalties"]]), hide_index=True, use_container_width=True)
+
+# --- 7. 场景对比 ---
+# 单独重跑：编辑场景表、运行对比不影响上面的输入区和结果区
+@st.fragment
+def scenario_view():
+    with st.expander("🧪 场景对比 (What-if)：一次试几组阈值 / 连班 / 基线"):
+        knob_cols = {"每日人数允许差值": "diff_daily_threshold", "员工工时允许差值": "diff_period_threshold",
+                     "最大连班限制": "max_consecutive"}
+        base_shifts = [s for s in shift_work if min_staff_per_shift[s] > 0]
+        base_row = {"场景": "当前设置", "每日人数允许差值": diff_daily_threshold, "员工工时允许差值": diff_period_threshold,
+                    "最大连班限制": max_consecutive, **{f"{s}基线": min_staff_per_shift[s] for s in base_shifts}}
+        loose_row = {**base_row, "场景": "放宽平衡", "每日人数允许差值": diff_daily_threshold + 1,
+                     "员工工时允许差值": diff_period_threshold + 1}
+        st.caption("每行一个场景，模型只建一次，各场景并发求解。基线只能调整大于 0 的班次。")
+        scenario_df = st.data_editor(pd.DataFrame([base_row, loose_row]), num_rows="dynamic", use_container_width=True,
+                                     key="scenario_editor")
+        sc1, sc2 = st.columns(2)
+        with sc1: scenario_time = st.number_input("每个场景的时间上限(秒)", 1, 600, 10)
+        with sc2: scenario_btn = st.button("🧪 运行场景对比")
+        if scenario_btn:
+            scenarios = []
+            for row in scenario_df.to_dict("records"):
+                sc = {"name": str(row.get("场景") or "").strip()}
+                sc.update({key: int(row[col]) for col, key in knob_cols.items() if not pd.isna(row.get(col))})
+                sc["min_staff_per_shift"] = {s: int(row[f"{s}基线"]) for s in base_shifts if not pd.isna(row.get(f"{s}基线"))}
+                scenarios.append(sc)
+            try:
+                with st.spinner(f"正在并发求解 {len(scenarios)} 个场景..."):
+                    spec = build_spec()
+                    rows = run_scenarios(spec, scenarios, time_limit=scenario_time, profile=solver_profile)
+                ns = normalize_spec(spec)
+                st.session_state.scenario_sheets = [(r["name"], ns, r["matrix"]) for r in rows if r["matrix"] is not None]
+                st.session_state.scenario_rows = [{
+                    "场景": r["name"], "状态": r["status"],
+                    "总罚分": None if r["objective"] is None else f"{r['objective']:,.0f}",
+                    "审计失败项": r["failures"], "用时(秒)": round(r["wall_time"], 1),
+                } for r in rows]
+            except ValueError as exc:
+                st.error(f"❌ {exc}")
+        if st.session_state.scenario_rows:
+            st.dataframe(pd.DataFrame(st.session_state.scenario_rows), use_container_width=True, hide_index=True)
+        if st.session_state.scenario_sheets:
+            sheets = st.session_state.scenario_sheets
+            st.download_button("📥 导出全部场景 (每个场景一张表)", lambda: workbook_bytes(sheets), "场景对比.xlsx",
+                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+scenario_view()
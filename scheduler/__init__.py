@@ -0,0 +1,14 @@
+"""AI 智能排班的无界面核心：规格归一化、CP-SAT 建模求解、审计。"""
+from .audit import audit, render_html
+from .cache import SolutionCache, cache_key
+from .engine import build_result_frame, normalize_spec, solve
+from .horizon import solve_rolling
+from .precheck import precheck
+from .profiles import SOLVER_PROFILES
+from .repair import repair
+from .scenarios import run_scenarios
+
+__all__ = [
+    "SOLVER_PROFILES", "SolutionCache", "audit", "build_result_frame", "cache_key", "normalize_spec",
+    "precheck", "render_html", "repair", "run_scenarios", "solve", "solve_rolling",
+]
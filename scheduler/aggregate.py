@@ -0,0 +1,208 @@
+"""员工分组聚合：大门店里大多数员工的输入完全相同，对模型来说可以互换。
+
+把可互换的一组员工合成一个 "计数单元"：每天每个班次只有一个整数变量 (这一组里有几人上这个班)，
+变量数只与 组数 × 天数 × 班次 有关，与人数无关。每日基线 / 活动 / 时段覆盖 / 每日平衡 / 休息总数 /
+拒绝与减少 / 指定休息日在计数口径下是精确的；连班、晚转早、工时公平只能写成松弛 (下界)。
+
+计数解再按天贪心展开回个人 (expand)：谁该休息看剩余休息额度和当前连班，谁上哪个班看各自已上的
+天数和前一天是否晚班。展开结果作为完整模型的热启动提示，由 CP-SAT 在个人层面继续修正。
+"""
+import numpy as np
+from ortools.sat.python import cp_model
+
+from .audit import availability
+
+
+def equivalent_groups(ns, hint_cells=None):
+    """输入完全相同的员工分组 (含单人组，按首个成员排序)，组内任意互换不改变可行性和罚分。
+
+    比较的是模型里用到的全部个人数据：上期历史、拒绝/减少班次、不可排班次、指定休息日、周末轮休、休息目标、已上班次；
+    有热启动提示的员工各自单独成组。
+    """
+    hinted = {e for e, _, _ in hint_cells or []}
+    groups = {}
+    for e in range(len(ns["employees"])):
+        if e in hinted:
+            groups[("hint", e)] = [e]
+            continue
+        key = (ns["last_shift"][e], ns["history_run"][e], ns["refuse"].get(e), ns["reduce"].get(e),
+               tuple(ns["unavailable"].get(e, [])), tuple(ns["req_off"].get(e, [])), ns["weekend_relief"].get(e, 0),
+               ns["rest_targets"][e], tuple(sorted(ns["prior_counts"].get(e, {}).items())))
+        groups.setdefault(key, []).append(e)
+    return sorted(groups.values())
+
+
+def worth_aggregating(groups, min_saved=20):
+    """合并后至少少掉 min_saved 个员工行才值得多解一次计数模型。"""
+    return sum(len(g) - 1 for g in groups) >= min_saved
+
+
+def build_count_model(ns, groups, hint_cells=None, families=()):
+    """计数模型。返回 (model, y, penalties)，y[(组, 天, 班次)] 是该组当天上该班次的人数。
+
+    penalties 与 engine.build_model 的惩罚族同名，families 给出全部族名 (保证每族都有键)。
+    """
+    D, S = ns["num_days"], len(ns["shifts"])
+    off_idx = ns["off_idx"]
+    M = ns["max_consecutive"]
+    model = cp_model.CpModel()
+    Sum = cp_model.LinearExpr.Sum
+    mask = availability(ns)
+    y = {}
+    penalties = {name: [] for name in families}
+
+    for g, members in enumerate(groups):
+        n = len(members)
+        for d in range(D):
+            cell = [model.NewIntVar(0, n if mask[members[0], s] else 0, f'y_{g}_{d}_{s}') for s in range(S)]
+            for s in range(S): y[(g, d, s)] = cell[s]
+            model.Add(Sum(cell) == n)
+    day_count = {(d, s): Sum([y[(g, d, s)] for g in range(len(groups))]) for d in range(D) for s in range(S)}
+    activity_days = {a["day"] for a in ns["activities"]}
+
+    # 硬约束：与完整模型相同
+    for s_idx, min_val in ns["min_staff"].items():
+        for d in range(D):
+            if min_val == 0:
+                if s_idx not in ns["demand_shifts"]: model.Add(day_count[(d, s_idx)] == 0)
+            elif d not in activity_days:
+                model.Add(day_count[(d, s_idx)] >= min_val)
+            else:
+                shortage = model.NewIntVar(0, len(ns["employees"]), f'short_{d}_{s_idx}')
+                model.Add(shortage >= min_val - day_count[(d, s_idx)])
+                penalties["baseline_flex"].append(shortage)
+    for a in ns["activities"]:
+        if a["req"] > 0: model.Add(day_count[(a["day"], a["shift"])] >= a["req"])
+    for row in ns["coverage"]:
+        short = model.NewIntVar(0, row["req"], f'cov_{row["day"]}_{row["start"]}')
+        model.Add(Sum([day_count[(d, s)] for d, s in row["cover"]]) + short >= row["req"])
+        penalties["coverage"].append(short * (row["end"] - row["start"]))
+
+    for g, members in enumerate(groups):
+        e0, n = members[0], len(members)
+        model.Add(Sum([y[(g, d, off_idx)] for d in range(D)]) == sum(ns["rest_targets"][e] for e in members))
+
+        # 连班 (松弛)：任意连续 M+1 天里，一次都没休的人数 ≥ n - 这几天的休息人次
+        h = ns["history_run"][e0]
+        starts = [(0, M + 1 - h)] if 0 < M + 1 - h <= D and h > 0 else []
+        starts += [(d, d + M + 1) for d in range(D - M)]
+        for lo, hi in starts:
+            vio = model.NewIntVar(0, n, f'cons_{g}_{lo}')
+            model.Add(vio >= n - Sum([y[(g, d, off_idx)] for d in range(lo, hi)]))
+            penalties["consecutive"].append(vio)
+
+        # 晚转早 (松弛)：前一天晚班的人和后一天早班的人至少重叠这么多
+        if ns["no_night_to_day"]:
+            n_idx, d_idx = ns["night_idx"], ns["day_idx"]
+            for d in range(D - 1):
+                vio = model.NewIntVar(0, n, f'fat_{g}_{d}')
+                model.Add(vio >= y[(g, d, n_idx)] + y[(g, d + 1, d_idx)] - n)
+                penalties["fatigue"].append(vio)
+            if ns["last_shift"][e0] == ns["shifts"][n_idx]:
+                penalties["fatigue"].append(y[(g, 0, d_idx)])
+
+        # 个人需求：组内完全相同，按人次计正好等于逐人求和
+        if e0 in ns["refuse"]:
+            penalties["refuse"].append(Sum([y[(g, d, ns["refuse"][e0])] for d in range(D)]))
+        if e0 in ns["reduce"]:
+            penalties["reduce"].append(Sum([y[(g, d, ns["reduce"][e0])] for d in range(D)]))
+        for d in ns["req_off"].get(e0, []):
+            penalties["req_off"].append(n - y[(g, d, off_idx)])
+        if e0 in ns["weekend_relief"]:
+            k = ns["weekend_relief"][e0]
+            short = model.NewIntVar(0, n * k, f'wk_relief_{g}')
+            model.Add(short >= n * k - Sum([y[(g, d, off_idx)] for d in ns["weekend_days"]]))
+            penalties["weekend_relief"].append(short)
+
+    # 平衡：每日波动是精确的；工时公平用 组平均 夹在 个人最大/最小 之间做松弛
+    for s_idx in ns["work_idx"]:
+        if ns["min_staff"].get(s_idx, 0) == 0: continue
+        d_counts = [day_count[(d, s_idx)] for d in range(D)]
+        E = len(ns["employees"])
+        max_d, min_d = model.NewIntVar(0, E, f'max_d_{s_idx}'), model.NewIntVar(0, E, f'min_d_{s_idx}')
+        model.AddMaxEquality(max_d, d_counts)
+        model.AddMinEquality(min_d, d_counts)
+        excess_d = model.NewIntVar(0, E, f'ex_d_{s_idx}')
+        model.Add(excess_d >= (max_d - min_d) - ns["diff_daily_threshold"])
+        penalties["daily_balance"].append(excess_d)
+
+        top = D + max([0] + [c.get(s_idx, 0) for c in ns["prior_counts"].values()])
+        max_e, min_e = model.NewIntVar(0, top, f'max_e_{s_idx}'), model.NewIntVar(0, top, f'min_e_{s_idx}')
+        for g, members in enumerate(groups):
+            if not mask[members[0], s_idx]: continue
+            n = len(members)
+            prior = ns["prior_counts"].get(members[0], {}).get(s_idx, 0)
+            total = Sum([y[(g, d, s_idx)] for d in range(D)]) + n * prior
+            model.Add(total <= n * max_e)
+            model.Add(total >= n * min_e)
+        excess_e = model.NewIntVar(0, top, f'ex_e_{s_idx}')
+        model.Add(excess_e >= (max_e - min_e) - ns["diff_period_threshold"])
+        penalties["period_balance"].append(excess_e)
+
+    # 稳定性：有提示的员工都是单人组
+    for e, d, s_idx in hint_cells or []:
+        g = next(i for i, members in enumerate(groups) if members == [e])
+        penalties["stability"].append(1 - y[(g, d, s_idx)])
+    return model, y, penalties
+
+
+def counts_array(ns, groups, solver, y):
+    """计数解 -> (组 × 天 × 班次) 整数数组。"""
+    D, S = ns["num_days"], len(ns["shifts"])
+    out = np.zeros((len(groups), D, S), dtype=np.int64)
+    for (g, d, s), var in y.items():
+        out[g, d, s] = solver.Value(var)
+    return out
+
+
+def expand(ns, groups, counts):
+    """把计数解逐天贪心分给组内个人，返回 (员工 × 天) 班次下标数组。
+
+    休息：先给剩余额度等于剩余天数的人 (不休就来不及)，再按 连班是否到顶 / 剩余额度占比 / 当前连班 排序；
+    上班：早班优先给前一天不是晚班的人，每个班次都先给该班次上得最少的人。
+    """
+    E, D, S = len(ns["employees"]), ns["num_days"], len(ns["shifts"])
+    off_idx, M = ns["off_idx"], ns["max_consecutive"]
+    s_map = {s: i for i, s in enumerate(ns["shifts"])}
+    n_idx, d_idx = ns["night_idx"], ns["day_idx"]
+    work_order = [d_idx] + [s for s in ns["work_idx"] if s != d_idx]
+    arr = np.full((E, D), off_idx, dtype=np.int16)
+    rest_left = np.asarray(ns["rest_targets"], dtype=np.int64).copy()
+    run = np.asarray(ns["history_run"], dtype=np.int64).copy()
+    prev = np.asarray([s_map[s] for s in ns["last_shift"]], dtype=np.int64)
+    done = np.zeros((E, S), dtype=np.int64)
+    for e, c in ns["prior_counts"].items():
+        for s, v in c.items(): done[e, s] = v
+
+    for g, members in enumerate(groups):
+        members = list(members)
+        for d in range(D):
+            remaining = D - d
+            k = int(counts[g, d, off_idx])
+            cand = [e for e in members if rest_left[e] > 0]
+            cand.sort(key=lambda e: (rest_left[e] >= remaining, run[e] >= M, rest_left[e] / remaining, run[e]),
+                      reverse=True)
+            resting = set(cand[:k])
+            working = [e for e in members if e not in resting]
+            # 额度用完的人被迫多休时也只能休 (计数解保证组内总数对得上，这种情况很少)
+            if len(resting) < k:
+                extra = sorted(working, key=lambda e: run[e], reverse=True)[:k - len(resting)]
+                resting.update(extra)
+                working = [e for e in working if e not in resting]
+            for s in work_order:
+                need = int(counts[g, d, s])
+                if not need: continue
+                working.sort(key=lambda e: ((s == d_idx and prev[e] == n_idx), done[e, s]))
+                for e in working[:need]:
+                    arr[e, d] = s
+                working = working[need:]
+            for e in members:
+                s = int(arr[e, d])
+                if s == off_idx:
+                    rest_left[e] -= 1
+                    run[e] = 0
+                else:
+                    run[e] += 1
+                    done[e, s] += 1
+                prev[e] = s
+    return arr
@@ -0,0 +1,111 @@
+"""多方案 (Top-K)：同一份输入给出 K 个彼此明显不同的排班，店长不满意时直接换一个看，不必重排。
+
+    results = solve_alternatives(spec, k=3, min_diff=20)
+
+第一个方案照常 solve (缓存 / 热启动 / 分组聚合都照旧)。之后复用同一个模型 (带同样的热启动稳定性惩罚)，
+每找到一个方案就加一条多样性约束：与它相同的格子数 ≤ 总格数 - min_diff，再以上一个方案为提示接着求解，
+所以每个新方案都与之前所有方案至少相差 min_diff 格，且在这个前提下罚分尽量低。
+后面的方案沿用第一个方案的目标模式和停止规则；分层求解会把每层的最优值固定进模型，
+所以 objective="lexicographic" 时每个方案都从新建的模型开始，再补上之前所有的多样性约束。
+"""
+from ortools.sat.python import cp_model
+
+from .audit import audit, schedule_array, shift_names
+from .engine import (STATUS_NAMES, build_model, extract_array, hint_survival, normalize_hint, normalize_spec,
+                     penalty_breakdown, relative_gap, run_lexicographic, run_solver, solve, solver_stats,
+                     weighted_objective)
+from .profiles import resolve_profile
+
+
+def default_min_diff(ns):
+    """缺省要求相差总格数的 5% (至少 1 格)。"""
+    return max(1, round(len(ns["employees"]) * ns["num_days"] * 0.05))
+
+
+def differ(model, shift_vars, arr, min_diff):
+    """多样性约束：与 arr 相同的格子数 ≤ 总格数 - min_diff。"""
+    same = [shift_vars[(e, d, int(arr[e, d]))] for e in range(arr.shape[0]) for d in range(arr.shape[1])
+            if (e, d, int(arr[e, d])) in shift_vars]
+    model.Add(cp_model.LinearExpr.Sum(same) <= arr.size - min_diff)
+
+
+def solve_alternatives(spec, k=3, min_diff=None, time_limit=None, on_solution=None, stop_event=None, **solve_kw):
+    """返回最多 k 个结果 dict (结构同 solve)，多一个 alternative (从 1 开始) 和 distance (与之前方案的最少相差格数)。
+
+    time_limit 是每个方案的时间上限；其余参数原样传给第一个方案的 solve，hint / profile / params /
+    num_workers / objective / stage_time_limit / gap_limit / no_improve_seconds 也用于后面的方案。
+    on_solution 收到的进度多一个 alternative 字段。第一个方案失败、某个方案找不到或 stop_event 被置位时
+    提前结束，只返回已经找到的方案。
+    """
+    ns = normalize_spec(spec)
+
+    def forward(i):
+        def cb(info):
+            info["alternative"] = i
+            if on_solution is not None: on_solution(info)
+        return cb
+
+    first = solve(ns, time_limit=time_limit, on_solution=forward(1), stop_event=stop_event, **solve_kw)
+    first.update(alternative=1, distance=None)
+    results = [first]
+    if first["matrix"] is None or first["stopped"]: return results
+
+    _, params = resolve_profile(solve_kw.get("profile"), ns)
+    params = {**params, **(solve_kw.get("params") or {})}
+    objective = solve_kw.get("objective", "weighted")
+    hint_cells = normalize_hint(ns, solve_kw.get("hint"))
+    solver_kw = dict(num_workers=solve_kw.get("num_workers"), params=params, stop_event=stop_event,
+                     gap_limit=solve_kw.get("gap_limit"), no_improve_seconds=solve_kw.get("no_improve_seconds"))
+    min_diff = min_diff or default_min_diff(ns)
+    found = [schedule_array(ns, first["matrix"])]
+    model = None
+    for i in range(2, k + 1):
+        if stop_event is not None and stop_event.is_set(): break
+        prev = found[-1]
+        if model is None or objective == "lexicographic":
+            model, shift_vars, penalties = build_model(ns, hint_cells)
+            for arr in found[:-1]: differ(model, shift_vars, arr, min_diff)
+        differ(model, shift_vars, prev, min_diff)
+        model.ClearHints()
+        for (e, d, s), var in shift_vars.items():
+            model.AddHint(var, prev[e, d] == s)
+        if objective == "lexicographic":
+            solver, status, incumbents, stages = run_lexicographic(
+                model, shift_vars, penalties, time_limit=time_limit, stage_time_limit=solve_kw.get("stage_time_limit"),
+                on_solution=forward(i), **solver_kw)
+            wall_time = sum(st["wall_time"] for st in stages)
+        else:
+            solver, status, callback = run_solver(model, time_limit=time_limit, on_solution=forward(i), **solver_kw)
+            incumbents, stages, wall_time = callback.incumbents, None, solver.WallTime()
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE): break
+        arr = extract_array(ns, solver, shift_vars)
+        matrix = shift_names(ns, arr)
+        if stages is None:
+            objective_value, bound = solver.ObjectiveValue(), solver.BestObjectiveBound()
+            gap = relative_gap(objective_value, bound)
+        else:
+            objective_value, bound, gap = float(solver.Value(weighted_objective(penalties))), None, None
+        results.append({
+            **first,
+            "status": STATUS_NAMES.get(status, str(status)),
+            "matrix": matrix,
+            "audit": audit(ns, arr),
+            "objective": objective_value,
+            "bound": bound,
+            "gap": gap,
+            "wall_time": wall_time,
+            "cached": False,
+            "hint": hint_survival(hint_cells, matrix, ns),
+            "stopped": stop_event is not None and stop_event.is_set(),
+            "incumbents": incumbents,
+            "objective_mode": objective,
+            "stages": stages,
+            "build": None,
+            "aggregate": None,
+            "stats": {"phases": {"solve": wall_time}, "solver": solver_stats(solver, status),
+                      "penalties": penalty_breakdown(solver, penalties)},
+            "alternative": i,
+            "distance": int(min((arr != f).sum() for f in found)),
+        })
+        found.append(arr)
+    return results
@@ -0,0 +1,253 @@
+"""向量化审计：排班结果先变成 (员工 × 天) 的整数数组，各项检查全部用数组运算完成。
+
+审计结果是结构化记录 (dict)：
+
+    {"check": "baseline", "severity": "error", "employee": None, "day": 3, "shift": "早班",
+     "actual": 2, "target": 3}
+
+check 取值见 CHECKS；severity 为 error / warn / pass。渲染成页面上的 HTML 是单独一步 (render_html)。
+"""
+import numpy as np
+
+from .coverage import span_label, understaffed
+
+CHECKS = [
+    ("activity", "1. 🔥 活动需求检测"),
+    ("baseline", "2. 🧱 每日基线检测"),
+    ("rest", "3. 🛌 休息模式检测"),
+    ("req_off", "4. 🧘 指定休息日检测"),
+    ("daily_balance", "5. ⚖️ 每日平衡检测"),
+    ("period_balance", "6. ⚖️ 工时公平检测"),
+    ("consecutive", "7. 🔄 连班检测"),
+    ("fatigue", "8. 🌙 晚转早检测 (Fatigue)"),
+    ("coverage", "9. ⏱️ 时段覆盖检测"),
+    ("weekend_relief", "10. 🏖️ 周末轮休检测"),
+]
+
+
+def _record(check, severity, employee=None, day=None, shift=None, actual=None, target=None):
+    return {"check": check, "severity": severity, "employee": employee, "day": day, "shift": shift,
+            "actual": actual, "target": target}
+
+
+# --- 数组化 ---
+def schedule_array(ns, res_matrix):
+    """班次名矩阵 -> int16 数组；已经是数组的原样返回。"""
+    if isinstance(res_matrix, np.ndarray): return res_matrix
+    names = np.asarray(res_matrix, dtype=object).reshape(len(ns["employees"]), ns["num_days"])
+    arr = np.full(names.shape, ns["off_idx"], dtype=np.int16)
+    for s_idx, s_name in enumerate(ns["shifts"]):
+        arr[names == s_name] = s_idx
+    return arr
+
+
+def shift_names(ns, arr):
+    return np.asarray(ns["shifts"], dtype=object)[arr].tolist()
+
+
+def shift_counts(ns, arr):
+    """(每人各班次天数 E×S, 每天各班次人数 D×S)。"""
+    onehot = arr[:, :, None] == np.arange(len(ns["shifts"]), dtype=arr.dtype)
+    return onehot.sum(axis=1), onehot.sum(axis=0)
+
+
+def availability(ns):
+    """(员工 × 班次) 布尔矩阵：True 表示这个人可以排这个班次 (模型里才有对应变量)。
+
+    整列去掉的是基线为 0 且没有活动需要的班次；单人去掉的是不可排班次 (技能 / 硬性拒绝)。
+    """
+    mask = np.ones((len(ns["employees"]), len(ns["shifts"])), dtype=bool)
+    mask[:, ns.get("pruned_shifts", [])] = False
+    for e, s_list in ns.get("unavailable", {}).items():
+        mask[e, s_list] = False
+    return mask
+
+
+def max_runs(work, carry=None):
+    """每行 True 的最长连续段长度；carry 是每行开头之前已经连着的长度 (上期历史)。"""
+    if work.shape[1] == 0: return np.zeros(work.shape[0], dtype=np.int64)
+    c = np.cumsum(work, axis=1)
+    # 每个位置之前最近一次休息时的累计值，相减即当前连续段长度
+    reset = np.maximum.accumulate(np.where(work, 0, c), axis=1)
+    run = c - reset
+    if carry is not None:
+        # 第一次休息之前的连续段接上历史
+        run = run + np.asarray(carry)[:, None] * (np.cumsum(~work, axis=1) == 0)
+    return run.max(axis=1)
+
+
+# --- 审计 ---
+def audit(ns, res_matrix):
+    arr = schedule_array(ns, res_matrix)
+    employees, shifts = ns["employees"], ns["shifts"]
+    num_days, off_idx = ns["num_days"], ns["off_idx"]
+    per_emp, per_day = shift_counts(ns, arr)
+    records = []
+
+    # 1. 活动需求：所有活动行的 (天, 班次) 一次取出实到人数
+    acts = ns["activities"]
+    a_day = np.array([a["day"] for a in acts], dtype=np.int64)
+    a_shift = np.array([a["shift"] for a in acts], dtype=np.int64)
+    a_req = np.array([a["req"] for a in acts], dtype=np.int64)
+    actual = per_day[a_day, a_shift]
+    for i in np.nonzero(actual < a_req)[0]:
+        records.append(_record("activity", "error", day=int(a_day[i]), shift=shifts[a_shift[i]],
+                               actual=int(actual[i]), target=int(a_req[i])))
+    if not (actual < a_req).any(): records.append(_record("activity", "pass"))
+
+    # 2. 每日基线
+    base_idx = [s for s, v in ns["min_staff"].items() if v > 0]
+    if base_idx:
+        targets = np.array([ns["min_staff"][s] for s in base_idx])
+        short = per_day[:, base_idx] < targets
+        for d, j in zip(*np.nonzero(short)):
+            records.append(_record("baseline", "error", day=int(d), shift=shifts[base_idx[j]],
+                                   actual=int(per_day[d, base_idx[j]]), target=int(targets[j])))
+    else:
+        short = np.zeros(0, dtype=bool)
+    if not short.any(): records.append(_record("baseline", "pass"))
+
+    # 3. 休息模式
+    target = ns["target_off_days"]
+    targets = np.asarray(ns.get("rest_targets") or [target] * len(employees))
+    rest = per_emp[:, off_idx]
+    bad = np.nonzero(rest != targets)[0]
+    for e in bad:
+        records.append(_record("rest", "error", employee=employees[e], actual=int(rest[e]), target=int(targets[e])))
+    if not len(bad): records.append(_record("rest", "pass", target=target))
+
+    # 4. 指定休息日 (含越界检查)：(员工 × 天) 的请求掩码与 "没排休息" 取交集
+    for e in ns["req_off_bad"]:
+        records.append(_record("req_off", "warn", employee=employees[e]))
+    wanted = np.zeros(arr.shape, dtype=bool)
+    for e, days in ns["req_off"].items():
+        wanted[e, days] = True
+    for e, d in zip(*np.nonzero(wanted & (arr != off_idx))):
+        records.append(_record("req_off", "error", employee=employees[e], day=int(d), shift=shifts[arr[e, d]],
+                               target=shifts[off_idx]))
+    for e, days in ns["req_off_ignored"].items():
+        for d in days:
+            records.append(_record("req_off", "warn", employee=employees[e], day=d, target=num_days))
+    if not (wanted & (arr != off_idx)).any(): records.append(_record("req_off", "pass"))
+
+    # 5. 每日平衡 / 6. 工时公平
+    for s_idx in ns["work_idx"]:
+        if ns["min_staff"].get(s_idx, 0) == 0: continue
+        diff = int(np.ptp(per_day[:, s_idx]))
+        thr = ns["diff_daily_threshold"]
+        records.append(_record("daily_balance", "error" if diff > thr else "pass", shift=shifts[s_idx],
+                               actual=diff, target=thr))
+    prior = np.zeros_like(per_emp)
+    for e, counts in ns.get("prior_counts", {}).items():
+        for s_idx, v in counts.items(): prior[e, s_idx] = v
+    mask = availability(ns)
+    for s_idx in ns["work_idx"]:
+        # 只在能上这个班次的人之间比较
+        vals = (per_emp[:, s_idx] + prior[:, s_idx])[mask[:, s_idx]]
+        diff = int(np.ptp(vals)) if len(vals) else 0
+        thr = ns["diff_period_threshold"]
+        records.append(_record("period_balance", "error" if diff > thr else "pass", shift=shifts[s_idx],
+                               actual=diff, target=thr))
+
+    # 7. 连班
+    runs = max_runs(arr != off_idx, ns.get("history_run"))
+    limit = ns["max_consecutive"]
+    bad = np.nonzero(runs > limit)[0]
+    for e in bad:
+        records.append(_record("consecutive", "error", employee=employees[e], actual=int(runs[e]), target=limit))
+    if not len(bad): records.append(_record("consecutive", "pass", target=limit))
+
+    # 8. 晚转早 (只有开启了这个功能才检测)
+    if ns["no_night_to_day"]:
+        night = shifts[ns["night_idx"]]
+        # 跨期衔接：上期最后一天晚班 -> 本期第一天早班，记为 day = -1
+        prev = np.asarray([s == night for s in ns.get("last_shift", [])] or [False] * len(employees))
+        hits = np.concatenate([(prev & (arr[:, 0] == ns["day_idx"]))[:, None],
+                               (arr[:, :-1] == ns["night_idx"]) & (arr[:, 1:] == ns["day_idx"])], axis=1)
+        for e, d in zip(*np.nonzero(hits)):
+            records.append(_record("fatigue", "error", employee=employees[e], day=int(d) - 1,
+                                   shift=night, target=shifts[ns["day_idx"]]))
+        if not hits.any(): records.append(_record("fatigue", "pass"))
+
+    # 9. 时段覆盖 (只有给了时段需求才检测)：人手不足的连续时段逐段报告，shift 字段是时间段
+    if ns.get("demand"):
+        gaps = understaffed(ns, per_day)
+        for d, t0, t1, actual, target in gaps:
+            records.append(_record("coverage", "error", day=d, shift=span_label(t0, t1, ns["slot_minutes"]),
+                                   actual=actual, target=target))
+        if not gaps: records.append(_record("coverage", "pass"))
+
+    # 10. 周末轮休 (跨期公平的目标，只提醒不算错)：本期休的周末日少于目标的人
+    relief = ns.get("weekend_relief") or {}
+    if relief:
+        idx = np.fromiter(relief, dtype=np.int64)
+        target = np.fromiter(relief.values(), dtype=np.int64)
+        rested = (arr[idx][:, ns["weekend_days"]] == off_idx).sum(axis=1)
+        for e, actual, k in zip(idx[rested < target], rested[rested < target], target[rested < target]):
+            records.append(_record("weekend_relief", "warn", employee=employees[e], actual=int(actual), target=int(k)))
+        if (rested >= target).all(): records.append(_record("weekend_relief", "pass"))
+
+    return records
+
+
+def failures(records):
+    return [r for r in records if r["severity"] == "error"]
+
+
+# --- 渲染 ---
+def _message(ns, r):
+    check, sev = r["check"], r["severity"]
+    d = r["day"]
+    if check == "activity":
+        if sev == "pass": return "✅ 所有活动需求已满足"
+        return f"❌ {ns['date_headers'][d]} {r['shift']}: 实到{r['actual']} / 需{r['target']}"
+    if check == "baseline":
+        if sev == "pass": return "✅ 每日基线全部达标"
+        return f"❌ 第{d+1}天 {r['shift']}: 实到{r['actual']} / 需{r['target']}"
+    if check == "rest":
+        if sev == "pass": return f"✅ 全员休息天数达标 ({r['target']}天)"
+        return f"❌ {r['employee']}: 休了 {r['actual']} 天 (目标 {r['target']})"
+    if check == "req_off":
+        if sev == "pass": return "✅ 指定休息日全部满足 (范围内)"
+        if sev == "warn" and d is None: return f"⚠️ {r['employee']} 的休息日格式输入错误"
+        if sev == "warn": return f"⚠️ {r['employee']} 指定第 {d+1} 天休息，但当前排班只有 {r['target']} 天 (已忽略)"
+        return f"❌ {r['employee']} 指定在 {ns['date_headers'][d]} (第{d+1}天) 休息，但排了: {r['shift']}"
+    if check == "daily_balance":
+        if sev == "pass": return f"✅ {r['shift']}: 波动 {r['actual']} (达标)"
+        return f"❌ {r['shift']}: 波动 {r['actual']} (阈值 {r['target']})"
+    if check == "period_balance":
+        if sev == "pass": return f"✅ {r['shift']}: 差异 {r['actual']} (达标)"
+        return f"❌ {r['shift']}: 差异 {r['actual']} (阈值 {r['target']})"
+    if check == "consecutive":
+        if sev == "pass": return f"✅ 连班检测通过 (上限 {r['target']})"
+        return f"❌ {r['employee']} 连班 {r['actual']} 天 (限 {r['target']})"
+    if check == "fatigue":
+        if sev == "pass": return "✅ 无晚转早违规"
+        if d == -1: return f"❌ {r['employee']}: 上期末{r['shift']} -> 第1天{r['target']} (严重疲劳 硬性条件规则导致)"
+        return f"❌ {r['employee']}: 第{d+1}天{r['shift']} -> 第{d+2}天{r['target']} (严重疲劳 硬性条件规则导致)"
+    if check == "coverage":
+        if sev == "pass": return "✅ 所有时段在岗人数达标"
+        return f"❌ {ns['date_headers'][d]} {r['shift']}: 在岗{r['actual']} / 需{r['target']}"
+    if check == "weekend_relief":
+        if sev == "pass": return "✅ 周末轮休目标全部满足"
+        return f"⚠️ {r['employee']}: 本期休了 {r['actual']} 个周末日 (轮休目标 {r['target']})"
+    return str(r)
+
+
+_CSS = {"error": "log-err", "warn": "log-warn", "pass": "log-pass"}
+
+
+def render_html(ns, records):
+    """结构化审计记录 -> 审计日志 HTML 片段列表 (按 CHECKS 顺序分组)。"""
+    by_check = {}
+    for r in records:
+        by_check.setdefault(r["check"], []).append(r)
+    logs = []
+    for check, title in CHECKS:
+        if check == "fatigue" and not ns["no_night_to_day"]: continue
+        if check == "coverage" and not ns.get("demand"): continue
+        if check == "weekend_relief" and not ns.get("weekend_relief"): continue
+        logs.append(f"<div class='log-header'>{title}</div>")
+        for r in by_check.get(check, []):
+            logs.append(f"<div class='log-item {_CSS[r['severity']]}'>{_message(ns, r)}</div>")
+    return logs
@@ -0,0 +1,125 @@
+"""批量排班 CLI：从 stdin 或文件读取 NDJSON (每行一份 spec)，多进程并行求解。
+
+    python -m scheduler.batch stores.ndjson -j 8 -o results.ndjson
+    cat stores.ndjson | python -m scheduler.batch --time-limit 10
+    python -m scheduler.batch stores.ndjson -o results.ndjson --xlsx 全部门店.xlsx
+
+每完成一家门店就立即输出一行结果 (完成顺序，不保证与输入顺序一致)，
+结果里的 ``line`` 字段对应输入的行号。给了 --xlsx 时，有解的门店同时按完成顺序各写一张表到同一个工作簿。
+"""
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .cache import SolutionCache
+from .engine import normalize_spec, solve
+from .export import ScheduleWorkbook
+from .horizon import solve_rolling
+from .profiles import SOLVER_PROFILES
+from .runlog import append as append_run_log
+from .runlog import run_record
+
+_cache = None
+
+
+def _init_worker(cache_dir):
+    # 每个工作进程各自持有一个缓存实例，磁盘层在进程间共享
+    global _cache
+    _cache = SolutionCache(cache_dir=cache_dir) if cache_dir else None
+
+
+def _solve_line(line_no, text, time_limit, num_workers, profile, window=None, overlap=7, run_log=None):
+    try:
+        ns = normalize_spec(json.loads(text))
+        kw = dict(time_limit=time_limit, num_workers=num_workers, cache=_cache, profile=profile)
+        result = solve_rolling(ns, window, overlap, **kw) if window else solve(ns, **kw)
+    except Exception as exc:  # 单店出错不能拖垮整批
+        return {"line": line_no, "status": "ERROR", "error": f"{type(exc).__name__}: {exc}"}
+    if run_log: append_run_log(run_record(ns, result), run_log)
+    result["line"] = line_no
+    return result
+
+
+def _read_specs(stream):
+    for line_no, text in enumerate(stream, 1):
+        if text.strip(): yield line_no, text
+
+
+def run_batch(stream, out, jobs=None, time_limit=None, num_workers=None, cache_dir=None, profile=None,
+              window=None, overlap=7, run_log=None, xlsx=None):
+    """流式读取 spec 并以进程池求解，结果按完成顺序写入 out。返回失败数。
+
+    给了 window 时每店按滚动时域求解 (见 horizon 模块)，time_limit 按每个窗口计。
+    给了 run_log 时每店的诊断信息追加到这个 JSON Lines 文件 (见 runlog 模块)。
+    给了 xlsx (路径) 时有解的门店各写一张表 (表名取 store，缺省用行号)，见 export 模块。
+    """
+    jobs = jobs or os.cpu_count() or 1
+    # 每个进程里的 CP-SAT 默认会吃满所有核，这里按进程数平分
+    num_workers = num_workers or max(1, (os.cpu_count() or 1) // jobs)
+    failed = 0
+    specs = _read_specs(stream)
+    book = ScheduleWorkbook(xlsx) if xlsx else None
+    texts = {}  # 写工作簿时要用原始 spec 还原表头，只保留在途任务的
+    try:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(cache_dir,)) as pool:
+            pending = set()
+            exhausted = False
+            while pending or not exhausted:
+                # 控制在途任务数量，避免一次把整个大文件读进内存
+                while not exhausted and len(pending) < jobs * 2:
+                    try:
+                        line_no, text = next(specs)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    fut = pool.submit(_solve_line, line_no, text, time_limit, num_workers, profile, window, overlap,
+                                      run_log)
+                    pending.add(fut)
+                    if book is not None: texts[fut] = text
+                if not pending: break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    result = fut.result()
+                    if result["status"] not in ("OPTIMAL", "FEASIBLE"): failed += 1
+                    text = texts.pop(fut, None)
+                    if book is not None and result.get("matrix") is not None:
+                        book.add(result.get("store") or f"第{result['line']}行", normalize_spec(json.loads(text)),
+                                 result["matrix"])
+                    out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                    out.flush()
+    finally:
+        if book is not None: book.close()
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m scheduler.batch", description="NDJSON 批量排班")
+    parser.add_argument("input", nargs="?", default="-", help="NDJSON 文件，缺省或 '-' 表示 stdin")
+    parser.add_argument("-o", "--output", default="-", help="输出 NDJSON 文件，缺省为 stdout")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="并行进程数，缺省为 CPU 核数")
+    parser.add_argument("--time-limit", type=float, default=None, help="单店求解时间上限 (秒)，缺省用档位设定")
+    parser.add_argument("--profile", default=None, choices=[*SOLVER_PROFILES, "auto"], help="求解档位，缺省 balanced")
+    parser.add_argument("--workers", type=int, default=None, help="单店 CP-SAT 搜索线程数")
+    parser.add_argument("--cache-dir", default=None, help="结果缓存目录，相同输入直接复用已有结果")
+    parser.add_argument("--window", type=int, default=None, help="滚动排班的窗口天数，缺省整段一次求解")
+    parser.add_argument("--overlap", type=int, default=7, help="滚动排班相邻窗口的重叠天数")
+    parser.add_argument("--run-log", default=None, help="把每店的阶段耗时 / 求解统计追加到这个 JSON Lines 文件")
+    parser.add_argument("--xlsx", default=None, help="把有解的门店写进同一个 Excel 工作簿，一店一张表")
+    args = parser.parse_args(argv)
+
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    dst = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        failed = run_batch(src, dst, jobs=args.jobs, time_limit=args.time_limit, num_workers=args.workers,
+                           cache_dir=args.cache_dir, profile=args.profile, window=args.window, overlap=args.overlap,
+                           run_log=args.run_log, xlsx=args.xlsx)
+    finally:
+        if src is not sys.stdin: src.close()
+        if dst is not sys.stdout: dst.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""基准测试：可复现的合成实例 + 求解性能报告，改动建模或求解参数前后各跑一次，对比报告就能发现退化。
+
+    python -m scheduler.bench gen --suite default --seed 7 > instances.ndjson
+    python -m scheduler.bench run --suite smoke --time-limit 10 -o before.json
+    python -m scheduler.bench run instances.ndjson --profile fast -o after.json
+    python -m scheduler.bench compare before.json after.json
+
+实例由 generate 按随机种子生成，规模覆盖 人数 10→2000、天数 7→92、班次 3→8，活动和个人需求按密度随机撒。
+每个实例在独立的子进程里求解，记录：建模耗时、第一个可行解的时刻 (从调用 solve 起算)、
+固定时间点 (BUDGETS) 上的最好目标值、最终目标值 / 下界 / gap，以及子进程的峰值内存。
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import ortools
+
+from .engine import normalize_spec, solve, suggested_baseline
+
+SHIFT_NAMES = ["早班", "晚班", "中班", "早二", "晚二", "中二", "夜班", "通宵"]
+START_DATE = datetime.date(2026, 1, 5)  # 周一，保证同一种子生成的实例完全一样
+BUDGETS = [1, 5, 10, 30, 60]
+
+# (人数, 天数, 班次数)；活动 / 个人需求密度统一用命令行参数
+SUITES = {
+    "smoke": [(10, 7, 3), (30, 14, 3), (50, 14, 4)],
+    "default": [(10, 7, 3), (50, 14, 3), (50, 28, 5), (200, 14, 3), (200, 28, 4), (500, 28, 4), (1000, 14, 3)],
+    "full": [(10, 7, 3), (50, 28, 5), (100, 92, 8), (200, 28, 4), (200, 92, 4), (500, 28, 6), (1000, 28, 3),
+             (2000, 14, 3), (2000, 28, 8)],
+}
+
+
+# --- 实例生成 ---
+def generate(n_employees, num_days, n_shifts=3, activity_density=0.2, preference_density=0.3, seed=0):
+    """生成一份 spec。n_shifts 是工作班次数 (另加一个 休)；同样的参数和种子总是得到同一份 spec。"""
+    if not 1 <= n_shifts <= len(SHIFT_NAMES): raise ValueError(f"班次数必须在 1 到 {len(SHIFT_NAMES)} 之间")
+    rng = random.Random(f"{seed}-{n_employees}-{num_days}-{n_shifts}-{activity_density}-{preference_density}")
+    work = SHIFT_NAMES[:n_shifts]
+    employees = [f"员工{i:04d}" for i in range(n_employees)]
+    target_off = num_days // 7
+    base = max(1, suggested_baseline(n_employees, num_days, target_off, n_shifts))
+    dates = [START_DATE + datetime.timedelta(days=d) for d in range(num_days)]
+
+    preferences = []
+    for name in employees:
+        if rng.random() >= preference_density: continue
+        row = {"姓名": name}
+        kind = rng.choice(["refuse", "reduce", "req_off"])
+        if kind == "refuse" and n_shifts > 1: row["拒绝班次(强)"] = rng.choice(work)
+        elif kind == "reduce": row["减少班次(弱)"] = rng.choice(work)
+        else: row["指定休息日"] = ",".join(str(d) for d in sorted(rng.sample(range(1, num_days + 1), min(2, num_days))))
+        preferences.append(row)
+
+    activities = []
+    for d in dates:
+        if rng.random() >= activity_density: continue
+        activities.append({"活动名称": f"活动{len(activities) + 1}", "日期": d.isoformat(), "指定班次": rng.choice(work),
+                           "所需人数": base + rng.randint(1, max(1, base // 4))})
+
+    return {
+        "store": f"E{n_employees}-D{num_days}-S{n_shifts}-a{activity_density}-p{preference_density}-s{seed}",
+        "employees": employees,
+        "shifts": work + ["休"],
+        "start_date": dates[0].isoformat(), "end_date": dates[-1].isoformat(),
+        "target_off_days": target_off,
+        "max_consecutive": 6,
+        "min_staff_per_shift": {s: max(1, base - rng.randint(0, 1)) for s in work},
+        "diff_daily_threshold": 1, "diff_period_threshold": 2,
+        "no_night_to_day": n_shifts > 1, "night_shift": work[1] if n_shifts > 1 else None, "day_shift": work[0],
+        "preferences": preferences,
+        "activities": activities,
+    }
+
+
+def suite(name, seed=0, activity_density=0.2, preference_density=0.3):
+    return [generate(e, d, s, activity_density, preference_density, seed) for e, d, s in SUITES[name]]
+
+
+# --- 测量 ---
+def best_at(stamps, t):
+    """到第 t 秒为止找到的最好目标值；那时还没有解则为 None。"""
+    objs = [obj for at, obj in stamps if at <= t]
+    return min(objs) if objs else None
+
+
+def measure(spec, time_limit=None, profile=None):
+    """求解一份 spec 并记录性能指标 (在调用方的进程里运行，峰值内存是整个进程的)。"""
+    ns = normalize_spec(spec)
+    stamps = []
+    # 从调用 solve 起计时：分组计数模型 (aggregate_seconds)、预检和建模的时间都已算在首解时刻里，不能再加一遍
+    t0 = time.monotonic()
+    result = solve(ns, time_limit=time_limit, profile=profile,
+                   on_solution=lambda info: stamps.append((time.monotonic() - t0, info["objective"])))
+    elapsed = time.monotonic() - t0
+    agg = result["aggregate"] or {}
+    if not stamps and result["matrix"] is not None: stamps.append((elapsed, result["objective"]))
+    limit = time_limit or elapsed
+    return {
+        "name": ns["store"],
+        "employees": len(ns["employees"]), "days": ns["num_days"], "shifts": len(ns["work_idx"]),
+        "status": result["status"],
+        "build_seconds": result["build"]["seconds"] if result["build"] else None,
+        "variables": result["build"]["variables"] if result["build"] else None,
+        "aggregate_seconds": agg.get("seconds"),
+        "first_solution": stamps[0][0] if stamps else None,
+        "objective_at": {str(t): best_at(stamps, t) for t in BUDGETS if t <= limit},
+        "objective": result["objective"], "bound": result["bound"], "gap": result["gap"],
+        "wall_seconds": elapsed,
+        # Linux 下 ru_maxrss 的单位是 KB
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_suite(specs, time_limit=None, profile=None, on_row=None):
+    """每个实例一个全新的子进程，峰值内存互不干扰。返回报告 dict。"""
+    rows = []
+    for spec in specs:
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            try:
+                row = pool.submit(measure, spec, time_limit, profile).result()
+            except Exception as exc:  # 单个实例出错 (含内存不足被杀) 不影响其余
+                row = {"name": spec.get("store"), "status": "ERROR", "error": f"{type(exc).__name__}: {exc}"}
+        rows.append(row)
+        if on_row is not None: on_row(row)
+    meta = {"created": datetime.datetime.now().isoformat(timespec="seconds"), "ortools": ortools.__version__,
+            "python": platform.python_version(), "cpu_count": os.cpu_count(), "time_limit": time_limit,
+            "profile": profile}
+    return {"meta": meta, "rows": rows}
+
+
+# --- 对比 ---
+def compare(old, new, tolerance=0.1):
+    """逐实例对比两份报告，返回退化项 [(实例, 指标, 旧值, 新值)]。
+
+    目标值 (各时间点和最终) 越小越好，变差即退化；耗时和内存超过 tolerance 比例才算退化；
+    旧报告有解、新报告没有解同样算退化。
+    """
+    before = {r["name"]: r for r in old["rows"]}
+    out = []
+    for r in new["rows"]:
+        o = before.get(r["name"])
+        if o is None: continue
+        if o.get("objective") is not None and r.get("objective") is None:
+            out.append((r["name"], "status", o["status"], r["status"]))
+            continue
+        for t, v in r.get("objective_at", {}).items():
+            ov = o.get("objective_at", {}).get(t)
+            if ov is not None and (v is None or v > ov): out.append((r["name"], f"objective@{t}s", ov, v))
+        if o.get("objective") is not None and r["objective"] > o["objective"]:
+            out.append((r["name"], "objective", o["objective"], r["objective"]))
+        for key in ("build_seconds", "first_solution", "peak_rss_mb"):
+            ov, v = o.get(key), r.get(key)
+            if ov is not None and v is not None and v > ov * (1 + tolerance) and v - ov > 0.05:
+                out.append((r["name"], key, ov, v))
+    return out
+
+
+def _read_specs(path):
+    src = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        return [json.loads(text) for text in src if text.strip()]
+    finally:
+        if src is not sys.stdin: src.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m scheduler.bench", description="求解器基准测试")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    for name in ("gen", "run"):
+        p = sub.add_parser(name, help="生成实例 NDJSON" if name == "gen" else "跑基准并写出报告")
+        if name == "run": p.add_argument("input", nargs="?", default=None, help="实例 NDJSON (- 为 stdin)，缺省用 --suite")
+        p.add_argument("--suite", choices=list(SUITES), default="smoke", help="内置实例集")
+        p.add_argument("--seed", type=int, default=0, help="随机种子")
+        p.add_argument("--activity-density", type=float, default=0.2, help="每天出现活动需求的概率")
+        p.add_argument("--preference-density", type=float, default=0.3, help="每人带个人需求的概率")
+        if name == "run":
+            p.add_argument("--time-limit", type=float, default=None, help="每个实例的时间上限，缺省用档位设定")
+            p.add_argument("--profile", default=None, help="求解档位")
+            p.add_argument("-o", "--output", default="-", help="报告输出路径，缺省为 stdout")
+    p = sub.add_parser("compare", help="对比两份报告，有退化时返回码为 1")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--tolerance", type=float, default=0.1, help="耗时 / 内存允许变慢的比例")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "compare":
+        with open(args.old, encoding="utf-8") as f: old = json.load(f)
+        with open(args.new, encoding="utf-8") as f: new = json.load(f)
+        regressions = compare(old, new, args.tolerance)
+        for name, key, ov, v in regressions:
+            print(f"{name}  {key}: {ov} -> {v}")
+        print(f"共 {len(new['rows'])} 个实例，{len(regressions)} 项退化", file=sys.stderr)
+        return 1 if regressions else 0
+
+    specs = _read_specs(args.input) if getattr(args, "input", None) else \
+        suite(args.suite, args.seed, args.activity_density, args.preference_density)
+    if args.cmd == "gen":
+        for spec in specs:
+            print(json.dumps(spec, ensure_ascii=False))
+        return 0
+
+    def progress(row):
+        print(f"{row['name']}  {row['status']}  首解 {row.get('first_solution')}  目标 {row.get('objective')}",
+              file=sys.stderr)
+
+    report = run_suite(specs, args.time_limit, args.profile, on_row=progress)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f: f.write(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""内容寻址的排班结果缓存。
+
+键是归一化 spec 的规范化哈希 (员工、班次、日期、基线、活动、个人需求、阈值与开关)，
+值只保存求解出的 res_matrix；命中时由调用方按当前 spec 重新生成审计，不再调用求解器。
+求解档位、参数覆盖、目标模式、分组模式和热启动提示都算进键里。时间 / gap 这类搜索预算不进键，
+而是随条目保存：OPTIMAL 的解与时间预算无关 (gap 要求不比这次松即可命中)；
+时间到了的 FEASIBLE 解只有在当时的预算不小于这次请求时才算命中，给更多时间重跑会重新求解并覆盖旧条目。
+
+两级存储：进程内有上限的 LRU + 磁盘目录 (每个键一个 JSON 文件，Streamlit 重启后仍有效)。
+内存一级只对长驻进程里的调用方有用 (批量的进程池 worker、JobQueue 提交时的预查)；后台任务的子进程每次新建，只用得上磁盘。
+"""
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "SCHEDULE_AI_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "schedule-ai", "solutions"))
+
+# 不影响求解结果的字段，不参与哈希
+_KEY_EXCLUDE = {"store"}
+
+
+def cache_key(ns, **options):
+    """归一化 spec (+ 影响模型的求解选项) 的 sha256。"""
+    payload = {k: v for k, v in ns.items() if k not in _KEY_EXCLUDE}
+    payload["_options"] = options
+    blob = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def covers(entry, budget):
+    """缓存条目是否满足这次的搜索预算 {time_limit, stage_time_limit, gap_limit, no_improve_seconds}。"""
+    if budget is None: return True
+    old = entry.get("budget")
+    # 达到 gap_limit 时 CP-SAT 也报 OPTIMAL：只有当时的 gap 要求不比这次松，才与时间预算无关
+    if entry.get("status") == "OPTIMAL": return not old or old["gap_limit"] <= budget["gap_limit"]
+    if not old: return False
+    # None 表示不设这条停止规则，比任何有限值都宽
+    wider = lambda a, b: a is None or (b is not None and a >= b)
+    return (old["time_limit"] >= budget["time_limit"] and old["gap_limit"] <= budget["gap_limit"]
+            and wider(old["stage_time_limit"], budget["stage_time_limit"])
+            and wider(old["no_improve_seconds"], budget["no_improve_seconds"]))
+
+
+class SolutionCache:
+    def __init__(self, max_entries=256, cache_dir=DEFAULT_CACHE_DIR):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._mem = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if cache_dir: os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key, budget=None):
+        """取条目；给了 budget 时，预算不够的 FEASIBLE 条目当作未命中 (见 covers)。"""
+        entry = self._mem.get(key)
+        if entry is not None and not covers(entry, budget):
+            self.misses += 1
+            return None
+        if entry is not None:
+            self._mem.move_to_end(key)
+            self.hits += 1
+            return entry
+        if self.cache_dir:
+            try:
+                with open(self._path(key), encoding="utf-8") as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                entry = None
+            if entry is not None and covers(entry, budget):
+                self._remember(key, entry)
+                self.hits += 1
+                return entry
+        self.misses += 1
+        return None
+
+    def put(self, key, entry):
+        self._remember(key, entry)
+        if not self.cache_dir: return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 先写临时文件再原子替换，多进程同时写同一个键也不会留下半截文件
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp): os.remove(tmp)
+
+    def _remember(self, key, entry):
+        self._mem[key] = entry
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def clear(self, disk=False):
+        self._mem.clear()
+        if disk and self.cache_dir:
+            for root, _, files in os.walk(self.cache_dir):
+                for name in files:
+                    if name.endswith(".json"): os.remove(os.path.join(root, name))
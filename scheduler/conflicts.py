@@ -0,0 +1,86 @@
+"""无解时的最小冲突集 (conflict core)。
+
+建模时给每组硬约束挂一个假设文字 (assumption literal)：平时基线按 日期×班次、
+休息天数规则整体一组、活动按行、0排班禁令按班次。去掉目标函数、只带假设求一次可行性，
+CP-SAT 给出一组足以导致无解的假设，再逐个试删把它收缩到最小 —— 删掉其中任何一组都能有解。
+"""
+import time
+
+from ortools.sat.python import cp_model
+
+
+def _infeasible_subset(model, lits, time_limit):
+    """lits 全部成立时无解则返回 CP-SAT 给出的充分子集，有解返回 []，判不出来 (超时) 返回 None。"""
+    model.ClearAssumptions()
+    model.AddAssumptions(lits)
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = max(0.1, time_limit)
+    solver.parameters.num_search_workers = 1  # 假设核只在单线程下可用
+    status = solver.Solve(model)
+    if status == cp_model.INFEASIBLE:
+        by_index = {lit.Index(): lit for lit in lits}
+        return [by_index[i] for i in solver.SufficientAssumptionsForInfeasibility() if i in by_index]
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE): return []
+    return None
+
+
+def minimal_core(model, lits, time_limit=10.0):
+    """返回最小的不可满足假设子集；本身可行或超时返回 None。
+
+    收缩是删除式的：去掉一个假设后仍无解就永久删掉 (并换成新给出的更小子集)，
+    否则它属于核心。时间用完时返回当前的子集 (仍然无解，但不保证最小)。
+    """
+    deadline = time.monotonic() + time_limit
+    core = _infeasible_subset(model, lits, time_limit)
+    if not core: return None
+    i = 0
+    while i < len(core) and time.monotonic() < deadline:
+        rest = core[:i] + core[i + 1:]
+        sub = _infeasible_subset(model, rest, deadline - time.monotonic())
+        if sub:
+            # 子集里可能又少了几组，已检查过的前 i 个仍按顺序保留在前面
+            kept = {lit.Index() for lit in sub}
+            core = [lit for lit in rest if lit.Index() in kept]
+            i = sum(1 for lit in core[:i] if lit.Index() in kept)
+        elif sub is None:
+            break
+        else:
+            i += 1
+    model.ClearAssumptions()
+    return core
+
+
+def describe(ns, group):
+    """约束组 -> 页面上可读的一行。"""
+    kind = group["kind"]
+    headers, shifts = ns["date_headers"], ns["shifts"]
+    if kind == "baseline":
+        return f"{headers[group['day']]} {shifts[group['shift']]} 基线 {group['target']} 人"
+    if kind == "rest":
+        targets = set(ns["rest_targets"])
+        if len(targets) > 1: return f"每人恰好休满各自的目标天数 (共 {len(ns['employees'])} 人)"
+        return f"每人恰好休息 {targets.pop()} 天 (共 {len(ns['employees'])} 人)"
+    if kind == "activity":
+        a = ns["activities"][group["row"]]
+        name = a["name"] or f"第 {group['row'] + 1} 行活动"
+        return f"{name} ({headers[a['day']]} {shifts[a['shift']]} 需 {a['req']} 人)"
+    if kind == "ban":
+        return f"{shifts[group['shift']]} 基线为 0 (禁止排班)"
+    return str(group)
+
+
+def conflict_rows(ns, guards, core):
+    """把核心里的假设文字映射回 [{kind, day, shift, message}]，按日期排序。"""
+    by_index = {lit.Index(): group for lit, group in guards}
+    rows = []
+    for lit in core:
+        group = by_index[lit.Index()]
+        day = group.get("day")
+        if group["kind"] == "activity": day = ns["activities"][group["row"]]["day"]
+        shift = group.get("shift")
+        if group["kind"] == "activity": shift = ns["activities"][group["row"]]["shift"]
+        rows.append({"kind": group["kind"], "day": day,
+                     "shift": ns["shifts"][shift] if shift is not None else None,
+                     "message": describe(ns, group)})
+    rows.sort(key=lambda r: (r["day"] is None, r["day"] or 0))
+    return rows
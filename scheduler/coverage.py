@@ -0,0 +1,197 @@
+"""时段需求：班次带起止时间，需求按 slot_minutes (缺省 30 分钟) 一格给出每天的在岗人数曲线。
+
+    "shift_times": {"早班": "08:00-16:00", "中班": "12:00-20:00", "晚班": "16:00-24:00", "通宵": "22:00-06:00"},
+    "slot_minutes": 30,
+    "demand": [{"日期": "周六", "开始": "10:00", "结束": "14:00", "人数": 4}],    # 行：日期为空表示每天
+    或 "demand": {"2026-10-17": [0, 0, ..., 3, 3, ...], "周日": [...], "*": [...]}    # 每天一条曲线 (每格人数)
+
+日期可以是 ISO 日期、"MM-DD 周X"、"周X" 或留空 (每天)，同一格有多条需求时取最大值。
+班次到时段的覆盖关系预先算成稀疏表 shift_slots {班次: [时段, ...]}，跨午夜的班次在次日的时段编号从 T 起。
+每天的时段按 "由哪些 (天, 班次) 覆盖" 归并：覆盖集合相同的连续时段只需一条约束 (需求取段内最大值)，
+约束直接用每天各班次的人数表达式，不逐人展开，48 格 × 31 天 × 十几个班次模板也只有几百条线性约束。
+缺口按 人·时段 计罚 (coverage 族)，审计把人手不足的连续时段逐段列出。
+基线为 0 的班次缺省照常禁排，不计入覆盖；spec 里 demand_enables_zero 为真时，时段需求用到的这类班次
+解除 0排班禁令，排多少人由需求决定。
+"""
+import re
+
+import numpy as np
+
+DAY_MINUTES = 24 * 60
+ALL_DAYS = ("", "*", "每天", "全部")
+WEEKDAYS = ("周一", "周二", "周三", "周四", "周五", "周六", "周日")
+
+
+def _empty(v):
+    return v is None or (isinstance(v, float) and v != v) or not str(v).strip()
+
+
+def parse_clock(text):
+    """"08:00" / "8:30" / "24:00" -> 分钟数。"""
+    m = re.fullmatch(r"\s*(\d{1,2})[:：](\d{2})(?::\d{2})?\s*", str(text))
+    if not m or int(m[1]) > 24 or int(m[2]) >= 60 or int(m[1]) * 60 + int(m[2]) > DAY_MINUTES:
+        raise ValueError(f"时间格式错误: {text}")
+    return int(m[1]) * 60 + int(m[2])
+
+
+def parse_span(text):
+    """"08:00-16:00" -> (开始, 结束) 分钟；结束不晚于开始视为跨午夜，结束加一天。"""
+    parts = re.split(r"\s*[-~～—至到]\s*", str(text).strip())
+    if len(parts) != 2: raise ValueError(f"时间段格式错误: {text}")
+    start, end = parse_clock(parts[0]), parse_clock(parts[1])
+    if end <= start: end += DAY_MINUTES
+    return start, end
+
+
+def clock_label(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def span_label(t0, t1, slot_minutes):
+    """时段 [t0, t1) -> "10:00-12:00"。"""
+    return f"{clock_label(t0 * slot_minutes)}-{clock_label(min(t1 * slot_minutes, DAY_MINUTES))}"
+
+
+def shift_slots(spans, slot_minutes):
+    """{班次下标: (开始, 结束)} -> {班次下标: [完整落在班次内的时段]}，次日的时段编号为 T + t。"""
+    T = DAY_MINUTES // slot_minutes
+    out = {}
+    for s, (start, end) in spans.items():
+        lo, hi = -(-start // slot_minutes), min(end // slot_minutes, 2 * T)
+        out[s] = list(range(lo, hi))
+    return out
+
+
+def coverage_matrix(slots, n_shifts, T):
+    """稀疏表展开成 (班次 × 2T) 的布尔矩阵：前 T 列是当天，后 T 列是次日。"""
+    C = np.zeros((n_shifts, 2 * T), dtype=bool)
+    for s, ts in slots.items():
+        C[s, ts] = True
+    return C
+
+
+def demand_curves(raw, start_date, num_days, T, slot_minutes, day_lookup):
+    """原始需求 (行列表或 {日期: 曲线}) -> (天 × 时段) 的整数数组。day_lookup 为 {日期文本: 天下标}。"""
+    need = np.zeros((num_days + 1, T), dtype=np.int64)  # 多一天接住最后一天跨午夜的需求，最后丢掉
+    weekday = [(start_date.weekday() + d) % 7 for d in range(num_days)]
+
+    def days_of(key):
+        key = "" if _empty(key) else str(key).strip()
+        if key in ALL_DAYS: return list(range(num_days))
+        if key in WEEKDAYS: return [d for d in range(num_days) if weekday[d] == WEEKDAYS.index(key)]
+        d = day_lookup.get(key)
+        return [] if d is None else [d]
+
+    if isinstance(raw, dict):
+        for key, curve in raw.items():
+            curve = [0 if v is None else int(v) for v in curve]
+            if len(curve) != T: raise ValueError(f"{key} 的需求曲线应有 {T} 格 (每格 {slot_minutes} 分钟)，实际 {len(curve)} 格")
+            for d in days_of(key):
+                need[d] = np.maximum(need[d], curve)
+        return need[:num_days]
+
+    for row in raw or []:
+        span = row.get("时段")
+        if _empty(span):
+            if _empty(row.get("开始")) or _empty(row.get("结束")): continue
+            span = f"{row['开始']}-{row['结束']}"
+        start, end = parse_span(span)
+        try:
+            req = int(row.get("人数", row.get("所需人数")))
+        except (TypeError, ValueError):
+            continue
+        lo, hi = start // slot_minutes, -(-end // slot_minutes)
+        for d in days_of(row.get("日期")):
+            # 跨午夜的需求顺延到次日的时段
+            for t in range(lo, min(hi, 2 * T)):
+                need[d + t // T, t % T] = max(need[d + t // T, t % T], req)
+    return need[:num_days]
+
+
+def coverage_rows(need, C, carry):
+    """每天的时段按覆盖集合归并成约束行 [{day, start, end, cover: [[天, 班次], ...], req}]。
+
+    只有覆盖集合和需求都相同的相邻时段才并成一行，行内每个时段的缺口相同，罚分按 缺口 × 时段数 计。
+    carry 是第一天各时段由上期末班 (跨午夜) 已经覆盖的人数，从需求里先扣掉。
+    没有任何班次覆盖的时段不出约束 (建模无能为力)，留给审计报告。
+    """
+    D, T = need.shape
+    today = [tuple(np.nonzero(C[:, t])[0].tolist()) for t in range(T)]
+    spill = [tuple(np.nonzero(C[:, T + t])[0].tolist()) for t in range(T)]
+    rows = []
+    for d in range(D):
+        last = None
+        for t in range(T):
+            req = int(need[d, t]) - (int(carry[t]) if d == 0 else 0)
+            cover = [[d, s] for s in today[t]] + ([[d - 1, s] for s in spill[t]] if d > 0 else [])
+            if req <= 0 or not cover:
+                last = None
+                continue
+            if last is not None and last["cover"] == cover and last["req"] == req and last["end"] == t:
+                last["end"] = t + 1
+                continue
+            last = {"day": d, "start": t, "end": t + 1, "cover": cover, "req": req}
+            rows.append(last)
+    return rows
+
+
+def normalize_coverage(raw, shifts, s_map, off_idx, start_date, num_days, day_lookup, last_shift, locked=()):
+    """normalize_spec 里的时段部分：返回并入 ns 的字段。没有给班次时间或需求时覆盖约束为空。
+
+    locked 是不能用来覆盖时段的班次下标 (禁排的基线 0 班次)，它们的时间只保留在 shift_times 里。
+    """
+    slot_minutes = int(raw.get("slot_minutes") or 30)
+    if slot_minutes <= 0 or DAY_MINUTES % slot_minutes: raise ValueError("slot_minutes 必须能整除 1440 (如 15 / 30 / 60)")
+    T = DAY_MINUTES // slot_minutes
+    spans, shift_times = {}, {}
+    for name, text in (raw.get("shift_times") or {}).items():
+        name = str(name).strip()
+        if _empty(text): continue
+        if name not in s_map: raise ValueError(f"班次时间里的未知班次: {name}")
+        if s_map[name] == off_idx: continue
+        start, end = parse_span(text)
+        shift_times[name] = f"{clock_label(start)}-{clock_label(end % DAY_MINUTES)}"
+        if s_map[name] not in locked: spans[s_map[name]] = (start, end)
+    slots = shift_slots(spans, slot_minutes)
+    raw_demand = raw.get("demand")
+    if not raw_demand:
+        return {"slot_minutes": slot_minutes, "shift_times": shift_times, "shift_slots": slots, "demand": None,
+                "slot_carry": [0] * T, "coverage": [], "demand_shifts": []}
+    need = demand_curves(raw_demand, start_date, num_days, T, slot_minutes, day_lookup)
+    C = coverage_matrix(slots, len(shifts), T)
+    last = np.bincount([s_map[s] for s in last_shift], minlength=len(shifts))
+    carry = (last[:, None] * C[:, T:]).sum(axis=0)
+    rows = coverage_rows(need, C, carry)
+    return {"slot_minutes": slot_minutes, "shift_times": shift_times, "shift_slots": slots, "demand": need.tolist(),
+            "slot_carry": carry.tolist(), "coverage": rows,
+            "demand_shifts": sorted({s for r in rows for _, s in r["cover"]})}
+
+
+def slot_staffing(ns, per_day):
+    """(天 × 时段) 的在岗人数；per_day 为 (天 × 班次) 的人数 (见 audit.shift_counts)。"""
+    T = DAY_MINUTES // ns["slot_minutes"]
+    C = coverage_matrix(ns["shift_slots"], len(ns["shifts"]), T).astype(np.int64)
+    staffed = per_day @ C[:, :T]
+    staffed[1:] += per_day[:-1] @ C[:, T:]
+    staffed[0] += np.asarray(ns["slot_carry"], dtype=np.int64)
+    return staffed
+
+
+def understaffed(ns, per_day):
+    """人手不足的连续时段 [(天, 开始, 结束, 段内最少在岗, 段内最大需求)]。"""
+    if not ns.get("demand"): return []
+    need = np.asarray(ns["demand"], dtype=np.int64)
+    staffed = slot_staffing(ns, per_day)
+    short = staffed < need
+    out = []
+    for d in range(need.shape[0]):
+        t = 0
+        while t < need.shape[1]:
+            if not short[d, t]:
+                t += 1
+                continue
+            t1 = t
+            while t1 < need.shape[1] and short[d, t1]: t1 += 1
+            out.append((d, t, t1, int(staffed[d, t:t1].min()), int(need[d, t:t1].max())))
+            t = t1
+    return out
@@ -0,0 +1,1034 @@
+"""排班核心引擎 (不依赖 Streamlit)。
+
+输入是一份普通的 dict 规格 (spec)，可以直接来自 JSON / NDJSON：
+
+    {
+        "store": "A001",
+        "employees": ["张三", "李四", ...],
+        "shifts": ["早班", "中班", "晚班", "休"],
+        "start_date": "2026-10-12", "end_date": "2026-10-18",
+        "rest_mode": "做6休1",            # 或 "做5休2"，或直接给 "target_off_days"
+        "max_consecutive": 6,
+        "min_staff_per_shift": {"早班": 2, "中班": 2, "晚班": 2},
+        "diff_daily_threshold": 0, "diff_period_threshold": 2,
+        "no_night_to_day": true, "night_shift": "晚班", "day_shift": "早班",
+        "preferences": [{"姓名": "张三", "指定休息日": "1,3", "拒绝班次(强)": "", "减少班次(弱)": "",
+                         "不可排班次": "晚班"}],    # 不可排班次：硬性，这些格子不建变量
+        "availability": {"李四": ["早班", "中班"]},      # 可选：技能矩阵，只列能上的工作班次
+        "refuse_hard": false,                         # 可选：拒绝班次按硬性 (不可排) 处理
+        "activities": [{"活动名称": "双11爆发", "日期": "10-12 周一", "指定班次": "早班", "所需人数": 4}],
+        "history": {"张三": ["早班", "早班", "晚班"]},  # 可选：上期最后 N 天 (旧→新)
+        "rest_targets": {"张三": 2},                   # 可选：个人休息天数，覆盖 target_off_days
+        "prior_counts": {"张三": {"早班": 5}},         # 可选：同一考核期内已上的班次天数，计入工时公平
+        "weekend_relief": {"张三": 2},                 # 可选：本期至少休几个周末日 (跨期公平，单独计罚)
+        "shift_times": {"早班": "08:00-16:00", "晚班": "16:00-24:00"},  # 可选：班次起止时间，配合 demand
+        "demand": [{"日期": "周六", "开始": "10:00", "结束": "14:00", "人数": 4}],  # 可选：时段在岗人数 (见 coverage)
+        "demand_enables_zero": false  # 可选：时段需求可以启用基线为 0 的班次 (缺省否，这些班次照常禁排、不计覆盖)
+    }
+
+preferences / activities 的字段名与页面上的两个 data_editor 完全一致，
+页面可以直接把 ``DataFrame.to_dict("records")`` 传进来。
+"""
+import datetime
+import math
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+from ortools.sat.python import cp_model
+
+from .aggregate import build_count_model, counts_array, equivalent_groups, expand, worth_aggregating
+from .audit import audit, availability, schedule_array, shift_counts, shift_names
+from .cache import cache_key
+from .conflicts import conflict_rows, minimal_core
+from .coverage import normalize_coverage
+from .precheck import errors as precheck_errors
+from .precheck import precheck
+from .profiles import apply_params, resolve_profile
+
+WEEK_MAP = {0: "周一", 1: "周二", 2: "周三", 3: "周四", 4: "周五", 5: "周六", 6: "周日"}
+
+# === 权重体系 ===
+W_ACTIVITY = 10000000
+W_DAILY_BALANCE = 5000000
+W_CONSECUTIVE = 2000000
+W_BASELINE = 1000000
+W_COVERAGE = 1000000  # 时段缺口：每缺一人·一个时段，与每日基线同级
+W_REST_STRICT = 500000
+W_PERIOD_BALANCE = 100000
+W_FATIGUE = 50000
+W_REFUSE = 20000
+W_WEEKEND_RELIEF = 5000  # 周末轮休：每少休一个周末日，低于个人拒绝，高于减少班次
+W_BASELINE_FLEX = 10000000  # 战时权重：一千万分，依然很高，但可以被牺牲
+W_REQ_OFF = 50000
+W_REDUCE = 100
+W_STABILITY = 1  # 热启动：偏离旧排班的单元格，只用来在同分方案里选更稳定的
+
+# 惩罚族 (名称, 权重)，按 "底层逻辑权重" 的优先级从高到低
+PENALTY_FAMILIES = [
+    ("baseline_flex", W_BASELINE_FLEX),
+    ("daily_balance", W_DAILY_BALANCE),
+    ("consecutive", W_CONSECUTIVE),
+    ("coverage", W_COVERAGE),
+    ("period_balance", W_PERIOD_BALANCE),
+    ("req_off", W_REQ_OFF),
+    ("fatigue", W_FATIGUE),
+    ("refuse", W_REFUSE),
+    ("weekend_relief", W_WEEKEND_RELIEF),
+    ("reduce", W_REDUCE),
+    ("stability", W_STABILITY),
+]
+FAMILY_WEIGHTS = dict(PENALTY_FAMILIES)
+FAMILY_LABELS = {
+    "baseline_flex": "战时基线", "daily_balance": "每日波动", "consecutive": "最大连班", "coverage": "时段覆盖",
+    "period_balance": "工时平衡", "req_off": "指定休息日", "fatigue": "禁止晚转早",
+    "refuse": "个人拒绝班次", "weekend_relief": "周末轮休", "reduce": "个人减少班次", "stability": "排班稳定性",
+}
+
+# 分层优化 (lexicographic) 的层级：同权重的族放在同一层，层内按原权重比例加权
+LEX_TIERS = [
+    ["baseline_flex"],
+    ["daily_balance"],
+    ["consecutive"],
+    ["coverage"],
+    ["period_balance"],
+    ["req_off", "fatigue"],
+    ["refuse"],
+    ["weekend_relief"],
+    ["reduce"],
+    ["stability"],
+]
+
+STATUS_NAMES = {
+    cp_model.OPTIMAL: "OPTIMAL",
+    cp_model.FEASIBLE: "FEASIBLE",
+    cp_model.INFEASIBLE: "INFEASIBLE",
+    cp_model.MODEL_INVALID: "MODEL_INVALID",
+    cp_model.UNKNOWN: "UNKNOWN",
+}
+
+FAIL_MESSAGE = "❌ 求解失败：硬性冲突无法解决。"
+
+
+# --- 工具函数 ---
+def get_date_tuple(start_date, end_date):
+    delta = end_date - start_date
+    return [((start_date + datetime.timedelta(days=i)).strftime('%m-%d'),
+             WEEK_MAP[(start_date + datetime.timedelta(days=i)).weekday()])
+            for i in range(delta.days + 1)]
+
+
+def target_off_for_mode(rest_mode, num_days):
+    if rest_mode == "做6休1": return num_days // 7
+    if rest_mode == "做5休2": return (num_days // 7) * 2
+    return None
+
+
+def suggested_baseline(n_employees, num_days, target_off_days, n_work_shifts):
+    total_capacity = n_employees * (num_days - target_off_days)
+    daily_capacity = total_capacity / num_days
+    return math.floor(daily_capacity / n_work_shifts)
+
+
+def _blank(val):
+    """data_editor 里的空单元格可能是 None / NaN / 空串。"""
+    if val is None: return True
+    if isinstance(val, float) and math.isnan(val): return True
+    return str(val).strip() == ""
+
+
+def _as_date(val):
+    if isinstance(val, datetime.datetime): return val.date()
+    if isinstance(val, datetime.date): return val
+    return datetime.date.fromisoformat(str(val))
+
+
+def parse_day_list(text):
+    """解析 "1,3" / "1，3" 这类输入，返回 0 基的天序号列表。"""
+    return [int(x) - 1 for x in str(text).replace("，", ",").split(",") if x.strip().isdigit()]
+
+
+# --- 1. 规格归一化 ---
+def normalize_spec(raw):
+    """把原始 spec 校验并展开成求解器直接使用的索引形式。
+
+    不合法的输入抛出 ValueError，消息可以直接展示给用户。
+    """
+    if raw.get("_normalized"): return raw
+
+    employees = [str(e).strip() for e in raw.get("employees", []) if str(e).strip()]
+    if not employees: raise ValueError("员工名单为空")
+    shifts = [str(s).strip() for s in raw.get("shifts", ["早班", "中班", "晚班", "休"])]
+    try:
+        off_shift_name = next(s for s in shifts if "休" in s)
+    except StopIteration:
+        raise ValueError("班次中必须包含'休'字！")
+    shift_work = [s for s in shifts if s != off_shift_name]
+    if not shift_work: raise ValueError("至少需要一个工作班次")
+    s_map = {s: i for i, s in enumerate(shifts)}
+
+    start_date = _as_date(raw["start_date"])
+    end_date = _as_date(raw["end_date"])
+    if start_date > end_date: raise ValueError("日期错")
+    num_days = (end_date - start_date).days + 1
+    date_tuples = get_date_tuple(start_date, end_date)
+    date_headers_simple = [f"{d} {w}" for d, w in date_tuples]
+    day_lookup = {h: i for i, h in enumerate(date_headers_simple)}
+    for i in range(num_days):
+        day_lookup[(start_date + datetime.timedelta(days=i)).isoformat()] = i
+
+    if raw.get("target_off_days") is not None:
+        target_off_days = int(raw["target_off_days"])
+    else:
+        target_off_days = target_off_for_mode(raw.get("rest_mode", "做6休1"), num_days)
+        if target_off_days is None: raise ValueError("自定义休息模式需要提供 target_off_days")
+
+    suggested_min = suggested_baseline(len(employees), num_days, target_off_days, len(shift_work))
+    raw_min = raw.get("min_staff_per_shift") or {}
+    min_staff_per_shift = {s: int(raw_min.get(s, suggested_min)) for s in shift_work}
+
+    night_shift = raw.get("night_shift") or shift_work[-1]
+    day_shift = raw.get("day_shift") or shift_work[0]
+    for s in (night_shift, day_shift):
+        if s not in shift_work: raise ValueError(f"未知班次: {s}")
+
+    # 员工个性化需求：按姓名对齐，缺省的员工视为无需求
+    prefs = {}
+    for pos, row in enumerate(raw.get("preferences") or []):
+        name = row.get("姓名")
+        if _blank(name) and pos < len(employees): name = employees[pos]
+        prefs[str(name).strip()] = row
+
+    # 上期历史：history (或个人需求里的 "近期班次" 文本) 给出每人最近 N 天的班次 (旧→新)，
+    # 都没有时退回 "上期末班" 这一天
+    history = raw.get("history") or {}
+    last_shift, history_run = [], []
+    refuse, reduce, req_off, req_off_ignored, req_off_bad = {}, {}, {}, {}, []
+    skills = raw.get("availability") or {}
+    unavailable = {}
+    for e, name in enumerate(employees):
+        row = prefs.get(name, {})
+        hist = history.get(name)
+        if hist is None and not _blank(row.get("近期班次")): hist = str(row["近期班次"])
+        if hist is None:
+            last = row.get("上期末班")
+            hist = [] if _blank(last) else [last]
+        if isinstance(hist, str): hist = hist.replace("，", ",").split(",")
+        hist = [str(h).strip() for h in hist if not _blank(h)]
+        for h in hist:
+            if h not in s_map: raise ValueError(f"{name} 的历史班次未知: {h}")
+        last_shift.append(hist[-1] if hist else off_shift_name)
+        run = 0
+        for h in reversed(hist):
+            if h == off_shift_name: break
+            run += 1
+        history_run.append(run)
+        # 不可排：不可排班次 + 技能矩阵里没列的班次 (+ 硬性拒绝)
+        banned = set()
+        if not _blank(row.get("不可排班次")):
+            for x in str(row["不可排班次"]).replace("，", ",").split(","):
+                if x.strip() in shift_work: banned.add(s_map[x.strip()])
+        if skills.get(name) is not None:
+            banned.update(s_map[s] for s in shift_work if s not in skills[name])
+        ref = row.get("拒绝班次(强)")
+        if not _blank(ref) and ref in shift_work:
+            if raw.get("refuse_hard"): banned.add(s_map[ref])
+            else: refuse[e] = s_map[ref]
+        if banned: unavailable[e] = sorted(banned)
+        red = row.get("减少班次(弱)")
+        if not _blank(red) and red in shift_work: reduce[e] = s_map[red]
+        text = "" if _blank(row.get("指定休息日")) else str(row.get("指定休息日"))
+        if text.strip():
+            try:
+                days = parse_day_list(text)
+            except Exception:
+                req_off_bad.append(e); continue
+            inside = [d for d in days if 0 <= d < num_days]
+            outside = [d for d in days if not 0 <= d < num_days]
+            if inside: req_off[e] = inside
+            if outside: req_off_ignored[e] = outside
+
+    # 周末轮休：历史上周末上班偏多的人，本期至少休 k 个周末日 (哪几天不限)；与指定休息日分开计罚
+    weekend_days = [i for i in range(num_days) if (start_date + datetime.timedelta(days=i)).weekday() >= 5]
+    emp_pos = {name: e for e, name in enumerate(employees)}
+    weekend_relief = {}
+    for name, k in (raw.get("weekend_relief") or {}).items():
+        k = min(int(k), len(weekend_days))
+        e = emp_pos.get(name)
+        if e is not None and k > 0: weekend_relief[e] = k
+
+    # 个人休息目标 / 已上班次 (滚动排班时由上一个窗口结转过来)
+    raw_targets = raw.get("rest_targets") or {}
+    rest_targets = [int(raw_targets.get(name, target_off_days)) for name in employees]
+    raw_prior = raw.get("prior_counts") or {}
+    prior_counts = {}
+    for e, name in enumerate(employees):
+        counts = {s_map[s]: int(v) for s, v in (raw_prior.get(name) or {}).items() if s in s_map and int(v)}
+        if counts: prior_counts[e] = counts
+
+    # 活动需求：无日期/班次的行直接跳过，人数非法的行同样跳过
+    activities = []
+    for row in raw.get("activities") or []:
+        if _blank(row.get("日期")) or _blank(row.get("指定班次")): continue
+        d_idx = day_lookup.get(str(row["日期"]))
+        s_idx = s_map.get(row["指定班次"])
+        if d_idx is None or s_idx is None: continue
+        try:
+            req = int(row["所需人数"])
+        except (TypeError, ValueError):
+            continue
+        activities.append({
+            "name": "" if _blank(row.get("活动名称")) else str(row.get("活动名称")),
+            "day": d_idx, "shift": s_idx, "req": req, "label": date_headers_simple[d_idx],
+        })
+
+    # 时段需求：班次覆盖哪些时段、每格需求、按覆盖集合归并好的约束行，都在这里一次算好。
+    # 基线为 0 的班次缺省仍然禁排，不参与覆盖；demand_enables_zero 打开时才交给时段需求决定排不排
+    enables_zero = bool(raw.get("demand_enables_zero", False))
+    locked = set() if enables_zero else {s_map[s] for s in shift_work if min_staff_per_shift[s] == 0}
+    coverage = normalize_coverage(raw, shifts, s_map, s_map[off_shift_name], start_date, num_days, day_lookup,
+                                  last_shift, locked)
+
+    # 基线为 0 又没有活动 / 时段需求用到的班次整列不建变量；时段需求用到的班次 (只在 demand_enables_zero 时才有)
+    # 不受 0排班禁令限制
+    needed = {a["shift"] for a in activities if a["req"] > 0} | set(coverage["demand_shifts"])
+    pruned_shifts = [s_map[s] for s in shift_work if min_staff_per_shift[s] == 0 and s_map[s] not in needed]
+
+    return {
+        "_normalized": True,
+        "store": raw.get("store"),
+        "employees": employees,
+        "shifts": shifts,
+        "off_idx": s_map[off_shift_name],
+        "work_idx": [s_map[s] for s in shift_work],
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "num_days": num_days,
+        "date_headers": date_headers_simple,
+        "target_off_days": target_off_days,
+        "rest_targets": rest_targets,
+        "prior_counts": prior_counts,
+        "max_consecutive": int(raw.get("max_consecutive", 6)),
+        "min_staff": {s_map[s]: v for s, v in min_staff_per_shift.items()},
+        "diff_daily_threshold": int(raw.get("diff_daily_threshold", 0)),
+        "diff_period_threshold": int(raw.get("diff_period_threshold", 2)),
+        "no_night_to_day": bool(raw.get("no_night_to_day", True)),
+        "night_idx": s_map[night_shift],
+        "day_idx": s_map[day_shift],
+        "last_shift": last_shift,
+        "history_run": history_run,
+        "refuse": refuse,
+        "reduce": reduce,
+        "req_off": req_off,
+        "req_off_ignored": req_off_ignored,
+        "req_off_bad": req_off_bad,
+        "weekend_days": weekend_days,
+        "weekend_relief": weekend_relief,
+        "activities": activities,
+        "unavailable": unavailable,
+        "pruned_shifts": pruned_shifts,
+        "demand_enables_zero": enables_zero,
+        **coverage,
+    }
+
+
+# --- 2. 建模 ---
+class BuildProfiler:
+    """记录每个约束族的建模耗时，以及新增的变量数 / 约束数。"""
+
+    def __init__(self, model=None):
+        self.model = model
+        self.families = []
+
+    def _size(self):
+        proto = self.model.Proto()
+        return len(proto.variables), len(proto.constraints)
+
+    @contextmanager
+    def section(self, family):
+        v0, c0 = self._size()
+        t0 = time.perf_counter()
+        yield
+        v1, c1 = self._size()
+        self.families.append({"family": family, "seconds": time.perf_counter() - t0,
+                              "variables": v1 - v0, "constraints": c1 - c0})
+
+    def summary(self):
+        v, c = self._size()
+        return {"seconds": sum(f["seconds"] for f in self.families), "variables": v, "constraints": c,
+                "families": self.families}
+
+
+def build_model(ns, hint_cells=None, profiler=None, guards=None, knobs=None):
+    """建模。返回 (model, shift_vars, penalties)，penalties 按惩罚族分组 (未加权)。
+
+    每天各班次人数、每人各班次天数这些公共表达式只建一次，供基线 / 活动 / 平衡各节复用；
+    传入 profiler (BuildProfiler) 时记录每一节的耗时和规模。
+    传入 guards (空 list) 时，每组硬约束 (H2 / S1 平时基线 / S2 / S3 每行活动) 只在各自的
+    假设文字成立时生效，(文字, 约束组) 依次追加到 guards 里，供冲突分析使用 (见 conflicts 模块)。
+    传入 knobs ({旋钮: (下限, 上限)}) 时，对应的常数换成取值在该范围内的整数变量，建好的变量写回
+    knobs[旋钮]，供场景对比克隆模型后逐个固定 (见 scenarios 模块)。旋钮为 diff_daily_threshold /
+    diff_period_threshold / max_consecutive / ("min_staff", 班次下标)，基线旋钮只能用于基线大于 0 的班次。
+    """
+    E, D, S = len(ns["employees"]), ns["num_days"], len(ns["shifts"])
+    off_idx = ns["off_idx"]
+    work_indices = ns["work_idx"]
+    max_consecutive = ns["max_consecutive"]
+    model = cp_model.CpModel()
+    prof = profiler if profiler is not None else BuildProfiler()
+    prof.model = model
+    Sum = cp_model.LinearExpr.Sum
+    shift_vars = {}
+    penalties = {name: [] for name, _ in PENALTY_FAMILIES}
+
+    def guard(**group):
+        if guards is None: return []
+        lit = model.NewBoolVar(f'guard_{len(guards)}')
+        guards.append((lit, group))
+        return [lit]
+
+    def knob(name, value):
+        if knobs is None or name not in knobs: return value
+        lo, hi = knobs[name]
+        knobs[name] = model.NewIntVar(lo, hi, f'knob_{len(model.Proto().variables)}')
+        return knobs[name]
+
+    thr_daily = knob("diff_daily_threshold", ns["diff_daily_threshold"])
+    thr_period = knob("diff_period_threshold", ns["diff_period_threshold"])
+    base = {s_idx: knob(("min_staff", s_idx), v) for s_idx, v in ns["min_staff"].items()}
+
+    # 1. 变量 + H1. 物理约束 (每人每天恰好一个班次)
+    # 稀疏：不可排的 (员工, 班次) 根本不建变量，shift_vars 里也就没有这些键
+    mask = availability(ns)
+    allowed = [np.nonzero(mask[e])[0].tolist() for e in range(E)]
+    with prof.section("H1 变量/每日一班"):
+        for e in range(E):
+            for d in range(D):
+                cell = [model.NewBoolVar(f's_{e}_{d}_{s}') for s in allowed[e]]
+                for s, var in zip(allowed[e], cell): shift_vars[(e, d, s)] = var
+                model.AddExactlyOne(cell)
+
+    # 公共表达式：只建一次
+    with prof.section("公共人数表达式"):
+        staff = [np.nonzero(mask[:, s])[0].tolist() for s in range(S)]
+        day_count = {(d, s): Sum([shift_vars[(e, d, s)] for e in staff[s]]) for d in range(D) for s in range(S)}
+        emp_count = {(e, s): Sum([shift_vars[(e, d, s)] for d in range(D)]) if mask[e, s] else Sum([])
+                     for e in range(E) for s in range(S)}
+
+    # 只要这天有活动需求，就标记为“战时状态” (基线智能让路)
+    activity_day_indices = {a["day"] for a in ns["activities"]}
+
+    # H2. 0排班禁令
+    with prof.section("H2 0排班禁令"):
+        for s_idx, min_val in ns["min_staff"].items():
+            # 整列没建变量的班次天然为 0
+            if min_val == 0 and s_idx not in ns["pruned_shifts"] and s_idx not in ns["demand_shifts"]:
+                g = guard(kind="ban", shift=s_idx)
+                for d in range(D):
+                    model.Add(day_count[(d, s_idx)] == 0).OnlyEnforceIf(g)
+
+    # S0. 连班限制 (游程编码)：run = 截至当天的连续上班天数 (封顶 M)，从上期历史接续。
+    # 上班则 run = 前一天 + 1，休息则归零；前一天已到 M 仍上班时只能借一次违规 v "停表"，
+    # 所以 v 的总数 = 每段连班超出 M 的天数 = 长度 M+1 的全上班窗口数，与逐窗口判断等价，
+    # 但每人每天只有常数个变量和约束，规模随天数线性增长，与 M 无关。
+    # 连班上限可调时 run 按上限的最大值建，另加 run <= M
+    with prof.section("S0 连班"):
+        tunable = knobs is not None and "max_consecutive" in knobs
+        M_lo, M_hi = knobs["max_consecutive"] if tunable else (max_consecutive, max_consecutive)
+        M = knob("max_consecutive", max_consecutive)
+        for e in range(E):
+            h = ns["history_run"][e]
+            prev = min(h, M_hi)
+            if tunable and h > M_lo:
+                prev = model.NewIntVar(0, prev, f'run_{e}_hist')
+                model.AddMinEquality(prev, [M, h])
+            for d in range(D):
+                off = shift_vars[(e, d, off_idx)]
+                r = model.NewIntVar(0, min(M_hi, h + d + 1), f'run_{e}_{d}')
+                model.Add(r + M_hi * off <= M_hi)
+                if tunable: model.Add(r <= M)
+                model.Add(r <= prev + 1)
+                if h + d >= M_lo:
+                    is_violation = model.NewBoolVar(f'cons_vio_{e}_{d}')
+                    model.Add(r >= prev + 1 - (M_hi + 1) * off - is_violation)
+                    penalties["consecutive"].append(is_violation)
+                else:
+                    model.Add(r >= prev + 1 - (M_hi + 1) * off)
+                prev = r
+
+    # S1. 每日基线：平时硬约束，战时 (有活动日) 降级为软约束给活动让路
+    with prof.section("S1 每日基线"):
+        for d in range(D):
+            is_war_time = (d in activity_day_indices)
+            for s_idx, min_val in ns["min_staff"].items():
+                if min_val > 0:
+                    actual = day_count[(d, s_idx)]
+                    if not is_war_time:
+                        model.Add(actual >= base[s_idx]).OnlyEnforceIf(guard(kind="baseline", day=d, shift=s_idx,
+                                                                             target=min_val))
+                    else:
+                        shortage = model.NewIntVar(0, E, f'short_{d}_{s_idx}')
+                        model.Add(shortage >= base[s_idx] - actual)
+                        penalties["baseline_flex"].append(shortage)
+
+    # S2. 休息模式
+    with prof.section("S2 休息模式"):
+        g = guard(kind="rest")
+        for e in range(E):
+            model.Add(emp_count[(e, off_idx)] == ns["rest_targets"][e]).OnlyEnforceIf(g)
+
+    # S3. 活动需求
+    with prof.section("S3 活动需求"):
+        for row, a in enumerate(ns["activities"]):
+            if a["req"] > 0:
+                g = guard(kind="activity", row=row)
+                model.Add(day_count[(a["day"], a["shift"])] >= a["req"]).OnlyEnforceIf(g)
+
+    # S3b. 时段覆盖：每条归并好的时段约束一行，覆盖它的 (天, 班次) 人数之和 + 缺口 >= 需求，缺口按时段数计罚
+    with prof.section("S3b 时段覆盖"):
+        for row in ns["coverage"]:
+            short = model.NewIntVar(0, row["req"], f'cov_{row["day"]}_{row["start"]}')
+            model.Add(Sum([day_count[(d, s)] for d, s in row["cover"]]) + short >= row["req"])
+            penalties["coverage"].append(short * (row["end"] - row["start"]))
+
+    # S4. 晚转早
+    with prof.section("S4 晚转早"):
+        if ns["no_night_to_day"]:
+            n_idx, d_idx = ns["night_idx"], ns["day_idx"]
+            for e in range(E):
+                if not mask[e, d_idx]: continue
+                if mask[e, n_idx]:
+                    for d in range(D - 1):
+                        vio = model.NewBoolVar(f'fat_{e}_{d}')
+                        model.AddBoolOr([shift_vars[(e, d, n_idx)].Not(), shift_vars[(e, d+1, d_idx)].Not(), vio])
+                        penalties["fatigue"].append(vio)
+                # 跨期：上期最后一天是晚班，本期第一天排早班同样算一次
+                if ns["last_shift"][e] == ns["shifts"][n_idx]:
+                    penalties["fatigue"].append(shift_vars[(e, 0, d_idx)])
+
+    # S5. 个人拒绝与减少 + 指定休息日
+    with prof.section("S5 个人需求"):
+        for e, r_idx in ns["refuse"].items():
+            penalties["refuse"].append(emp_count[(e, r_idx)])
+        for e, rd_idx in ns["reduce"].items():
+            penalties["reduce"].append(emp_count[(e, rd_idx)])
+        for e, days in ns["req_off"].items():
+            for d in days:
+                # 上班 = 没排休息，直接用休息变量的取反作为违规量
+                penalties["req_off"].append(1 - shift_vars[(e, d, off_idx)])
+        # 周末轮休：缺口 = 应休周末日数 - 实际休的周末日数
+        for e, k in ns["weekend_relief"].items():
+            short = model.NewIntVar(0, k, f'wk_relief_{e}')
+            model.Add(short >= k - Sum([shift_vars[(e, d, off_idx)] for d in ns["weekend_days"]]))
+            penalties["weekend_relief"].append(short)
+
+    # S6. 强力平衡
+    with prof.section("S6 平衡"):
+        for s_idx in work_indices:
+            if ns["min_staff"].get(s_idx, 0) == 0: continue
+            s_name = ns["shifts"][s_idx]
+
+            # 1. 每日波动
+            d_counts = [day_count[(d, s_idx)] for d in range(D)]
+            max_d = model.NewIntVar(0, E, f'max_d_{s_name}')
+            min_d = model.NewIntVar(0, E, f'min_d_{s_name}')
+            model.AddMaxEquality(max_d, d_counts)
+            model.AddMinEquality(min_d, d_counts)
+            excess_d = model.NewIntVar(0, E, f'ex_d_{s_name}')
+            model.Add(excess_d >= (max_d - min_d) - thr_daily)
+            penalties["daily_balance"].append(excess_d)
+
+            # 2. 员工公平 (加上同一考核期内已上的天数；只比较能上这个班次的人)
+            prior = [ns["prior_counts"].get(e, {}).get(s_idx, 0) for e in staff[s_idx]]
+            e_counts = [emp_count[(e, s_idx)] + p for e, p in zip(staff[s_idx], prior)]
+            if not e_counts: continue
+            top = D + max(prior)
+            max_e = model.NewIntVar(0, top, f'max_e_{s_name}')
+            min_e = model.NewIntVar(0, top, f'min_e_{s_name}')
+            model.AddMaxEquality(max_e, e_counts)
+            model.AddMinEquality(min_e, e_counts)
+            excess_e = model.NewIntVar(0, top, f'ex_e_{s_name}')
+            model.Add(excess_e >= (max_e - min_e) - thr_period)
+            penalties["period_balance"].append(excess_e)
+
+    # S7. 排班稳定性 (热启动)：尽量保持旧排班里已经定好的格子
+    with prof.section("S7 稳定性"):
+        for e, d, s_idx in hint_cells or []:
+            # 旧排班里现在已不可排的格子保不住，不计入
+            if (e, d, s_idx) in shift_vars: penalties["stability"].append(1 - shift_vars[(e, d, s_idx)])
+
+    with prof.section("目标函数"):
+        model.Minimize(weighted_objective(penalties))
+    return model, shift_vars, penalties
+
+
+def weighted_objective(penalties, families=None):
+    """把若干惩罚族按权重合成一个线性表达式；families 缺省为全部。
+
+    只给一层时按层内最小权重归一，避免分层求解时系数过大。
+    """
+    names = [n for n, _ in PENALTY_FAMILIES if (families is None or n in families) and penalties.get(n)]
+    if not names: return 0
+    base = 1 if families is None else min(FAMILY_WEIGHTS[n] for n in names)
+    return cp_model.LinearExpr.WeightedSum([cp_model.LinearExpr.Sum(penalties[n]) for n in names],
+                                          [FAMILY_WEIGHTS[n] // base for n in names])
+
+
+def extract_array(ns, solver, shift_vars):
+    """一次性把解读成 (员工 × 天) 的班次下标数组。"""
+    keys = list(shift_vars)
+    lits = [shift_vars[k] for k in keys]
+    if hasattr(solver, "BooleanValues"):
+        vals = solver.BooleanValues(pd.Series(lits)).to_numpy(dtype=bool)
+    else:
+        vals = np.fromiter((solver.BooleanValue(v) for v in lits), dtype=bool, count=len(lits))
+    on = np.asarray(keys, dtype=np.int64).reshape(-1, 3)[vals]
+    arr = np.full((len(ns["employees"]), ns["num_days"]), ns["off_idx"], dtype=np.int16)
+    arr[on[:, 0], on[:, 1]] = on[:, 2]
+    return arr
+
+
+# --- 3. 结果表 ---
+def build_result_frame(ns, res_matrix):
+    """结果矩阵 (班次名或整数数组) -> 页面上的结果表 (员工行 + 每个班次一行当日人数)。"""
+    arr = schedule_array(ns, res_matrix)
+    shifts = ns["shifts"]
+    work_idx = ns["work_idx"]
+    per_emp, per_day = shift_counts(ns, arr)
+    names = np.asarray(shifts, dtype=object)
+
+    body = pd.DataFrame(names[arr])
+    body.insert(0, "姓名", ns["employees"])
+    for j, s_idx in enumerate(work_idx + [ns["off_idx"]]):
+        body[f"stat_{j}"] = per_emp[:, s_idx]
+
+    footer = pd.DataFrame(per_day.T.astype(object))
+    footer.insert(0, "姓名", [f"【{s}】" for s in shifts])
+    for j in range(len(work_idx) + 1):
+        footer[f"stat_{j}"] = ""
+
+    date_tuples = get_date_tuple(_as_date(ns["start_date"]), _as_date(ns["end_date"]))
+    cols = [("基本信息", "姓名")] + date_tuples + [("工时统计", shifts[s]) for s in work_idx] + [("工时统计", "休息天数")]
+    body.columns = footer.columns = pd.MultiIndex.from_tuples(cols)
+    return pd.concat([body, footer], ignore_index=True)
+
+
+# --- 4. 热启动提示 ---
+def normalize_hint(ns, hint):
+    """把旧排班展开成 (e, d, s) 格子列表。
+
+    hint 形如 {姓名: [班次, ...]} (按开始日期对齐) 或 {姓名: {日期: 班次}}，
+    日期可以是 ISO 日期、"MM-DD 周X" 或导出表里的 "MM-DD\\n周X"。
+    名单/日期/班次对不上的格子直接忽略，所以部分排班也可以用。
+    """
+    if not hint: return []
+    s_map = {s: i for i, s in enumerate(ns["shifts"])}
+    e_map = {name: i for i, name in enumerate(ns["employees"])}
+    start = _as_date(ns["start_date"])
+    day_lookup = {}
+    for d, header in enumerate(ns["date_headers"]):
+        day_lookup[header.split()[0]] = d
+        day_lookup[(start + datetime.timedelta(days=d)).isoformat()] = d
+
+    cells = []
+    for name, row in hint.items():
+        e = e_map.get(str(name).strip())
+        if e is None: continue
+        items = enumerate(row) if isinstance(row, (list, tuple)) else row.items()
+        for day, val in items:
+            if isinstance(day, int):
+                d = day if 0 <= day < ns["num_days"] else None
+            else:
+                key = str(day).strip()
+                d = day_lookup.get(key, day_lookup.get(key.split()[0] if key else key))
+            s_idx = None if _blank(val) else s_map.get(str(val).strip())
+            if d is not None and s_idx is not None: cells.append((e, d, s_idx))
+    return sorted(set(cells))
+
+
+def matrix_to_hint(ns, res_matrix):
+    """求解结果 -> 以日期为键的 hint，换了日期范围或增减员工后依然能对齐。"""
+    start = _as_date(ns["start_date"])
+    days = [(start + datetime.timedelta(days=d)).isoformat() for d in range(ns["num_days"])]
+    return {name: dict(zip(days, res_matrix[e])) for e, name in enumerate(ns["employees"])}
+
+
+def hint_from_frame(df):
+    """读取导出的排班表 (第一列姓名，日期列为 "MM-DD\\n周X") 作为 hint。"""
+    name_col = df.columns[0]
+    date_cols = [c for c in df.columns[1:] if str(c).strip()[:5].replace("-", "").isdigit()]
+    return {str(r[name_col]).strip(): {str(c): r[c] for c in date_cols} for _, r in df.iterrows()}
+
+
+# --- 5. 过程回调与提前停止 ---
+def relative_gap(objective, bound):
+    if objective is None: return None
+    return abs(objective - bound) / max(1.0, abs(objective))
+
+
+def solver_stats(solver, status):
+    """CP-SAT 响应统计：状态 / 目标 / 下界 / 用时 / 分支 / 冲突，预处理用时从求解日志里取。"""
+    resp = solver.ResponseProto()
+    found = status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+    m = re.search(r"Starting search at ([\d.]+)s", resp.solve_log)
+    return {"status": STATUS_NAMES.get(status, str(status)),
+            "objective": resp.objective_value if found else None,
+            "bound": resp.best_objective_bound if found else None,
+            "wall_time": resp.wall_time, "presolve_seconds": float(m.group(1)) if m else None,
+            "branches": resp.num_branches, "conflicts": resp.num_conflicts, "booleans": resp.num_booleans,
+            "deterministic_time": resp.deterministic_time}
+
+
+def penalty_breakdown(solver, penalties):
+    """各惩罚族在最终解里的违规量和加权后的罚分，按罚分从高到低。"""
+    rows = []
+    for name, weight in PENALTY_FAMILIES:
+        if not penalties.get(name): continue
+        value = int(solver.Value(cp_model.LinearExpr.Sum(penalties[name])))
+        rows.append({"family": name, "label": FAMILY_LABELS.get(name, name), "value": value, "weight": weight,
+                     "weighted": value * weight})
+    return sorted(rows, key=lambda r: -r["weighted"])
+
+
+@contextmanager
+def timed(phases, name):
+    """把 with 块的耗时累加到 phases[name] (秒)。"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - t0
+
+
+class ProgressCallback(cp_model.CpSolverSolutionCallback):
+    """每找到一个更优解就记录 目标值/下界/gap，并转发给 on_solution。"""
+
+    def __init__(self, on_solution=None):
+        super().__init__()
+        self.on_solution = on_solution
+        self.incumbents = []
+        self.last_improve = None  # time.monotonic()
+
+    def on_solution_callback(self):
+        obj, bound = self.ObjectiveValue(), self.BestObjectiveBound()
+        info = {"index": len(self.incumbents) + 1, "objective": obj, "bound": bound,
+                "gap": relative_gap(obj, bound), "wall_time": self.WallTime()}
+        self.incumbents.append(info)
+        self.last_improve = time.monotonic()
+        if self.on_solution is not None: self.on_solution(info)
+
+
+def _watch(solver, callback, stop_event, no_improve_seconds, done):
+    # 回调只在出新解时触发，"多久没改进" 和 外部取消 需要单独的线程盯着
+    while not done.wait(0.1):
+        if stop_event is not None and stop_event.is_set():
+            solver.StopSearch(); return
+        if no_improve_seconds and callback.last_improve is not None \
+                and time.monotonic() - callback.last_improve >= no_improve_seconds:
+            solver.StopSearch(); return
+
+
+def run_solver(model, time_limit=None, num_workers=None, params=None, repair_hint=False, on_solution=None,
+               stop_event=None, gap_limit=None, no_improve_seconds=None):
+    """按停止规则运行 CP-SAT，返回 (solver, status, callback)。
+
+    params 是求解档位的参数 dict (见 profiles.SOLVER_PROFILES)，time_limit / num_workers 覆盖其中对应项。
+    停止规则：time_limit 秒上限 / gap_limit 相对 gap (如 0.01) /
+    no_improve_seconds 秒内没有更优解 / stop_event 被外部置位 (页面上的 采用当前 / 取消)。
+    """
+    solver = cp_model.CpSolver()
+    apply_params(solver, params or {"max_time_in_seconds": 25.0})
+    if time_limit: solver.parameters.max_time_in_seconds = float(time_limit)
+    if num_workers: solver.parameters.num_search_workers = int(num_workers)
+    if gap_limit: solver.parameters.relative_gap_limit = float(gap_limit)
+    # 旧排班在新约束下可能已不可行，让求解器从提示出发就近修复
+    if repair_hint: solver.parameters.repair_hint = True
+    # 求解日志只留在响应里，用来拆出预处理用时 (见 solver_stats)
+    if not solver.parameters.log_search_progress:
+        solver.parameters.log_search_progress = True
+        solver.parameters.log_to_stdout = False
+    solver.parameters.log_to_response = True
+    callback = ProgressCallback(on_solution)
+    done = threading.Event()
+    watcher = None
+    if stop_event is not None or no_improve_seconds:
+        watcher = threading.Thread(target=_watch, args=(solver, callback, stop_event, no_improve_seconds, done),
+                                   daemon=True)
+        watcher.start()
+    try:
+        status = solver.Solve(model, callback)
+    finally:
+        done.set()
+        if watcher is not None: watcher.join()
+    return solver, status, callback
+
+
+def run_lexicographic(model, shift_vars, penalties, time_limit=None, stage_time_limit=None, params=None,
+                      on_solution=None, stop_event=None, **solver_kw):
+    """按 LEX_TIERS 逐层优化：每层求得的最优值作为约束固定下来，再优化下一层。
+
+    每层有独立的时间预算 (stage_time_limit，缺省把剩余时间平分给剩下的各层)，
+    上一层的解作为下一层的提示。返回 (solver, status, incumbents, stages)，
+    solver 停在最后一个成功的层上；某层失败或被外部停止时沿用上一层的解。
+    """
+    tiers = [t for t in LEX_TIERS if any(penalties.get(n) for n in t)] or [[]]
+    total = time_limit or (params or {}).get("max_time_in_seconds", 25.0)
+    deadline = time.monotonic() + total
+    incumbents, stages = [], []
+    last = None
+    # 多线程下分层求解的第一层带 repair_hint 会偶发触发 CP-SAT 内部断言
+    # (heuristics.fixed_search != nullptr) 直接中止进程；分层时只把旧排班当普通提示
+    solver_kw.pop("repair_hint", None)
+    for i, tier in enumerate(tiers):
+        expr = weighted_objective(penalties, tier)
+        model.Minimize(expr)
+
+        def forward(info, stage=i + 1):
+            info["stage"] = stage
+            incumbents.append(info)
+            if on_solution is not None: on_solution(info)
+
+        # 前面的层提前证明最优时，省下的时间顺延给后面的层
+        per_stage = stage_time_limit or max(1.0, (deadline - time.monotonic()) / (len(tiers) - i))
+        solver, status, _ = run_solver(model, time_limit=per_stage, params=params, on_solution=forward,
+                                       stop_event=stop_event, **solver_kw)
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE): break
+        value = int(round(solver.ObjectiveValue()))
+        stages.append({"tier": tier, "value": value, "status": STATUS_NAMES[status], "wall_time": solver.WallTime()})
+        last = (solver, status)
+        if stop_event is not None and stop_event.is_set(): break
+        # 固定本层成果，以本层的解为起点进入下一层
+        if tier: model.Add(expr <= value)
+        model.ClearHints()
+        for var in shift_vars.values():
+            model.AddHint(var, solver.BooleanValue(var))
+
+    if last is None: return solver, status, incumbents, stages
+    solver, _ = last
+    all_optimal = len(stages) == len(tiers) and all(st["status"] == "OPTIMAL" for st in stages)
+    return solver, cp_model.OPTIMAL if all_optimal else cp_model.FEASIBLE, incumbents, stages
+
+
+def run_aggregate(ns, hint_cells=None, time_limit=None, params=None, force=False):
+    """可互换员工合并成计数模型先解一遍，再展开回个人 (见 aggregate 模块)。
+
+    返回 (展开后的 员工×天 数组, 摘要)；没有值得合并的组 (force=False) 或计数模型无解时数组为 None。
+    """
+    groups = equivalent_groups(ns, hint_cells)
+    info = {"groups": len(groups), "largest": max(len(g) for g in groups), "status": None, "seconds": 0.0}
+    if not force and not worth_aggregating(groups): return None, info
+    model, y, penalties = build_count_model(ns, groups, hint_cells, families=FAMILY_WEIGHTS)
+    model.Minimize(weighted_objective(penalties))
+    solver, status, _ = run_solver(model, time_limit=time_limit, params=params)
+    info.update(status=STATUS_NAMES.get(status, str(status)), seconds=solver.WallTime())
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE): return None, info
+    info["objective"] = solver.ObjectiveValue()
+    return expand(ns, groups, counts_array(ns, groups, solver, y)), info
+
+
+# --- 6. 求解入口 ---
+def solve(spec, time_limit=None, num_workers=None, cache=None, hint=None, on_solution=None,
+          stop_event=None, gap_limit=None, no_improve_seconds=None, profile=None, params=None,
+          objective="weighted", stage_time_limit=None, check=True, explain=True, aggregate="auto", cache_only=False):
+    """求解一份 spec，返回可 JSON 序列化的结果 dict。
+
+    结果字段：store / status / matrix (员工×天 的班次名) / audit (结构化审计记录，见 audit 模块) /
+    objective / bound / gap / wall_time / cached / hint / stopped / incumbents / profile /
+    build (建模耗时与各约束族规模，见 BuildProfiler) / precheck / aggregate / conflicts / stats。
+    求解失败时 matrix 为 None，audit 为空。
+    stats 是诊断信息：phases (各阶段耗时：parse / precheck / cache / aggregate / build / solve / conflicts / audit)、
+    solver (见 solver_stats)、penalties (各惩罚族的违规量和罚分，见 penalty_breakdown)。
+    profile 选择求解档位 (fast / balanced / thorough / auto)，params 再逐项覆盖档位参数；
+    time_limit 缺省用档位自带的时间上限。
+    传入 cache (SolutionCache) 时，相同输入直接复用已存的 matrix，只重建审计；
+    没到最优的缓存解只在当时的搜索预算不小于这次时复用 (见 cache.covers)。
+    cache_only=True 时只查缓存：命中照常返回，没命中 (或预检不通过) 返回 None，不建模也不做冲突分析。
+    传入 hint (旧排班，见 normalize_hint) 时以它为起点热启动，并报告保留了多少格。
+    on_solution / stop_event / gap_limit / no_improve_seconds 见 run_solver；
+    stop_event 提前停止时返回当前最优解，stopped 为 True 且不写入缓存。
+    check=True 时先做解析预检 (见 precheck 模块)：必然无解的输入直接返回 status="PRECHECK_FAILED"，
+    不建模；预检的提醒放在 precheck 字段里。
+    explain=True 时，预检未通过或求解器证明无解 (INFEASIBLE) 都会再做一次冲突分析，
+    conflicts 字段给出最小冲突集 (见 find_conflicts)，其余情况为 None。
+    aggregate="auto" 时，可互换的员工够多就先解一遍分组计数模型 (用时间预算的四分之一)，
+    展开成个人排班作为完整模型的起点，摘要放在 aggregate 字段里；True 强制、False 关闭。
+    objective="lexicographic" 时按优先级分层求解 (见 run_lexicographic)，结果多一个 stages；
+    此时 objective 字段是最终解在加权口径下的总罚分，bound / gap 不适用 (None)。
+    """
+    if objective not in ("weighted", "lexicographic"):
+        raise ValueError(f"未知目标模式: {objective}")
+    phases = {}
+    stats = {"phases": phases, "solver": None, "penalties": None}
+    with timed(phases, "parse"):
+        ns = normalize_spec(spec)
+    with timed(phases, "precheck"):
+        issues = precheck(ns) if check else []
+    if precheck_errors(issues):
+        if cache_only: return None
+        with timed(phases, "conflicts"):
+            conflicts = find_conflicts(ns) if explain else None
+        return {"store": ns["store"], "status": "PRECHECK_FAILED", "matrix": None, "audit": [],
+                "objective": None, "bound": None, "gap": None, "wall_time": 0.0, "cached": False,
+                "hint": None, "stopped": False, "incumbents": [], "profile": None, "objective_mode": objective,
+                "stages": None, "build": None, "precheck": issues, "aggregate": None,
+                "conflicts": conflicts, "stats": stats}
+    hint_cells = normalize_hint(ns, hint)
+    profile, profile_params = resolve_profile(profile, ns)
+    profile_params = {**profile_params, **(params or {})}
+    key = None
+    if cache is not None:
+        # 档位 / 参数 / 分组模式不同解的质量不同：快速预览的结果不能冒充深度优化的结果
+        options = {"profile": profile, "objective": objective, "aggregate": aggregate}
+        if params: options["params"] = params
+        if hint_cells: options["hint"] = hint_cells
+        budget = {"time_limit": float(time_limit or profile_params.get("max_time_in_seconds", 25.0)),
+                  "stage_time_limit": stage_time_limit, "gap_limit": float(gap_limit or 0.0),
+                  "no_improve_seconds": no_improve_seconds}
+        with timed(phases, "cache"):
+            key = cache_key(ns, **options)
+            entry = cache.get(key, budget)
+        if entry is not None:
+            with timed(phases, "audit"):
+                records = audit(ns, entry["matrix"])
+            return {
+                "store": ns["store"],
+                "status": entry["status"],
+                "matrix": entry["matrix"],
+                "audit": records,
+                "objective": entry["objective"],
+                "bound": None,
+                "gap": None,
+                "wall_time": 0.0,
+                "cached": True,
+                "hint": hint_survival(hint_cells, entry["matrix"], ns),
+                "stopped": False,
+                "incumbents": [],
+                "profile": profile,
+                "objective_mode": objective,
+                "stages": entry.get("stages"),
+                "build": None,
+                "precheck": issues,
+                "aggregate": None,
+                "conflicts": None,
+                "stats": stats,
+            }
+    if cache_only: return None
+
+    agg_arr, agg_info = None, None
+    if aggregate:
+        total = time_limit or profile_params.get("max_time_in_seconds", 25.0)
+        with timed(phases, "aggregate"):
+            agg_arr, agg_info = run_aggregate(ns, hint_cells, time_limit=total / 4, params=profile_params,
+                                              force=aggregate != "auto")
+        if agg_arr is not None:
+            time_limit = total - agg_info["seconds"]
+            # 全局的取舍计数模型已经做完，个人层面只是就近修正：关掉 LP 松弛、只做一轮预处理，
+            # 否则大模型在补全提示的阶段每一步都要重解 LP，迟迟出不了第一个解
+            profile_params = {**profile_params, "linearization_level": 0, "max_presolve_iterations": 1}
+
+    profiler = BuildProfiler()
+    with timed(phases, "build"):
+        model, shift_vars, penalties = build_model(ns, hint_cells, profiler)
+        hinted = {(e, d): s_idx for e, d, s_idx in hint_cells}
+        if agg_arr is not None:
+            # 展开结果覆盖到每一格；旧排班的偏好已经通过稳定性惩罚体现在计数解里
+            hinted = {(e, d): int(agg_arr[e, d]) for e in range(len(ns["employees"])) for d in range(ns["num_days"])}
+        for (e, d), s_idx in hinted.items():
+            for s in range(len(ns["shifts"])):
+                if (e, d, s) in shift_vars: model.AddHint(shift_vars[(e, d, s)], s == s_idx)
+    # 展开结果本身满足硬约束，只有直接拿旧排班做提示时才需要 repair_hint 就近修复
+    solver_kw = dict(num_workers=num_workers, params=profile_params, repair_hint=bool(hint_cells) and agg_arr is None,
+                     on_solution=on_solution, stop_event=stop_event, gap_limit=gap_limit,
+                     no_improve_seconds=no_improve_seconds)
+    stages = None
+    with timed(phases, "solve"):
+        if objective == "lexicographic":
+            solver, status, incumbents, stages = run_lexicographic(
+                model, shift_vars, penalties, time_limit=time_limit, stage_time_limit=stage_time_limit, **solver_kw)
+            wall_time = sum(st["wall_time"] for st in stages)
+        else:
+            solver, status, callback = run_solver(model, time_limit=time_limit, **solver_kw)
+            incumbents, wall_time = callback.incumbents, solver.WallTime()
+    stopped = stop_event is not None and stop_event.is_set()
+    stats["solver"] = solver_stats(solver, status)
+    with timed(phases, "conflicts"):
+        conflicts = find_conflicts(ns) if explain and status == cp_model.INFEASIBLE else None
+
+    result = {
+        "store": ns["store"],
+        "status": STATUS_NAMES.get(status, str(status)),
+        "matrix": None,
+        "audit": [],
+        "objective": None,
+        "bound": None,
+        "gap": None,
+        "wall_time": wall_time,
+        "cached": False,
+        "hint": None,
+        "stopped": stopped,
+        "incumbents": incumbents,
+        "profile": profile,
+        "objective_mode": objective,
+        "stages": stages,
+        "build": profiler.summary(),
+        "precheck": issues,
+        "aggregate": agg_info,
+        "conflicts": conflicts,
+        "stats": stats,
+    }
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE) and agg_arr is not None and not stopped \
+            and ((agg_arr == ns["off_idx"]).sum(axis=1) == ns["rest_targets"]).all():
+        # 完整模型没来得及出解：展开结果的每日人数与计数解一致，休息天数也对得上，直接用它
+        agg_info["fallback"] = True
+        res_matrix = shift_names(ns, agg_arr)
+        with timed(phases, "audit"):
+            records = audit(ns, agg_arr)
+        result.update(status="FEASIBLE", matrix=res_matrix, hint=hint_survival(hint_cells, agg_arr, ns),
+                      audit=records, conflicts=None)
+    elif status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        arr = extract_array(ns, solver, shift_vars)
+        res_matrix = shift_names(ns, arr)
+        result["matrix"] = res_matrix
+        result["hint"] = hint_survival(hint_cells, arr, ns)
+        with timed(phases, "audit"):
+            result["audit"] = audit(ns, arr)
+        stats["penalties"] = penalty_breakdown(solver, penalties)
+        if stages is None:
+            result["objective"] = solver.ObjectiveValue()
+            result["bound"] = solver.BestObjectiveBound()
+            result["gap"] = relative_gap(result["objective"], result["bound"])
+        else:
+            result["objective"] = float(solver.Value(weighted_objective(penalties)))
+        # 只缓存完整跑完的解：失败可能只是时间不够，被手动打断的也不算数
+        if cache is not None and not stopped:
+            cache.put(key, {"status": result["status"], "matrix": res_matrix, "objective": result["objective"],
+                            "stages": stages, "budget": budget})
+    return result
+
+
+def hint_survival(hint_cells, res_matrix, ns):
+    """热启动提示在最终排班里保留下来的比例。"""
+    if not hint_cells: return None
+    arr = schedule_array(ns, res_matrix)
+    e, d, s_idx = np.asarray(hint_cells, dtype=np.int64).T
+    kept = int((arr[e, d] == s_idx).sum())
+    return {"cells": len(hint_cells), "kept": kept, "ratio": kept / len(hint_cells)}
+
+
+# --- 7. 冲突分析 ---
+def find_conflicts(spec, time_limit=10.0):
+    """无解时给出最小冲突集：[{kind, day, shift, message}]，去掉其中任意一组硬约束即可有解。
+
+    kind 为 baseline (平时基线) / rest (休息天数) / activity (活动行) / ban (0排班禁令)。
+    输入本身可行、或 time_limit 内判不出来时返回 None。
+    """
+    ns = normalize_spec(spec)
+    guards = []
+    model, _, _ = build_model(ns, guards=guards)
+    model.ClearObjective()
+    core = minimal_core(model, [lit for lit, _ in guards], time_limit)
+    if core is None: return None
+    return conflict_rows(ns, guards, core)
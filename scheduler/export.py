@@ -0,0 +1,112 @@
+"""Excel 导出：直接从结果数组逐行写 xlsx (xlsxwriter 常量内存模式)，不经过 DataFrame。
+
+    data = to_xlsx_bytes(ns, result["matrix"])
+
+    with ScheduleWorkbook("全部门店.xlsx") as book:    # 多门店 / 多场景：一店一张表
+        for ns, res in results:
+            book.add(ns["store"], ns, res["matrix"])
+
+表格布局与页面上的结果表一致 (见 engine.build_result_frame)：表头 姓名 / "MM-DD\\n周X" / "工时统计\\n班次"，
+员工行之后每个班次一行当日人数。导出的文件可以直接作为热启动的旧排班读回 (engine.hint_from_frame)。
+常量内存模式下每写完一行就落到临时文件，内存占用与人数、天数无关；页面上的底色换成单元格格式。
+"""
+import io
+import re
+
+import xlsxwriter
+
+from .audit import schedule_array, shift_counts
+from .engine import _as_date, get_date_tuple
+
+# 与页面结果表的配色一致
+STYLES = {
+    "header": {"bold": True, "text_wrap": True, "align": "center", "valign": "vcenter", "bg_color": "#f1f3f5",
+               "border": 1},
+    "off": {"bg_color": "#f8f9fa", "font_color": "#adb5bd", "align": "center"},
+    "night": {"bg_color": "#fff3cd", "font_color": "#856404", "align": "center"},
+    "work": {"align": "center"},
+    "total": {"bold": True, "bg_color": "#ebf8ff", "font_color": "#2b6cb0"},
+    "count": {"align": "center"},
+}
+
+
+def sheet_name(name, used):
+    """Excel 表名：去掉非法字符、截到 31 个字符，重名时加序号。"""
+    base = re.sub(r"[\[\]:*?/\\]", "_", str(name or "").strip()).strip("'")[:31] or "排班"
+    out, i = base, 2
+    while out.lower() in used:
+        suffix = f"({i})"
+        out, i = base[:31 - len(suffix)] + suffix, i + 1
+    used.add(out.lower())
+    return out
+
+
+class ScheduleWorkbook:
+    """常量内存的排班工作簿，每次 add 写一张表。target 是文件路径或可写的二进制文件对象。"""
+
+    def __init__(self, target):
+        self.book = xlsxwriter.Workbook(target, {"constant_memory": True})
+        self.formats = {k: self.book.add_format(v) for k, v in STYLES.items()}
+        self._used = set()
+
+    def add(self, name, ns, res_matrix):
+        """写一张表，返回实际使用的表名。行必须按顺序写完，常量内存模式下写过的行不能再改。"""
+        arr = schedule_array(ns, res_matrix)
+        shifts, work_idx, off_idx = ns["shifts"], ns["work_idx"], ns["off_idx"]
+        per_emp, per_day = shift_counts(ns, arr)
+        dates = get_date_tuple(_as_date(ns["start_date"]), _as_date(ns["end_date"]))
+        D = len(dates)
+        stat_idx = work_idx + [off_idx]
+        f = self.formats
+        cell_fmt = [f["off"] if s == off_idx else f["night"] if "晚" in s_name else f["work"]
+                    for s, s_name in enumerate(shifts)]
+
+        title = sheet_name(name, self._used)
+        ws = self.book.add_worksheet(title)
+        ws.set_column(0, 0, 12)
+        ws.set_column(1, D, 7)
+        ws.set_column(D + 1, D + len(stat_idx), 9)
+        ws.set_row(0, 32)
+        ws.freeze_panes(1, 1)
+        header = ["姓名"] + [f"{d}\n{w}" for d, w in dates] + [f"工时统计\n{shifts[s]}" for s in work_idx]
+        ws.write_row(0, 0, header + ["工时统计\n休息天数"], f["header"])
+
+        for e, emp in enumerate(ns["employees"]):
+            r = e + 1
+            ws.write_string(r, 0, emp)
+            for d in range(D):
+                s = int(arr[e, d])
+                ws.write_string(r, d + 1, shifts[s], cell_fmt[s])
+            for j, s in enumerate(stat_idx):
+                ws.write_number(r, D + 1 + j, int(per_emp[e, s]), f["count"])
+        base = len(ns["employees"]) + 1
+        for s, s_name in enumerate(shifts):
+            ws.write_string(base + s, 0, f"【{s_name}】", f["total"])
+            ws.write_row(base + s, 1, per_day[:, s].tolist(), f["count"])
+        return title
+
+    def close(self):
+        self.book.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def to_xlsx_bytes(ns, res_matrix, name="排班"):
+    """单张表的 xlsx 文件内容 (bytes)。"""
+    buf = io.BytesIO()
+    with ScheduleWorkbook(buf) as book:
+        book.add(name, ns, res_matrix)
+    return buf.getvalue()
+
+
+def workbook_bytes(sheets):
+    """多张表的 xlsx 文件内容，sheets 为 [(表名, ns, res_matrix)]。"""
+    buf = io.BytesIO()
+    with ScheduleWorkbook(buf) as book:
+        for name, ns, res_matrix in sheets:
+            book.add(name, ns, res_matrix)
+    return buf.getvalue()
@@ -0,0 +1,243 @@
+"""排班历史：每次发布的排班按 门店 / 员工 / 日期 存进本地 SQLite，同时增量维护每人的累计量，用于跨期公平。
+
+    store = ScheduleHistory()
+    store.publish(ns, result["matrix"])          # 发布：写入格子，累计量加上本期、减去被覆盖的旧排班
+    spec.update(store.carry_over(spec))          # 下一期排班前：累计量 -> prior_counts / history / weekend_relief
+
+累计量表 totals 按 (门店, 员工, 班次) 记总天数和其中的周末天数，发布时只按本期的格子增减，
+查询时只读这张表 (人数 × 班次行)，不扫历史排班，所以存一个月和存三年的代价一样。
+连班尾巴只看新周期开始前 TAIL_DAYS 天的格子 (按日期索引取)，同样与历史长短无关。
+
+换算成本期的公平目标 (carry_over)：
+- 各工作班次 (含晚班)：按在册天数算出全店平均占比，每人 "多上的天数" = 实际 - 平均占比 × 在册天数，
+  减去能上这个班次的人里的最小值后作为 prior_counts，工时公平就会让历史上多上的人本期少上；
+- 周末：周末上班比平均多出整天数的人，本期按 weekend_relief 优先在周末休息；
+- 上期末尾连续的班次作为 history，连班、晚转早跨期照常生效。
+"""
+import datetime
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from .audit import schedule_array
+from .engine import _as_date, _blank, normalize_spec
+
+DB_PATH = os.environ.get(
+    "SCHEDULE_AI_HISTORY_DB", os.path.join(os.path.expanduser("~"), ".cache", "schedule-ai", "history.sqlite3"))
+
+DEFAULT_STORE = "默认门店"
+TAIL_DAYS = 14
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cells (
+    store TEXT NOT NULL,
+    employee TEXT NOT NULL,
+    date TEXT NOT NULL,
+    shift TEXT NOT NULL,
+    weekend INTEGER NOT NULL,
+    PRIMARY KEY (store, employee, date)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cells_date ON cells (store, date);
+CREATE TABLE IF NOT EXISTS totals (
+    store TEXT NOT NULL,
+    employee TEXT NOT NULL,
+    shift TEXT NOT NULL,
+    days INTEGER NOT NULL,
+    weekend INTEGER NOT NULL,
+    PRIMARY KEY (store, employee, shift)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS publishes (
+    id INTEGER PRIMARY KEY,
+    store TEXT NOT NULL,
+    start_date TEXT NOT NULL,
+    end_date TEXT NOT NULL,
+    employees INTEGER NOT NULL,
+    published REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS publishes_store ON publishes (store, end_date);
+"""
+
+
+def _connect(path):
+    db = sqlite3.connect(path, timeout=30, isolation_level=None)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(_SCHEMA)
+    return db
+
+
+def _store(ns_or_spec, store=None):
+    return store or ns_or_spec.get("store") or DEFAULT_STORE
+
+
+class ScheduleHistory:
+    """已发布排班的历史库。同一个文件可以被多个进程共用，发布在一个写事务里完成。"""
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def _db(self):
+        return _connect(self.path)
+
+    # --- 发布 ---
+    def publish(self, ns, res_matrix, store=None):
+        """写入一期排班。与已发布排班日期重叠的部分整段覆盖 (先从累计量里减掉旧格子)。
+
+        返回 {store, start_date, end_date, cells, replaced}。
+        """
+        store = _store(ns, store)
+        arr = schedule_array(ns, res_matrix)
+        shifts, employees = ns["shifts"], ns["employees"]
+        start = _as_date(ns["start_date"])
+        dates = [start + datetime.timedelta(days=d) for d in range(ns["num_days"])]
+        weekend = np.array([d.weekday() >= 5 for d in dates])
+        first, last = dates[0].isoformat(), dates[-1].isoformat()
+
+        names = np.asarray(shifts, dtype=object)[arr]
+        iso = [d.isoformat() for d in dates]
+        wk = weekend.astype(int).tolist()
+        cells = [(store, emp, iso[d], names[e, d], wk[d]) for e, emp in enumerate(employees) for d in range(len(dates))]
+        adds = []
+        for s, s_name in enumerate(shifts):
+            hit = arr == s
+            days, wdays = hit.sum(axis=1), hit[:, weekend].sum(axis=1)
+            adds += [(store, emp, s_name, int(days[e]), int(wdays[e])) for e, emp in enumerate(employees) if days[e]]
+
+        db = self._db()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            old = db.execute("SELECT employee, shift, COUNT(*), SUM(weekend) FROM cells "
+                             "WHERE store = ? AND date BETWEEN ? AND ? GROUP BY employee, shift",
+                             (store, first, last)).fetchall()
+            db.executemany("UPDATE totals SET days = days - ?, weekend = weekend - ? "
+                           "WHERE store = ? AND employee = ? AND shift = ?",
+                           [(n, w, store, emp, s) for emp, s, n, w in old])
+            db.execute("DELETE FROM cells WHERE store = ? AND date BETWEEN ? AND ?", (store, first, last))
+            db.executemany("INSERT INTO cells (store, employee, date, shift, weekend) VALUES (?, ?, ?, ?, ?)", cells)
+            db.executemany("INSERT INTO totals (store, employee, shift, days, weekend) VALUES (?, ?, ?, ?, ?) "
+                           "ON CONFLICT (store, employee, shift) DO UPDATE SET "
+                           "days = days + excluded.days, weekend = weekend + excluded.weekend", adds)
+            db.execute("DELETE FROM totals WHERE store = ? AND days <= 0", (store,))
+            db.execute("INSERT INTO publishes (store, start_date, end_date, employees, published) VALUES (?, ?, ?, ?, ?)",
+                       (store, first, last, len(employees), time.time()))
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        finally:
+            db.close()
+        return {"store": store, "start_date": first, "end_date": last, "cells": len(cells),
+                "replaced": sum(n for _, _, n, _ in old)}
+
+    # --- 查询 ---
+    def totals(self, store=None, before=None):
+        """{员工: {班次: (总天数, 周末天数)}}。给了 before (日期) 时扣掉该日及之后已发布的格子，
+        重排已发布过的周期时本期旧排班不算进历史。"""
+        store = store or DEFAULT_STORE
+        db = self._db()
+        try:
+            out = {}
+            for emp, s, n, w in db.execute("SELECT employee, shift, days, weekend FROM totals WHERE store = ?", (store,)):
+                out.setdefault(emp, {})[s] = (n, w)
+            if before is not None:
+                later = db.execute("SELECT employee, shift, COUNT(*), SUM(weekend) FROM cells "
+                                   "WHERE store = ? AND date >= ? GROUP BY employee, shift",
+                                   (store, _as_date(before).isoformat()))
+                for emp, s, n, w in later:
+                    n0, w0 = out.get(emp, {}).get(s, (0, 0))
+                    out.setdefault(emp, {})[s] = (n0 - n, w0 - w)
+            return out
+        finally:
+            db.close()
+
+    def tails(self, store, start_date, days=TAIL_DAYS):
+        """{员工: [班次, ...]}：start_date 前一天往回连续有排班的那一段 (最多 days 天，旧→新)。"""
+        start = _as_date(start_date)
+        lo = (start - datetime.timedelta(days=days)).isoformat()
+        db = self._db()
+        try:
+            rows = db.execute("SELECT employee, date, shift FROM cells WHERE store = ? AND date >= ? AND date < ? "
+                              "ORDER BY date", (store or DEFAULT_STORE, lo, start.isoformat())).fetchall()
+        finally:
+            db.close()
+        by_emp = {}
+        for emp, d, s in rows:
+            by_emp.setdefault(emp, {})[d] = s
+        out = {}
+        for emp, cells in by_emp.items():
+            run, d = [], start - datetime.timedelta(days=1)
+            while d.isoformat() in cells:
+                run.append(cells[d.isoformat()])
+                d -= datetime.timedelta(days=1)
+            if run: out[emp] = run[::-1]
+        return out
+
+    def publishes(self, store=None, limit=20):
+        """最近的发布记录 [{store, start_date, end_date, employees, published}]，新的在前。"""
+        db = self._db()
+        try:
+            sql = "SELECT store, start_date, end_date, employees, published FROM publishes"
+            args = ()
+            if store is not None: sql, args = sql + " WHERE store = ?", (store,)
+            rows = db.execute(sql + " ORDER BY id DESC LIMIT ?", args + (limit,)).fetchall()
+        finally:
+            db.close()
+        keys = ("store", "start_date", "end_date", "employees", "published")
+        return [dict(zip(keys, r)) for r in rows]
+
+    # --- 换算成本期的公平目标 ---
+    def carry_over(self, spec, store=None):
+        """按历史累计量给出本期 spec 的补充字段 {prior_counts, history, weekend_relief}。
+
+        只看本期名单里的人；没有历史的人 (新员工) 各项都按平均处理，不会被多排。
+        spec 里已经给了 history 或填了近期班次的人，不再用库里的连班尾巴。
+        """
+        ns = normalize_spec(spec)
+        store = _store(ns, store)
+        totals = self.totals(store, before=ns["start_date"])
+        manual = set(spec.get("history") or {})
+        manual.update(str(r.get("姓名")).strip() for r in spec.get("preferences") or [] if not _blank(r.get("近期班次")))
+        return fairness_targets(ns, totals, self.tails(store, ns["start_date"]), manual)
+
+
+def fairness_targets(ns, totals, tails=None, skip_history=()):
+    """累计量 -> spec 片段。totals / tails 为 ScheduleHistory.totals / tails 的结果，skip_history 里的人不给 history。"""
+    employees, shifts = ns["employees"], ns["shifts"]
+    E, D = len(employees), ns["num_days"]
+    days = np.zeros((E, len(shifts)), dtype=np.int64)
+    wdays = np.zeros((E, len(shifts)), dtype=np.int64)
+    col = {s: i for i, s in enumerate(shifts)}
+    for e, name in enumerate(employees):
+        for s, (n, w) in totals.get(name, {}).items():
+            if s in col: days[e, col[s]], wdays[e, col[s]] = n, w
+    exposure, w_exposure = days.sum(axis=1), wdays.sum(axis=1)
+
+    prior_counts = {}
+    if exposure.sum():
+        for s in ns["work_idx"]:
+            rate = days[:, s].sum() / exposure.sum()
+            surplus = days[:, s] - rate * exposure
+            able = np.array([s not in ns["unavailable"].get(e, []) for e in range(E)])
+            if not able.any(): continue
+            offset = np.clip(np.rint(surplus - surplus[able].min()), 0, D).astype(int)
+            for e in np.flatnonzero(able & (offset > 0)):
+                prior_counts.setdefault(employees[e], {})[shifts[s]] = int(offset[e])
+
+    weekend_relief = {}
+    if w_exposure.sum():
+        worked = wdays[:, ns["work_idx"]].sum(axis=1)
+        surplus = worked - worked.sum() / w_exposure.sum() * w_exposure
+        n_weekend = sum(1 for h in ns["date_headers"] if h.endswith(("周六", "周日")))
+        for e in np.flatnonzero(surplus >= 1):
+            weekend_relief[employees[e]] = int(min(surplus[e], n_weekend // 2))
+        weekend_relief = {k: v for k, v in weekend_relief.items() if v > 0}
+
+    # 班次定义改过时，尾巴里认不出的班次及其之前的部分丢掉
+    roster = set(employees) - set(skip_history)
+    history = {}
+    for name, run in (tails or {}).items():
+        known = run[max([i + 1 for i, s in enumerate(run) if s not in col], default=0):]
+        if name in roster and known: history[name] = known
+    return {"prior_counts": prior_counts, "history": history, "weekend_relief": weekend_relief}
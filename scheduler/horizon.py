@@ -0,0 +1,177 @@
+"""滚动时域 (rolling horizon)：长周期 (月 / 季度) 拆成相互重叠的窗口逐个求解。
+
+    result = solve_rolling(spec, window=14, overlap=7)
+
+每个窗口照常调用 solve，但只提交前 window - overlap 天，剩下的天留给下一个窗口重排：
+
+- 已提交的排班作为下一个窗口的上期历史 (history)，连班、晚转早跨窗口照常生效；
+- 休息天数按剩余额度结转：每人的窗口休息目标 = 剩余应休 × 窗口天数 / 剩余天数，最后一个窗口补齐；
+- 已提交的各班次天数作为 prior_counts 计入工时公平，公平性按整个周期累计；
+- 上一个窗口在重叠部分的解作为下一个窗口的热启动提示。
+
+每个窗口的规模固定，总耗时随周期长度线性增长。窗口之间是贪心衔接，整体不保证最优。
+"""
+import datetime
+
+import numpy as np
+
+from .audit import audit, schedule_array, shift_counts, shift_names
+from .engine import _as_date, find_conflicts, normalize_hint, normalize_spec, solve
+from .precheck import errors as precheck_errors
+from .precheck import precheck
+
+
+def windows(num_days, window=14, overlap=7):
+    """切分窗口，返回 [(起始天, 结束天, 提交到哪天)]，区间左闭右开。"""
+    if window < 1: raise ValueError("窗口天数至少为 1")
+    if not 0 <= overlap < window: raise ValueError("重叠天数必须小于窗口天数")
+    step = window - overlap
+    out, a = [], 0
+    while a + window < num_days:
+        out.append((a, a + window, a + step))
+        a += step
+    out.append((a, num_days, num_days))
+    return out
+
+
+def window_rest_targets(ns, committed, a, b):
+    """每人在 [a, b) 窗口里的休息目标：按剩余应休天数和剩余天数等比例分摊。"""
+    D = ns["num_days"]
+    done = (committed[:, :a] == ns["off_idx"]).sum(axis=1)
+    remaining = np.asarray(ns["rest_targets"]) - done
+    if b == D: return np.clip(remaining, 0, b - a).tolist()
+    share = np.floor(remaining * (b - a) / (D - a) + 0.5).astype(np.int64)
+    # 窗口外剩下的天数要能装下其余的休息，窗口里也不能超过剩余额度
+    lo = np.maximum(0, remaining - (D - b))
+    hi = np.clip(remaining, 0, b - a)
+    return np.clip(share, lo, np.maximum(lo, hi)).tolist()
+
+
+def window_spec(ns, committed, a, b):
+    """已提交到第 a 天时，[a, b) 窗口的原始 spec。"""
+    shifts, employees = ns["shifts"], ns["employees"]
+    start = _as_date(ns["start_date"])
+    iso = lambda d: (start + datetime.timedelta(days=d)).isoformat()
+    M = ns["max_consecutive"]
+
+    # 上期历史：原始历史 (只剩末班和连班天数) + 已提交部分，保留足够判断连班的长度
+    history = {}
+    for e, name in enumerate(employees):
+        run = ns["history_run"][e]
+        hist = [ns["last_shift"][e]] * max(1, run)
+        hist += [shifts[s] for s in committed[e, :a]]
+        history[name] = hist[-(M + 1):]
+
+    preferences = []
+    for e, name in enumerate(employees):
+        days = [d - a + 1 for d in ns["req_off"].get(e, []) if a <= d < b]
+        preferences.append({
+            "姓名": name,
+            "指定休息日": ",".join(map(str, days)),
+            "拒绝班次(强)": shifts[ns["refuse"][e]] if e in ns["refuse"] else "",
+            "减少班次(弱)": shifts[ns["reduce"][e]] if e in ns["reduce"] else "",
+            "不可排班次": ",".join(shifts[s] for s in ns["unavailable"].get(e, [])),
+        })
+
+    per_emp, _ = shift_counts(ns, committed[:, :a])
+    prior_counts = {}
+    for e, name in enumerate(employees):
+        counts = {shifts[s]: int(per_emp[e, s]) + ns["prior_counts"].get(e, {}).get(s, 0) for s in ns["work_idx"]}
+        prior_counts[name] = {s: v for s, v in counts.items() if v}
+
+    # 周末轮休：剩余目标按剩下的周末日等比例分给本窗口，最后一个窗口补齐
+    wk = np.asarray(ns["weekend_days"], dtype=np.int64)
+    inside, later = int(((wk >= a) & (wk < b)).sum()), int((wk >= a).sum())
+    weekend_relief = {}
+    for e, k in ns["weekend_relief"].items():
+        left = k - int((committed[e, wk[wk < a]] == ns["off_idx"]).sum())
+        share = left if b == ns["num_days"] else int(np.floor(left * inside / max(later, 1) + 0.5))
+        if share > 0: weekend_relief[employees[e]] = share
+
+    rest_targets = window_rest_targets(ns, committed, a, b)
+    return {
+        "store": ns["store"],
+        "employees": employees,
+        "shifts": shifts,
+        "start_date": iso(a), "end_date": iso(b - 1),
+        "target_off_days": int(round(np.mean(rest_targets))),
+        "rest_targets": dict(zip(employees, rest_targets)),
+        "max_consecutive": M,
+        "min_staff_per_shift": {shifts[s]: v for s, v in ns["min_staff"].items()},
+        "diff_daily_threshold": ns["diff_daily_threshold"],
+        "diff_period_threshold": ns["diff_period_threshold"],
+        "no_night_to_day": ns["no_night_to_day"],
+        "night_shift": shifts[ns["night_idx"]], "day_shift": shifts[ns["day_idx"]],
+        "preferences": preferences,
+        "activities": [{"活动名称": x["name"], "日期": iso(x["day"]), "指定班次": shifts[x["shift"]], "所需人数": x["req"]}
+                       for x in ns["activities"] if a <= x["day"] < b],
+        "history": history,
+        "prior_counts": prior_counts,
+        "weekend_relief": weekend_relief,
+        "shift_times": ns["shift_times"], "slot_minutes": ns["slot_minutes"],
+        "demand": {iso(d): ns["demand"][d] for d in range(a, b)} if ns["demand"] else None,
+        "demand_enables_zero": ns["demand_enables_zero"],
+    }
+
+
+def solve_rolling(spec, window=14, overlap=7, time_limit=None, hint=None, on_solution=None, stop_event=None,
+                  check=True, **solve_kw):
+    """按重叠窗口逐段求解整个周期，返回与 solve 同结构的结果 dict，外加 windows 字段。
+
+    time_limit 是每个窗口的时间上限；hint (旧排班，见 engine.normalize_hint) 按日期分给各个窗口；
+    其余参数原样传给每个窗口的 solve。
+    on_solution 收到的进度多一个 window 字段 (从 1 开始)。某个窗口失败或被 stop_event 打断时，
+    matrix 为 None，status / conflicts 取自该窗口。
+    """
+    ns = normalize_spec(spec)
+    E, D = len(ns["employees"]), ns["num_days"]
+    issues = precheck(ns) if check else []
+    result = {
+        "store": ns["store"], "status": "FEASIBLE", "matrix": None, "audit": [], "objective": None,
+        "bound": None, "gap": None, "wall_time": 0.0, "cached": False, "hint": None, "stopped": False,
+        "incumbents": [], "profile": None, "objective_mode": solve_kw.get("objective", "weighted"),
+        "stages": None, "build": None, "precheck": issues, "conflicts": None, "stats": None,
+        "windows": [],
+    }
+    if precheck_errors(issues):
+        result.update(status="PRECHECK_FAILED", conflicts=find_conflicts(ns))
+        return result
+
+    committed = np.full((E, D), ns["off_idx"], dtype=np.int16)
+    start = _as_date(ns["start_date"])
+    iso = lambda d: (start + datetime.timedelta(days=d)).isoformat()
+    base_hint = {name: {} for name in ns["employees"]}
+    for e, d, s_idx in normalize_hint(ns, hint):
+        base_hint[ns["employees"][e]][iso(d)] = ns["shifts"][s_idx]
+    carry = {}
+    plan = windows(D, window, overlap)
+    for k, (a, b, keep) in enumerate(plan, 1):
+        wspec = window_spec(ns, committed, a, b)
+
+        def forward(info, k=k):
+            info["window"] = k
+            if on_solution is not None: on_solution(info)
+
+        window_hint = {name: {**base_hint[name], **carry.get(name, {})} for name in ns["employees"]}
+        res = solve(wspec, time_limit=time_limit, hint=window_hint, on_solution=forward, stop_event=stop_event,
+                    check=check, **solve_kw)
+        result["windows"].append({"window": k, "start": wspec["start_date"], "end": wspec["end_date"],
+                                  "commit": keep - a, "status": res["status"], "objective": res["objective"],
+                                  "wall_time": res["wall_time"], "cached": res["cached"]})
+        result["wall_time"] += res["wall_time"]
+        result["incumbents"] += res["incumbents"]
+        result["profile"] = res["profile"]
+        if res["matrix"] is None or res["stopped"]:
+            result.update(status=res["status"], stopped=res["stopped"], conflicts=res["conflicts"],
+                          precheck=issues + res["precheck"])
+            return result
+        arr = schedule_array(normalize_spec(wspec), res["matrix"])
+        committed[:, a:keep] = arr[:, :keep - a]
+        # 重叠部分的解留给下一个窗口做热启动，优先于旧排班
+        carry = {name: {iso(a + d): res["matrix"][e][d] for d in range(keep - a, b - a)}
+                 for e, name in enumerate(ns["employees"])}
+        if len(plan) == 1: result["status"] = res["status"]
+
+    result["matrix"] = shift_names(ns, committed)
+    result["audit"] = audit(ns, committed)
+    return result
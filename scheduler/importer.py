@@ -0,0 +1,315 @@
+"""批量导入：从 Excel / CSV 读入员工名单、个人需求、可排班次 (技能) 和活动需求，直接并进 spec。
+
+    tables = read_tables("门店A.xlsx")               # 流式解析，每个工作表一张原始表
+    imported = validate(tables, shifts, start_date, end_date)
+    spec.update(employees=imported["employees"], preferences=imported["preferences"],
+                availability=imported["availability"], activities=imported["activities"])
+
+表按表头识别，一个文件里可以有多个工作表，列名与页面上的表格一致：
+
+- 员工表：姓名 [+ 上期末班 / 近期班次 / 指定休息日 / 拒绝班次(强) / 减少班次(弱) / 不可排班次 / 可排班次]
+- 技能表：姓名 + 各工作班次一列，能上的填 1 / 是 / √
+- 活动表：活动名称 / 日期 / 指定班次 / 所需人数，日期可以是 2026-10-17、10-17 或 "10-17 周六"
+- 时段需求表：日期 / 时段 (或 开始 + 结束) / 人数，日期另可写 周六 或留空 (每天)；
+  也可以是曲线格式：日期 + 每个时段一列 (表头 10:00、10:30 ...)，格子里填在岗人数
+
+xlsx 用 openpyxl 的只读模式逐行读，CSV 用 csv 模块逐行读 (UTF-8，失败再按 GBK)，只保留认得的列。
+读完后每张表整列一次校验，出错的单元格清空 (活动表整行丢弃)，errors 里逐条给出 工作表 / 行号 / 列 / 原因。
+"""
+import csv
+import datetime
+import io
+import os
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from .coverage import ALL_DAYS, WEEKDAYS, clock_label, parse_clock, parse_span
+from .engine import _as_date
+
+PREF_COLUMNS = ["上期末班", "近期班次", "指定休息日", "拒绝班次(强)", "减少班次(弱)", "不可排班次", "可排班次"]
+ACTIVITY_COLUMNS = ["活动名称", "日期", "指定班次", "所需人数"]
+DEMAND_COLUMNS = ["日期", "时段", "开始", "结束", "所需人数"]
+ALIASES = {"员工": "姓名", "名字": "姓名", "员工姓名": "姓名", "活动": "活动名称", "班次": "指定班次", "人数": "所需人数",
+           "拒绝班次": "拒绝班次(强)", "减少班次": "减少班次(弱)"}
+TRUE_MARKS = {"1", "是", "√", "✓", "✔", "y", "yes", "true", "可", "○", "o"}
+
+
+# --- 读取 ---
+def _cell(v):
+    if v is None: return ""
+    if isinstance(v, datetime.datetime): return v.date().isoformat()
+    if isinstance(v, datetime.date): return v.isoformat()
+    if isinstance(v, float) and v.is_integer(): return str(int(v))
+    return str(v).strip()
+
+
+def _collect(title, rows):
+    """逐行消费 rows (第一行是表头)，只留认得的列；返回原始表 dict，没有认得的列时返回 None。"""
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None: return None
+    names = [ALIASES.get(_cell(h), _cell(h)) for h in header]
+    keep = [(i, h) for i, h in enumerate(names) if h]
+    cols = {h: [] for _, h in keep}
+    line = []
+    for n, row in enumerate(rows, 2):
+        values = [_cell(row[i]) if i < len(row) else "" for i, _ in keep]
+        if not any(values): continue
+        for (_, h), v in zip(keep, values):
+            cols[h].append(v)
+        line.append(n)
+    return {"sheet": title, "header": [h for _, h in keep], "row": line, "cols": cols}
+
+
+def _read_csv(source):
+    # 上传的文件本来就在内存里；路径则逐行读。Excel 另存的 CSV 常是 GBK，UTF-8 解不开再试一次
+    data = source.read() if hasattr(source, "read") else None
+    for encoding in ("utf-8-sig", "gbk"):
+        src = io.TextIOWrapper(io.BytesIO(data), encoding=encoding, newline="") if data is not None else \
+            open(source, encoding=encoding, newline="")
+        try:
+            with src:
+                return _collect(None, csv.reader(src))
+        except UnicodeDecodeError:
+            continue
+    raise ValueError("CSV 编码无法识别，请另存为 UTF-8")
+
+
+def read_tables(source, filename=None):
+    """流式读取一个 xlsx / csv (路径或二进制文件对象)，返回原始表列表。filename 用来判断类型和标注表名。"""
+    filename = filename or (source if isinstance(source, str) else getattr(source, "name", ""))
+    base = os.path.basename(str(filename))
+    if str(filename).lower().endswith(".csv"):
+        table = _read_csv(source)
+        if table is None: return []
+        table["sheet"] = base
+        return [table]
+    book = load_workbook(source, read_only=True, data_only=True)
+    try:
+        tables = []
+        for ws in book.worksheets:
+            table = _collect(f"{base}/{ws.title}", ws.iter_rows(values_only=True))
+            if table is not None: tables.append(table)
+        return tables
+    finally:
+        book.close()
+
+
+# --- 校验 ---
+def _clock(text):
+    try:
+        return parse_clock(text)
+    except ValueError:
+        return None
+
+
+def _kind(table, shift_work):
+    header = set(table["header"])
+    if header & {"时段", "开始", "结束"}: return "demand"
+    if "日期" in header and sum(_clock(h) is not None for h in header) >= 2: return "demand"
+    if header & {"活动名称", "所需人数"} or {"日期", "指定班次"} <= header: return "activities"
+    if "姓名" not in header: return None
+    if header & set(shift_work) and not header & set(PREF_COLUMNS): return "availability"
+    return "employees"
+
+
+def _frame(table, columns):
+    n = len(table["row"])
+    df = pd.DataFrame({c: table["cols"].get(c, [""] * n) for c in columns}, dtype=object)
+    df["_row"] = table["row"]
+    return df
+
+
+def _tokens(col):
+    """逗号分隔的单元格展开成 (原行索引, 取值) 的 Series，空白项去掉。"""
+    t = col.str.replace("，", ",", regex=False).str.split(",").explode().str.strip()
+    return t[t.fillna("") != ""]
+
+
+class _Errors(list):
+    def add(self, sheet, df, mask, column, message):
+        for row, value in zip(df.loc[mask, "_row"], df.loc[mask, column]):
+            self.append({"sheet": sheet, "row": int(row), "column": column, "value": value, "message": message})
+
+
+def validate(tables, shifts, start_date=None, end_date=None):
+    """把 read_tables 的原始表校验、合并成 spec 片段。
+
+    返回 {employees, preferences, availability, activities, demand, errors, sheets}：employees 为名单 (没有员工表时
+    为空，沿用页面上的名单)，preferences 为个人需求行 (只含非空列)，availability 为 {姓名: [能上的班次]}，
+    activities 的日期统一成 ISO 格式；给了 start_date / end_date 时周期外的活动日期记为错误。
+    demand 为时段需求行 [{日期, 时段, 人数}] (格式见 coverage)，日期为 ISO / 周X / 空 (每天)。
+    """
+    shifts = [str(s).strip() for s in shifts]
+    off = next((s for s in shifts if "休" in s), None)
+    shift_work = [s for s in shifts if s != off]
+    errors = _Errors()
+    sheets, staff, skills, acts, demand = [], [], [], [], []
+    for table in tables:
+        kind = _kind(table, shift_work)
+        sheets.append({"sheet": table["sheet"], "kind": kind, "rows": len(table["row"])})
+        if kind is None:
+            errors.append({"sheet": table["sheet"], "row": 1, "column": None, "value": "",
+                           "message": "无法识别的表：需要 姓名 列 (员工 / 技能表) 或 活动名称 / 日期 / 指定班次 / 所需人数 列"})
+        elif kind == "employees": staff.append(_check_employees(table, shifts, shift_work, errors))
+        elif kind == "availability": skills.append(_check_availability(table, shift_work, errors))
+        elif kind == "demand": demand += _check_demand(table, start_date, end_date, errors)
+        else: acts.append(_check_activities(table, shift_work, start_date, end_date, errors))
+
+    employees, preferences, availability = [], [], {}
+    if staff:
+        emp = pd.concat(staff, ignore_index=True)
+        employees = emp["姓名"].drop_duplicates().tolist()
+        # 同一个人出现在多张表里：每列取最后一个非空值
+        prefs = emp.drop(columns="_row").replace("", pd.NA).groupby("姓名", sort=False).last()
+        allowed = prefs.pop("可排班次").dropna()
+        preferences = [{"姓名": name, **{c: v for c, v in row.items() if not pd.isna(v)}}
+                       for name, row in zip(prefs.index, prefs.to_dict("records"))]
+        for name, text in allowed.items():
+            availability[name] = [s.strip() for s in text.replace("，", ",").split(",") if s.strip() in shift_work]
+    if skills:
+        sk = pd.concat(skills, ignore_index=True)
+        if not employees: employees = sk["姓名"].drop_duplicates().tolist()
+        unknown = ~sk["姓名"].isin(employees)
+        for sheet, row, name in zip(sk.loc[unknown, "sheet"], sk.loc[unknown, "_row"], sk.loc[unknown, "姓名"]):
+            errors.append({"sheet": sheet, "row": int(row), "column": "姓名", "value": name,
+                           "message": "技能表里的人不在员工名单中，已忽略"})
+        availability.update(zip(sk.loc[~unknown, "姓名"], sk.loc[~unknown, "allowed"]))
+    activities = pd.concat(acts, ignore_index=True).drop(columns="_row").to_dict("records") if acts else []
+    return {"employees": employees, "preferences": preferences, "availability": availability,
+            "activities": activities, "demand": demand, "errors": list(errors), "sheets": sheets}
+
+
+def _check_employees(table, shifts, shift_work, errors):
+    sheet = table["sheet"]
+    df = _frame(table, ["姓名"] + PREF_COLUMNS)
+    blank = df["姓名"].eq("")
+    errors.add(sheet, df, blank, "姓名", "姓名为空，整行忽略")
+    dup = df["姓名"].duplicated() & ~blank
+    errors.add(sheet, df, dup, "姓名", "同一张表里姓名重复，只保留第一行")
+    df = df[~blank & ~dup].copy()
+
+    def clear(mask, column, message):
+        errors.add(sheet, df, mask, column, message)
+        df.loc[mask, column] = ""
+
+    clear(~df["上期末班"].isin(shifts + [""]), "上期末班", "未知班次")
+    for column in ("拒绝班次(强)", "减少班次(弱)"):
+        clear(~df[column].isin(shift_work + [""]), column, "未知的工作班次")
+    for column, valid, message in (("近期班次", shifts, "含未知班次"), ("不可排班次", shift_work, "含未知的工作班次"),
+                                   ("可排班次", shift_work, "含未知的工作班次")):
+        t = _tokens(df[column])
+        bad = t[~t.isin(valid)]
+        clear(df.index.isin(bad.index), column, message)
+    t = _tokens(df["指定休息日"])
+    bad = t[~t.str.fullmatch(r"\d+")]
+    clear(df.index.isin(bad.index), "指定休息日", "应为天序号，如 1,3")
+    return df
+
+
+def _check_availability(table, shift_work, errors):
+    sheet = table["sheet"]
+    df = _frame(table, ["姓名"] + shift_work)
+    blank = df["姓名"].eq("")
+    errors.add(sheet, df, blank, "姓名", "姓名为空，整行忽略")
+    dup = df["姓名"].duplicated() & ~blank
+    errors.add(sheet, df, dup, "姓名", "同一张表里姓名重复，只保留第一行")
+    df = df[~blank & ~dup]
+    marks = np.column_stack([df[s].str.lower().isin(TRUE_MARKS) for s in shift_work])
+    allowed = [[s for s, m in zip(shift_work, row) if m] for row in marks]
+    return pd.DataFrame({"sheet": sheet, "姓名": df["姓名"], "_row": df["_row"], "allowed": allowed})
+
+
+def _dates(col, start_date, end_date, drop):
+    """日期列 -> datetime.date 的 Series。完整日期直接解析；只有 月-日 的按排班周期对到具体哪一天。"""
+    dates = pd.to_datetime(col.str.slice(0, 10), errors="coerce", format="mixed").dt.date.astype(object)
+    md = col.str.extract(r"^\s*(\d{1,2})[-/.](\d{1,2})(?:\s|$)")
+    if start_date is not None and end_date is not None:
+        start, end = _as_date(start_date), _as_date(end_date)
+        horizon = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+        lookup = {d.strftime("%m-%d"): d for d in horizon}
+        dates = dates.where(md[0].isna(), (md[0].str.zfill(2) + "-" + md[1].str.zfill(2)).map(lookup))
+        drop(dates.isna(), "日期", "日期无法识别或不在排班周期内，整行忽略")
+        drop(~dates.isin(horizon), "日期", "日期不在排班周期内，整行忽略")
+    else:
+        drop(dates.isna() | md[0].notna(), "日期", "日期需要写完整 (如 2026-10-17)，整行忽略")
+    return dates
+
+
+def _check_activities(table, shift_work, start_date, end_date, errors):
+    sheet = table["sheet"]
+    df = _frame(table, ACTIVITY_COLUMNS)
+    bad = pd.Series(False, index=df.index)
+
+    def drop(mask, column, message):
+        nonlocal bad
+        mask = mask & ~bad
+        errors.add(sheet, df, mask, column, message)
+        bad = bad | mask
+
+    drop(~df["指定班次"].isin(shift_work), "指定班次", "未知的工作班次，整行忽略")
+    req = pd.to_numeric(df["所需人数"], errors="coerce")
+    drop(req.isna() | (req < 0) | (req % 1 != 0), "所需人数", "所需人数应为非负整数，整行忽略")
+
+    dates = _dates(df["日期"], start_date, end_date, drop)
+
+    df = df[~bad]
+    return pd.DataFrame({"活动名称": df["活动名称"], "日期": [d.isoformat() for d in dates[~bad]],
+                         "指定班次": df["指定班次"], "所需人数": req[~bad].astype(int), "_row": df["_row"]})
+
+
+def _span(text):
+    try:
+        start, end = parse_span(text)
+    except ValueError:
+        return None
+    return f"{clock_label(start)}-{clock_label(end % (24 * 60))}"
+
+
+def _check_demand(table, start_date, end_date, errors):
+    sheet = table["sheet"]
+    times = sorted((m, h) for h in table["header"] if (m := _clock(h)) is not None)
+    if times:
+        # 曲线格式：每个时段一列，展开成 (日期, 时段, 人数) 行；最后一列的长度沿用前一列的间隔
+        ends = [m for m, _ in times[1:]] + [times[-1][0] + (times[-1][0] - times[-2][0])]
+        n = len(table["row"])
+        dates = table["cols"].get("日期", [""] * n)
+        table = {"sheet": sheet, "row": table["row"] * len(times), "cols": {
+            "日期": dates * len(times),
+            "时段": [f"{clock_label(m)}-{clock_label(e % (24 * 60))}" for (m, _), e in zip(times, ends) for _ in range(n)],
+            "所需人数": [v for _, h in times for v in table["cols"][h]],
+        }}
+    df = _frame(table, DEMAND_COLUMNS)
+    if times: df = df[df["所需人数"] != ""]
+    bad = pd.Series(False, index=df.index)
+
+    def drop(mask, column, message):
+        nonlocal bad
+        mask = mask & ~bad
+        errors.add(sheet, df, mask, column, message)
+        bad = bad | mask
+
+    span = df["时段"].where(df["时段"] != "", df["开始"] + "-" + df["结束"]).map(_span)
+    drop(span.isna(), "时段", "时段应为 10:00-14:00 或分别填写 开始 / 结束，整行忽略")
+    req = pd.to_numeric(df["所需人数"], errors="coerce")
+    drop(req.isna() | (req < 0) | (req % 1 != 0), "所需人数", "人数应为非负整数，整行忽略")
+    # 日期：留空 / 每天 / 周X 原样保留，其余按活动表的规则解析
+    keep = df["日期"].isin(ALL_DAYS + WEEKDAYS)
+    day = df["日期"].where(keep, "")
+    if (~keep).any():
+        dates = _dates(df.loc[~keep, "日期"], start_date, end_date,
+                       lambda mask, column, message: drop(mask.reindex(df.index, fill_value=False), column, message))
+        day[~keep] = [d.isoformat() if isinstance(d, datetime.date) else "" for d in dates]
+    ok = ~bad
+    return [{"日期": d, "时段": t, "人数": int(n)} for d, t, n in zip(day[ok], span[ok], req[ok])]
+
+
+def import_files(sources, shifts, start_date=None, end_date=None):
+    """read_tables + validate 的简写，sources 为 [(文件, 文件名)] 或路径列表。"""
+    tables = []
+    for src in sources:
+        source, filename = src if isinstance(src, tuple) else (src, None)
+        tables += read_tables(source, filename)
+    return validate(tables, shifts, start_date, end_date)
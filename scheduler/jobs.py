@@ -0,0 +1,364 @@
+"""后台排班任务队列：求解放到独立的子进程里跑，任务和结果存进本地 SQLite，页面刷新后凭任务号取回。
+
+    queue = JobQueue(max_running=2)
+    job_id = queue.submit(spec, owner="店长A", time_limit=25)
+    queue.get(job_id)     # {"id", "status", "position", "solutions", "progress", "result", "alternatives", ...}
+    queue.stop(job_id)    # 采用当前方案：打断搜索，已找到的最好方案照常保存
+    queue.cancel(job_id)  # 作废
+
+状态流转：queued → running → done / failed / cancelled。
+同时运行的任务数不超过 max_running (按整个数据库计，多个 Streamlit 进程共用同一个文件也成立)。
+有空位时先挑运行中任务最少的提交人，同一人再按提交先后，多人共用一台服务器时轮流排，不会一个人占满 CPU。
+运行中的任务由子进程里的看守线程轮询停止 / 取消标记并打断求解；取消后超过 KILL_GRACE 秒进程还没退出就强制结束。
+子进程每次新建，结果缓存的内存一级只在 JobQueue 所在的长驻进程里有用：普通求解提交时先在这里查缓存
+(内存 LRU，没有再读磁盘)，命中就直接记为 done，不排队也不起子进程。
+"""
+import datetime
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+import numpy as np
+
+from .alternatives import solve_alternatives
+from .cache import DEFAULT_CACHE_DIR, SolutionCache
+from .engine import solve
+from .horizon import solve_rolling
+
+DB_PATH = os.environ.get(
+    "SCHEDULE_AI_JOBS_DB", os.path.join(os.path.expanduser("~"), ".cache", "schedule-ai", "jobs.sqlite3"))
+
+MODES = ("solve", "rolling", "alternatives")
+ACTIVE = ("queued", "running")
+KILL_GRACE = 5.0
+# 子进程写进度的最小间隔 (秒)：解来得很密时不必每个都落盘
+PROGRESS_INTERVAL = 0.5
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL DEFAULT '',
+    mode TEXT NOT NULL,
+    status TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    options TEXT NOT NULL,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL,
+    pid INTEGER,
+    signal TEXT,
+    signaled REAL,
+    solutions INTEGER NOT NULL DEFAULT 0,
+    progress TEXT,
+    result TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+"""
+
+
+def _plain(v):
+    # 页面上的表格里混着 numpy 数值和日期，统一转成 JSON 能存的形式
+    if isinstance(v, np.generic): return v.item()
+    if isinstance(v, (datetime.date, datetime.datetime)): return v.isoformat()
+    return str(v)
+
+
+def _dumps(obj):
+    return json.dumps(obj, ensure_ascii=False, default=_plain)
+
+
+def _connect(path):
+    db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+    db.row_factory = sqlite3.Row
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(_SCHEMA)
+    return db
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    return True
+
+
+class JobQueue:
+    """任务队列。同一个数据库文件可以被多个 JobQueue (多个进程) 共用，调度用 SQLite 的写锁互斥。"""
+
+    def __init__(self, path=DB_PATH, max_running=None, num_workers=None, cache_dir=DEFAULT_CACHE_DIR, poll=0.2):
+        self.path = path
+        cores = os.cpu_count() or 1
+        self.max_running = max_running or max(1, cores // 2)
+        # 每个任务的 CP-SAT 线程数，缺省按并发数平分核数
+        self.num_workers = num_workers or max(1, cores // self.max_running)
+        self.cache_dir = cache_dir
+        self.cache = SolutionCache(cache_dir=cache_dir or None)
+        self.poll = poll
+        self._procs = {}
+        self._lock = threading.Lock()
+        self._dispatcher = None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._recover()
+        self._ensure_dispatcher()
+
+    def _db(self):
+        return _connect(self.path)
+
+    def _recover(self):
+        """上次服务退出时还在跑的任务：进程已经不在了就记为失败。"""
+        db = self._db()
+        try:
+            for row in db.execute("SELECT id, pid FROM jobs WHERE status = 'running'").fetchall():
+                if row["pid"] is None or not _alive(row["pid"]):
+                    db.execute("UPDATE jobs SET status = 'failed', finished = ?, error = ? "
+                               "WHERE id = ? AND status = 'running'", (time.time(), "服务重启，任务中断", row["id"]))
+        finally:
+            db.close()
+
+    # --- 提交与查询 ---
+    def submit(self, spec, owner="", mode="solve", **options):
+        """提交一个任务，返回任务号。options 原样传给 solve / solve_rolling / solve_alternatives：
+        rolling 需要 window (可带 overlap)，alternatives 需要 k；缓存、进度回调和停止信号由队列自己接管。"""
+        if mode not in MODES: raise ValueError(f"未知任务类型: {mode}")
+        job_id = uuid.uuid4().hex[:12]
+        cached = self._cached(spec, mode, options)
+        now = time.time()
+        db = self._db()
+        try:
+            if cached is not None:
+                db.execute("INSERT INTO jobs (id, owner, mode, status, spec, options, created, started, finished, result) "
+                           "VALUES (?, ?, ?, 'done', ?, ?, ?, ?, ?, ?)",
+                           (job_id, owner, mode, _dumps(spec), _dumps(options), now, now, now,
+                            _dumps({"result": cached})))
+                return job_id
+            db.execute("INSERT INTO jobs (id, owner, mode, status, spec, options, created) "
+                       "VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                       (job_id, owner, mode, _dumps(spec), _dumps(options), now))
+        finally:
+            db.close()
+        self._ensure_dispatcher()
+        return job_id
+
+    def _cached(self, spec, mode, options):
+        """普通求解先查本进程的缓存，命中时返回结果 dict；滚动 / 多方案每次都要真正求解，不查。"""
+        if mode != "solve": return None
+        try:
+            return solve(spec, cache=self.cache, cache_only=True, **options)
+        except ValueError:
+            # 输入有误照常排队，由子进程把错误记到任务上
+            return None
+
+    def get(self, job_id):
+        """任务详情；不存在时返回 None。
+
+        position 是排队中的任务前面还有几个排队任务；progress 是最近一次进度 (同 solve 的 on_solution)；
+        完成后 result 是结果 dict (结构同 solve)，alternatives 模式另有 alternatives 列表，result 为第一套。
+        """
+        db = self._db()
+        try:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None: return None
+            job = dict(row)
+            job["position"] = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created < ?",
+                                         (job["created"],)).fetchone()[0] if job["status"] == "queued" else 0
+        finally:
+            db.close()
+        job["spec"], job["options"] = json.loads(job["spec"]), json.loads(job["options"])
+        job["progress"] = json.loads(job["progress"]) if job["progress"] else None
+        payload = json.loads(job.pop("result")) if job["result"] else {}
+        job["alternatives"] = payload.get("alternatives")
+        job["result"] = payload.get("result") or (job["alternatives"] or [None])[0]
+        return job
+
+    def list(self, owner=None, limit=50):
+        """最近的任务概况 (不含 spec 和结果)，新的在前。"""
+        cols = "id, owner, mode, status, created, started, finished, solutions, error"
+        sql, args = f"SELECT {cols} FROM jobs", ()
+        if owner is not None: sql, args = sql + " WHERE owner = ?", (owner,)
+        db = self._db()
+        try:
+            return [dict(r) for r in db.execute(sql + " ORDER BY created DESC LIMIT ?", (*args, limit)).fetchall()]
+        finally:
+            db.close()
+
+    def stop(self, job_id):
+        """让运行中的任务提前收尾，已找到的最好方案照常保存。返回是否生效。"""
+        return self._signal(job_id, "stop")
+
+    def cancel(self, job_id):
+        """取消任务：排队中的直接作废，运行中的打断后丢弃结果。返回是否生效。"""
+        db = self._db()
+        try:
+            cur = db.execute("UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status = 'queued'",
+                             (time.time(), job_id))
+            if cur.rowcount: return True
+        finally:
+            db.close()
+        return self._signal(job_id, "cancel")
+
+    def _signal(self, job_id, signal):
+        db = self._db()
+        try:
+            # 已经要求取消的任务不能再降级成 stop
+            cur = db.execute("UPDATE jobs SET signal = ?, signaled = ? WHERE id = ? AND status = 'running' "
+                             "AND (signal IS NULL OR signal = 'stop')", (signal, time.time(), job_id))
+            return cur.rowcount > 0
+        finally:
+            db.close()
+
+    def purge(self, days=7):
+        """删掉 days 天前结束的任务，返回删除条数。"""
+        db = self._db()
+        try:
+            cur = db.execute("DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND finished < ?",
+                             (time.time() - days * 86400,))
+            return cur.rowcount
+        finally:
+            db.close()
+
+    # --- 调度 ---
+    def _ensure_dispatcher(self):
+        with self._lock:
+            if self._dispatcher is None:
+                self._dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+                self._dispatcher.start()
+
+    def _dispatch(self):
+        while True:
+            self._reap()
+            self._launch()
+            with self._lock:
+                # 没有排队的任务、本进程也没有在跑的子进程时退出，下次提交再起
+                if not self._procs and not self._queued():
+                    self._dispatcher = None
+                    return
+            time.sleep(self.poll)
+
+    def _queued(self):
+        db = self._db()
+        try:
+            return db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+        finally:
+            db.close()
+
+    def _claim(self):
+        """在写锁里挑下一个任务并标记为 running；没有空位或没有排队任务时返回 None。"""
+        db = self._db()
+        try:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                running = db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+                row = None
+                if running < self.max_running:
+                    row = db.execute(
+                        "SELECT id FROM jobs AS j WHERE status = 'queued' ORDER BY "
+                        "(SELECT COUNT(*) FROM jobs AS r WHERE r.status = 'running' AND r.owner = j.owner), created "
+                        "LIMIT 1").fetchone()
+                if row is not None:
+                    db.execute("UPDATE jobs SET status = 'running', started = ? WHERE id = ?", (time.time(), row["id"]))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            return row["id"] if row is not None else None
+        finally:
+            db.close()
+
+    def _launch(self):
+        # 用 python -m 起一个干净的解释器：Streamlit 把页面脚本当成 __main__，spawn 子进程会把页面整个重跑一遍
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")]))}
+        while True:
+            job_id = self._claim()
+            if job_id is None: return
+            proc = subprocess.Popen([sys.executable, "-m", "scheduler.jobs", self.path, job_id, str(self.num_workers),
+                                     self.cache_dir or ""], env=env)
+            with self._lock:
+                self._procs[job_id] = proc
+            db = self._db()
+            try:
+                db.execute("UPDATE jobs SET pid = ? WHERE id = ?", (proc.pid, job_id))
+            finally:
+                db.close()
+
+    def _reap(self):
+        with self._lock:
+            procs = list(self._procs.items())
+        if not procs: return
+        db = self._db()
+        try:
+            for job_id, proc in procs:
+                if proc.poll() is None:
+                    row = db.execute("SELECT signal, signaled FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                    if row["signal"] == "cancel" and time.time() - row["signaled"] > KILL_GRACE: proc.kill()
+                    continue
+                with self._lock:
+                    self._procs.pop(job_id, None)
+                # 子进程没来得及写结果就退出了 (被杀 / 崩溃)
+                row = db.execute("SELECT signal FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                status, error = ("cancelled", None) if row["signal"] == "cancel" else \
+                    ("failed", f"子进程异常退出 (exitcode {proc.returncode})")
+                db.execute("UPDATE jobs SET status = ?, finished = ?, error = ? WHERE id = ? AND status = 'running'",
+                           (status, time.time(), error, job_id))
+        finally:
+            db.close()
+
+
+# --- 子进程 ---
+def _run_job(path, job_id, num_workers, cache_dir):
+    db = _connect(path)
+    lock = threading.Lock()
+    row = db.execute("SELECT mode, spec, options FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    mode, spec, options = row["mode"], json.loads(row["spec"]), json.loads(row["options"])
+    stop, done = threading.Event(), threading.Event()
+    state = {"solutions": 0, "written": 0.0, "cancelled": False}
+
+    def watch():
+        while not done.wait(0.3):
+            with lock:
+                signal = db.execute("SELECT signal FROM jobs WHERE id = ?", (job_id,)).fetchone()["signal"]
+            if signal is not None:
+                state["cancelled"] = signal == "cancel"
+                stop.set()
+                return
+
+    def on_solution(info):
+        state["solutions"] += 1
+        now = time.monotonic()
+        if now - state["written"] < PROGRESS_INTERVAL: return
+        state["written"] = now
+        with lock:
+            db.execute("UPDATE jobs SET solutions = ?, progress = ? WHERE id = ?",
+                       (state["solutions"], _dumps(info), job_id))
+
+    threading.Thread(target=watch, daemon=True).start()
+    kw = {"num_workers": num_workers, **options, "cache": SolutionCache(cache_dir=cache_dir or None),
+          "on_solution": on_solution, "stop_event": stop}
+    try:
+        if mode == "rolling":
+            payload = {"result": solve_rolling(spec, kw.pop("window"), kw.pop("overlap", 7), **kw)}
+        elif mode == "alternatives":
+            payload = {"alternatives": solve_alternatives(spec, kw.pop("k"), **kw)}
+        else:
+            payload = {"result": solve(spec, **kw)}
+        status, error = "done", None
+    except Exception as exc:
+        payload, status, error = None, "failed", f"{type(exc).__name__}: {exc}"
+    done.set()
+    if state["cancelled"]: payload, status = None, "cancelled"
+    with lock:
+        db.execute("UPDATE jobs SET status = ?, finished = ?, solutions = ?, result = ?, error = ? WHERE id = ?",
+                   (status, time.time(), state["solutions"], _dumps(payload) if payload else None, error, job_id))
+    db.close()
+
+
+if __name__ == "__main__":
+    # JobQueue 启动的子进程：python -m scheduler.jobs <数据库> <任务号> <线程数> <缓存目录>
+    _run_job(sys.argv[1], sys.argv[2], int(sys.argv[3]), sys.argv[4])
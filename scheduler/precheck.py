@@ -0,0 +1,113 @@
+"""求解前的解析可行性预检：纯计数 / 鸽巢原理，毫秒级，不建 CpModel。
+
+只检查硬约束 (每日一班、0排班禁令、平时基线、休息天数恰好等于目标、活动需求)，
+发现必然无解的输入时给出精确到 日期/班次 的原因。战时基线、时段需求是软约束，排不满的只给 warn。
+"""
+import numpy as np
+
+from .audit import availability
+from .coverage import DAY_MINUTES, coverage_matrix, span_label
+
+
+def _issue(severity, kind, message, day=None, shift=None):
+    return {"severity": severity, "kind": kind, "day": day, "shift": shift, "message": message}
+
+
+def demand_matrix(ns):
+    """(天 × 班次) 的硬性最低人数：平时取基线，战时只算活动 (同一格多行活动取最大)。"""
+    D, S = ns["num_days"], len(ns["shifts"])
+    act = np.zeros((D, S), dtype=np.int64)
+    for a in ns["activities"]:
+        act[a["day"], a["shift"]] = max(act[a["day"], a["shift"]], a["req"])
+    base = np.zeros(S, dtype=np.int64)
+    for s_idx, v in ns["min_staff"].items():
+        base[s_idx] = v
+    war = act.any(axis=1)
+    need = np.where(war[:, None], act, np.maximum(act, base[None, :]))
+    return need, act, base, war
+
+
+def precheck(ns):
+    """返回问题列表 [{severity, kind, day, shift, message}]，severity 为 error (必然无解) / warn。"""
+    E, D = len(ns["employees"]), ns["num_days"]
+    shifts, headers = ns["shifts"], ns["date_headers"]
+    T = ns["target_off_days"]
+    targets = np.asarray(ns.get("rest_targets") or [T] * E)
+    issues = []
+
+    # 1. 休息天数本身
+    bad = sorted({int(t) for t in targets if t < 0 or t > D})
+    if bad:
+        issues.append(_issue("error", "rest", f"周期只有 {D} 天，无法让每人恰好休 {'/'.join(map(str, bad))} 天"))
+        return issues
+
+    need, act, base, war = demand_matrix(ns)
+    banned = [s for s in ns["work_idx"] if ns["min_staff"].get(s, 0) == 0 and s not in ns.get("demand_shifts", [])]
+
+    # 2. 0排班禁令 vs 活动：被禁的班次不能有活动需求
+    for d, s in zip(*np.nonzero(act[:, banned] > 0)):
+        s_idx = banned[s]
+        issues.append(_issue("error", "banned_activity",
+                             f"{headers[d]} {shifts[s_idx]}: 活动需要 {act[d, s_idx]} 人，但该班次基线为 0 (禁止排班)",
+                             day=int(d), shift=shifts[s_idx]))
+
+    # 3. 所有工作班次都被禁，却要求每人上班
+    if len(banned) == len(ns["work_idx"]) and (targets < D).any():
+        issues.append(_issue("error", "all_banned",
+                             f"所有工作班次基线都为 0，但每人仍需上班 {D - int(targets.min())} 天"))
+
+    # 3b. 技能 / 不可排：某班次的需求超过能上这个班次的人数；或者有人一个工作班次都不能上
+    mask = availability(ns)
+    able = mask.sum(axis=0)
+    for d, s in zip(*np.nonzero(need > able[None, :])):
+        issues.append(_issue("error", "skill_capacity",
+                             f"{headers[d]} {shifts[s]}: 需要 {need[d, s]} 人，但只有 {able[s]} 人能上{shifts[s]}",
+                             day=int(d), shift=shifts[s]))
+    for e in np.nonzero(~mask[:, ns["work_idx"]].any(axis=1) & (targets < D))[0]:
+        issues.append(_issue("error", "no_shift",
+                             f"{ns['employees'][e]} 没有任何可排的工作班次，却需要上班 {D - int(targets[e])} 天"))
+
+    # 4. 单日人数：每人每天只能上一个班
+    day_need = need.sum(axis=1)
+    for d in np.nonzero(day_need > E)[0]:
+        parts = " + ".join(f"{shifts[s]}{need[d, s]}" for s in np.nonzero(need[d])[0])
+        what = "活动需求" if war[d] else "非活动日基线"
+        issues.append(_issue("error", "day_capacity",
+                             f"{headers[d]}: {what}合计 {day_need[d]} 人 ({parts})，超过总人数 {E} 人", day=int(d)))
+
+    # 5. 鸽巢：全周期的硬性人天需求 vs 休息后剩余的可用人天
+    capacity = int((D - targets).sum())
+    if day_need.sum() > capacity:
+        detail = f"{E} 人 × {D - T} 个上班日，休息 {T} 天" if (targets == T).all() else f"{E} 人按各自休息目标"
+        issues.append(_issue("error", "period_capacity",
+                             f"全周期硬性需求 {int(day_need.sum())} 人天，超过可用人力 {capacity} 人天 ({detail})"))
+
+    # 6. 战时基线被活动挤占 (软约束，只提醒)
+    if war.any():
+        base_need = np.where(base[None, :] > act, base[None, :], act)
+        for d in np.nonzero(war & (base_need.sum(axis=1) > E))[0]:
+            issues.append(_issue("warn", "war_baseline",
+                                 f"{headers[d]}: 活动加其他班次基线合计 {int(base_need[d].sum())} 人，超过总人数 {E} 人，"
+                                 "部分班次基线将被活动挤占", day=int(d)))
+
+    # 7. 时段需求 (软约束)：没有任何班次覆盖的时段，和需求超过总人数的时段
+    if ns.get("demand"):
+        need = np.asarray(ns["demand"], dtype=np.int64)
+        T = DAY_MINUTES // ns["slot_minutes"]
+        C = coverage_matrix(ns["shift_slots"], len(shifts), T)
+        covered = np.tile(C[:, :T].any(axis=0), (D, 1))
+        covered[1:] |= C[:, T:].any(axis=0)
+        for kind, bad, what in (("uncovered_slot", (need > 0) & ~covered, "没有任何可排的班次覆盖这个时段"),
+                                ("slot_capacity", need > E, f"超过总人数 {E} 人")):
+            for d in np.nonzero(bad.any(axis=1))[0]:
+                ts = np.nonzero(bad[d])[0]
+                runs = np.split(ts, np.nonzero(np.diff(ts) > 1)[0] + 1)
+                spans = "、".join(span_label(r[0], r[-1] + 1, ns["slot_minutes"]) for r in runs)
+                issues.append(_issue("warn", kind, f"{headers[d]} {spans}: 需要 {int(need[d, ts].max())} 人在岗，{what}",
+                                     day=int(d)))
+
+    return issues
+
+
+def errors(issues):
+    return [i for i in issues if i["severity"] == "error"]
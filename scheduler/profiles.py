@@ -0,0 +1,73 @@
+"""CP-SAT 求解档位 (solver profile)。
+
+每个档位就是一组 SatParameters 字段 + 时间上限，枚举字段写成名字 (如 "PORTFOLIO_SEARCH")。
+"auto" 档位按实例规模查 tune 模块写出的调优表，没有调优记录时退回 balanced。
+"""
+import json
+import os
+
+SOLVER_PROFILES = {
+    "fast": {
+        "label": "⚡ 快速预览",
+        "max_time_in_seconds": 5.0,
+        "num_search_workers": 8,
+        "linearization_level": 0,
+        "max_presolve_iterations": 1,
+        "symmetry_level": 0,
+    },
+    "balanced": {
+        "label": "⚖️ 均衡",
+        "max_time_in_seconds": 25.0,
+        "num_search_workers": 0,  # 0 = 用满所有核
+        "linearization_level": 1,
+    },
+    "thorough": {
+        "label": "🔬 深度优化",
+        "max_time_in_seconds": 120.0,
+        "num_search_workers": 0,
+        "linearization_level": 2,
+        "max_presolve_iterations": 5,
+        "symmetry_level": 2,
+    },
+}
+
+DEFAULT_PROFILE = "balanced"
+
+TUNING_FILE = os.environ.get(
+    "SCHEDULE_AI_TUNING_FILE", os.path.join(os.path.expanduser("~"), ".cache", "schedule-ai", "tuning.json"))
+
+# 按 员工×天×班次 布尔变量数分档
+SIZE_BUCKETS = [(1000, "≤1k"), (10000, "≤10k"), (50000, "≤50k"), (200000, "≤200k")]
+
+
+def size_bucket(ns):
+    n = len(ns["employees"]) * ns["num_days"] * len(ns["shifts"])
+    for limit, name in SIZE_BUCKETS:
+        if n <= limit: return name
+    return ">200k"
+
+
+def load_tuning(path=TUNING_FILE):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f).get("recommend", {})
+    except (OSError, ValueError):
+        return {}
+
+
+def resolve_profile(name, ns=None):
+    """档位名 -> (实际档位名, 参数 dict)。未知档位抛 ValueError。"""
+    name = name or DEFAULT_PROFILE
+    if name == "auto":
+        name = load_tuning().get(size_bucket(ns), DEFAULT_PROFILE) if ns is not None else DEFAULT_PROFILE
+    if name not in SOLVER_PROFILES:
+        raise ValueError(f"未知求解档位: {name}")
+    return name, SOLVER_PROFILES[name]
+
+
+def apply_params(solver, params):
+    """把参数 dict 写进 solver.parameters，枚举值按名字解析。"""
+    for field, value in params.items():
+        if field == "label": continue
+        if isinstance(value, str): value = getattr(solver.parameters, value)
+        setattr(solver.parameters, field, value)
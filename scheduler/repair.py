@@ -0,0 +1,166 @@
+"""局部修复 (LNS)：已发布的排班遇到临时变动 (请病假、新增活动行) 时就近修补，不整张重排。
+
+    result = repair(spec, published, absences={"张三": ["2026-10-14"]})
+
+spec 是变动之后的 spec (新增的活动行直接写进去)，published 是已发布的排班 (格式同 engine.normalize_hint，
+导出的 Excel 可先用 hint_from_frame 读回)，absences 是临时请假 {姓名: [日期, ...]}，这些格子强制排休息。
+
+只放开受影响的邻域：请假的日子，以及发布版在新 spec 下出现缺口 (活动 / 基线 / 时段覆盖 / 不可排 / 缺格) 的日子，
+前后各扩 radius 天，这几天里所有人的格子都可以动，其余格子原样固定；休息天数对不上时整期放开。
+邻域按滚动时域的窗口 (horizon.window_spec) 单独建模：窗口前的排班作为上期历史，窗口后再带上
+max_consecutive 天已发布的格子 (在子模型里固定)，右侧接缝处的晚转早和连班照常计罚；
+窗口外已上的班次计入 prior_counts，每人窗口内的休息目标 = 总目标 - 窗口外已休 (周末轮休同理)，
+模型规模只与窗口天数有关。
+邻域里无解、超时，或修完比发布版多出晚转早 / 连班违规，就把 radius 翻倍重试，最后一轮放开整个周期。
+目标是原有的加权罚分，外加每改动一格 W_CHANGE 分，只有值得的时候才改格子。
+"""
+import os
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from .audit import audit, availability, failures, shift_counts, shift_names
+from .engine import (STATUS_NAMES, build_model, extract_array, normalize_hint, normalize_spec, run_solver,
+                     weighted_objective)
+from .horizon import window_spec
+from .profiles import resolve_profile
+
+# 改动一格的代价：高于 减少班次 (100)，低于 拒绝班次 (20000)，不为了弱偏好去打扰别人
+W_CHANGE = 1000
+
+
+def seed_days(ns, pub, absent):
+    """发布版在新 spec 下需要动的日子；休息天数对不上 (只能整期调整) 时返回 None。"""
+    E, D = pub.shape
+    days = {d for _, d in absent}
+    days.update(np.nonzero((pub < 0).any(axis=0))[0].tolist())
+    mask = availability(ns)
+    filled = np.where(pub < 0, ns["off_idx"], pub)
+    for e, d in absent: filled[e, d] = ns["off_idx"]
+    bad = ~mask[np.arange(E)[:, None], filled] & (pub >= 0)
+    days.update(np.nonzero(bad.any(axis=0))[0].tolist())
+    for r in failures(audit(ns, filled)):
+        if r["check"] in ("activity", "baseline", "coverage") and r["day"] is not None: days.add(r["day"])
+        if r["check"] == "rest" and not (pub < 0).any(): return None
+    return days
+
+
+def seam_faults(ns, arr):
+    """晚转早和连班违规：{("fatigue", 员工, 天): 1, ("consecutive", 员工, None): 最长连班}，用来比较修复前后。"""
+    out = {}
+    for r in failures(audit(ns, arr)):
+        if r["check"] == "fatigue": out[("fatigue", r["employee"], r["day"])] = 1
+        if r["check"] == "consecutive": out[("consecutive", r["employee"], None)] = r["actual"]
+    return out
+
+
+def neighborhood_spec(ns, pub, a, b):
+    """[a, b) 窗口的子问题：窗口外的排班固定，折算成上期历史 / prior_counts / 休息目标。"""
+    wspec = window_spec(ns, pub, a, b)
+    outside = np.concatenate([pub[:, :a], pub[:, b:]], axis=1)
+    per_emp, _ = shift_counts(ns, outside)
+    prior = {}
+    for e, name in enumerate(ns["employees"]):
+        counts = {ns["shifts"][s]: int(per_emp[e, s]) + ns["prior_counts"].get(e, {}).get(s, 0) for s in ns["work_idx"]}
+        prior[name] = {s: v for s, v in counts.items() if v}
+    wspec["prior_counts"] = prior
+    wspec["rest_targets"] = {name: int(ns["rest_targets"][e] - per_emp[e, ns["off_idx"]])
+                             for e, name in enumerate(ns["employees"])}
+    wk = [d for d in ns["weekend_days"] if not a <= d < b]
+    wspec["weekend_relief"] = {ns["employees"][e]: k - int((pub[e, wk] == ns["off_idx"]).sum())
+                               for e, k in ns["weekend_relief"].items()}
+    return normalize_spec(wspec)
+
+
+def repair(spec, published, absences=None, radius=1, time_limit=1.0, num_workers=None, profile="fast", params=None):
+    """就近修复已发布的排班，返回与 solve 类似的结果 dict。
+
+    字段：store / status / matrix / audit / objective / wall_time / changes / rounds。
+    objective 是最后一轮邻域子模型的加权罚分 (不含改动成本)，整期的情况以 audit 为准；
+    changes 是改动过的格子 [{employee, day, date, before, after, reason}]，reason 为 请假 或 调整；
+    rounds 记录每一轮的邻域 [{radius, start, end, cells, status, wall_time}]，status 为 REJECTED 的一轮
+    是解出来了但比发布版多了晚转早 / 连班违规，随后放大邻域重试。
+    time_limit 是每一轮的时间上限，num_workers 缺省取档位线程数与核数中较小的。
+    请假落在原本的工作日上时，本人的休息额度同步加一天 (请假不占休息)；原本就休息的日子不另补。
+    所有轮次都失败时 matrix 为 None。
+    """
+    ns = normalize_spec(spec)
+    E, D, S = len(ns["employees"]), ns["num_days"], len(ns["shifts"])
+    off_idx = ns["off_idx"]
+    pub = np.full((E, D), -1, dtype=np.int16)
+    for e, d, s_idx in normalize_hint(ns, published):
+        pub[e, d] = s_idx
+    absent = {(e, d) for e, d, _ in normalize_hint(ns, {name: {day: ns["shifts"][off_idx] for day in days}
+                                                          for name, days in (absences or {}).items()})}
+    rest_targets = list(ns["rest_targets"])
+    for e, d in absent:
+        if pub[e, d] != off_idx: rest_targets[e] += 1
+    ns = {**ns, "rest_targets": rest_targets}
+
+    _, profile_params = resolve_profile(profile, ns)
+    profile_params = {**profile_params, **(params or {})}
+    # 只有一秒的预算：搜索线程多过核数时各线程分到的时间太碎，连第一轮改进都做不完
+    cores = os.cpu_count() or 1
+    num_workers = num_workers or min(profile_params.get("num_search_workers") or cores, cores)
+
+    result = {"store": ns["store"], "status": "OPTIMAL", "matrix": None, "audit": [], "objective": None,
+              "wall_time": 0.0, "changes": [], "rounds": []}
+    days = seed_days(ns, pub, absent)
+    filled = np.where(pub < 0, off_idx, pub)
+    for e, d in absent: filled[e, d] = off_idx
+    before = seam_faults(ns, filled)
+    arr = pub
+    r = radius
+    # 没有受影响的日子：发布版原样可用
+    while days != set():
+        free = np.zeros((E, D), dtype=bool)
+        if days is None or r >= D:
+            free[:] = True
+        else:
+            for d in days: free[:, max(0, d - r):d + r + 1] = True
+        cols = np.nonzero(free.any(axis=0))[0]
+        a, b = int(cols[0]), int(cols[-1]) + 1
+        # 子模型多带窗口后 max_consecutive 天的发布格子 (不在 free 里，下面固定)，接缝两侧一起计罚
+        c = min(D, b + ns["max_consecutive"])
+        sub = neighborhood_spec(ns, np.where(pub < 0, off_idx, pub), a, c)
+        sub_cells = [(e, d - a, int(pub[e, d])) for e in range(E) for d in range(a, c) if pub[e, d] >= 0]
+        model, shift_vars, penalties = build_model(sub, sub_cells)
+        for e in range(E):
+            for d in range(a, c):
+                s_pub = int(pub[e, d])
+                if (e, d) in absent:
+                    model.Add(shift_vars[(e, d - a, off_idx)] == 1)
+                elif not free[e, d] and (e, d - a, s_pub) in shift_vars:
+                    model.Add(shift_vars[(e, d - a, s_pub)] == 1)
+                elif s_pub >= 0:
+                    for s in range(S):
+                        if (e, d - a, s) in shift_vars: model.AddHint(shift_vars[(e, d - a, s)], s == s_pub)
+        # 稳定性惩罚换成改动成本：每个发布格子被改掉都要付 W_CHANGE
+        objective = weighted_objective({**penalties, "stability": []})
+        model.Minimize(objective + W_CHANGE * cp_model.LinearExpr.Sum(penalties["stability"]))
+        solver, status, _ = run_solver(model, time_limit=time_limit, num_workers=num_workers, params=profile_params)
+        result["wall_time"] += solver.WallTime()
+        result["status"] = STATUS_NAMES.get(status, str(status))
+        result["rounds"].append({"radius": r, "start": a, "end": b, "cells": int(free.sum()),
+                                 "status": result["status"], "wall_time": solver.WallTime()})
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            arr = pub.copy()
+            arr[:, a:b] = extract_array(sub, solver, shift_vars)[:, :b - a]
+            result["objective"] = float(solver.Value(objective))
+            after = seam_faults(ns, arr)
+            # 比发布版多出晚转早 / 连班违规的修复不收，放大邻域再来 (整期那一轮照收)
+            if free.all() or all(v <= before.get(k, 0) for k, v in after.items()): break
+            result["rounds"][-1]["status"] = result["status"] = "REJECTED"
+            arr = pub
+        if free.all(): return result
+        r *= 2
+
+    result["matrix"] = shift_names(ns, arr)
+    result["audit"] = audit(ns, arr)
+    for e, d in zip(*np.nonzero(arr != pub)):
+        result["changes"].append({
+            "employee": ns["employees"][e], "day": int(d), "date": ns["date_headers"][d],
+            "before": ns["shifts"][pub[e, d]] if pub[e, d] >= 0 else None, "after": ns["shifts"][arr[e, d]],
+            "reason": "请假" if (e, d) in absent else "调整",
+        })
+    return result
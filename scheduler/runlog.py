@@ -0,0 +1,54 @@
+"""运行日志：每次排班的阶段耗时、模型规模、求解统计和各惩罚族罚分，按 JSON Lines 追加到本地文件。
+
+    append(run_record(ns, result, phases={"table": 0.12}))
+    append(phase_record(ns, {"export": 0.3}))   # 导出是点击时才做的，单独记一行
+
+日志只在本机累积，用来事后对比 "哪一步慢了" "哪类约束在拉高罚分"；写失败 (磁盘满 / 无权限) 不影响排班。
+"""
+import datetime
+import json
+import os
+
+RUN_LOG = os.environ.get(
+    "SCHEDULE_AI_RUN_LOG", os.path.join(os.path.expanduser("~"), ".cache", "schedule-ai", "runs.jsonl"))
+
+PHASE_LABELS = {"parse": "解析输入", "precheck": "预检", "cache": "查缓存", "aggregate": "分组聚合", "build": "建模",
+                "solve": "求解", "audit": "审计", "conflicts": "冲突诊断", "table": "生成表格", "export": "导出 Excel"}
+
+
+def phase_record(ns, phases):
+    """只有阶段耗时的一行日志，用于求解之外单独发生的步骤 (如点击导出)。"""
+    return {
+        "ts": datetime.datetime.now().isoformat(timespec="seconds"),
+        "store": ns["store"],
+        "employees": len(ns["employees"]), "days": ns["num_days"], "shifts": len(ns["shifts"]),
+        "phases": dict(phases),
+    }
+
+
+def run_record(ns, result, phases=None):
+    """把 solve 的结果压成一行日志。phases 是调用方另外计时的阶段 (如出表)，并入结果里的阶段耗时。"""
+    stats = result.get("stats") or {}
+    build = result.get("build") or {}
+    return {
+        **phase_record(ns, {**stats.get("phases", {}), **(phases or {})}),
+        "profile": result.get("profile"), "objective_mode": result.get("objective_mode"),
+        "status": result["status"], "cached": result.get("cached", False),
+        "objective": result.get("objective"), "bound": result.get("bound"), "gap": result.get("gap"),
+        "model": {"variables": build.get("variables"), "constraints": build.get("constraints"),
+                  "families": build.get("families")} if build else None,
+        "solver": stats.get("solver"),
+        "penalties": stats.get("penalties"),
+    }
+
+
+def append(record, path=None):
+    """追加一行到日志文件，返回是否写成功。"""
+    path = path or RUN_LOG
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError:
+        return False
+    return True
@@ -0,0 +1,83 @@
+"""场景对比 (what-if)：同一份 spec 换几组 阈值 / 连班上限 / 基线 各排一遍，比较罚分、审计失败数和用时。
+
+    rows = run_scenarios(spec, [{"name": "当前设置"},
+                                {"name": "放宽平衡", "diff_daily_threshold": 2, "diff_period_threshold": 3},
+                                {"name": "连班5天", "max_consecutive": 5, "min_staff_per_shift": {"早班": 4}}])
+
+模型只建一次：场景里出现的旋钮建成可调的整数变量 (见 engine.build_model 的 knobs)，每个场景克隆一份
+模型，把旋钮变量的取值范围收成一个点，再放进线程池并发求解 (CP-SAT 求解时释放 GIL)。
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from ortools.sat.python import cp_model
+
+from .audit import audit, failures, shift_names
+from .engine import STATUS_NAMES, build_model, extract_array, normalize_spec, run_solver
+from .precheck import errors as precheck_errors
+from .precheck import precheck
+from .profiles import resolve_profile
+
+KNOBS = ["diff_daily_threshold", "diff_period_threshold", "max_consecutive"]
+
+
+def scenario_ns(ns, scenario):
+    """把场景里的设置套到归一化 spec 上，返回新的 ns。基线只能在原本大于 0 的班次上调整。"""
+    out = {**ns, "min_staff": dict(ns["min_staff"])}
+    for name in KNOBS:
+        if scenario.get(name) is not None: out[name] = int(scenario[name])
+    s_map = {s: i for i, s in enumerate(ns["shifts"])}
+    for s_name, v in (scenario.get("min_staff_per_shift") or {}).items():
+        s_idx = s_map.get(s_name)
+        if s_idx is None or ns["min_staff"].get(s_idx, 0) == 0:
+            raise ValueError(f"场景 {scenario.get('name', '')} 只能调整基线大于 0 的班次: {s_name}")
+        if int(v) < 1: raise ValueError(f"场景 {scenario.get('name', '')} 的 {s_name} 基线至少为 1")
+        out["min_staff"][s_idx] = int(v)
+    if out["max_consecutive"] < 1: raise ValueError("最大连班至少为 1 天")
+    return out
+
+
+def _knob_value(ns, name):
+    return ns["min_staff"][name[1]] if isinstance(name, tuple) else ns[name]
+
+
+def run_scenarios(spec, scenarios, time_limit=None, jobs=None, profile="fast", params=None):
+    """并发求解各个场景，按输入顺序返回 [{name, status, objective, failures, wall_time, matrix, audit, precheck}]。
+
+    time_limit 是每个场景的时间上限 (缺省用档位自带的)；jobs 是同时求解的场景数，缺省取场景数与核数中
+    较小的，核数在各场景间平分。预检未通过的场景不求解，status 为 PRECHECK_FAILED。
+    """
+    ns = normalize_spec(spec)
+    variants = [scenario_ns(ns, sc) for sc in scenarios]
+    names = [n for n in KNOBS if any(sc.get(n) is not None for sc in scenarios)]
+    names += sorted({("min_staff", s_idx) for v in variants for s_idx, val in v["min_staff"].items()
+                     if val != ns["min_staff"][s_idx]})
+    knobs = {n: (min(_knob_value(v, n) for v in [ns] + variants), max(_knob_value(v, n) for v in [ns] + variants))
+             for n in names}
+    model, shift_vars, _ = build_model(ns, knobs=knobs)
+
+    _, profile_params = resolve_profile(profile, ns)
+    profile_params = {**profile_params, **(params or {})}
+    cores = os.cpu_count() or 1
+    jobs = jobs or max(1, min(len(scenarios), cores))
+    num_workers = max(1, cores // jobs)
+
+    def run_one(i):
+        v, sc = variants[i], scenarios[i]
+        row = {"name": sc.get("name") or f"场景{i + 1}", "status": "PRECHECK_FAILED", "objective": None,
+               "failures": None, "wall_time": 0.0, "matrix": None, "audit": [], "precheck": precheck(v)}
+        if precheck_errors(row["precheck"]): return row
+        m = model.Clone()
+        for n, var in knobs.items():
+            domain = m.Proto().variables[var.Index()].domain
+            domain[0] = domain[1] = _knob_value(v, n)
+        solver, status, _ = run_solver(m, time_limit=time_limit, num_workers=num_workers, params=profile_params)
+        row.update(status=STATUS_NAMES.get(status, str(status)), wall_time=solver.WallTime())
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            arr = extract_array(v, solver, shift_vars)
+            row.update(objective=solver.ObjectiveValue(), matrix=shift_names(v, arr), audit=audit(v, arr))
+            row["failures"] = len(failures(row["audit"]))
+        return row
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(run_one, range(len(scenarios))))
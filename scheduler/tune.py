@@ -0,0 +1,95 @@
+"""求解档位调优：用基准实例把每个档位都跑一遍，记录谁最快达到最优目标值。
+
+    python -m scheduler.tune instances.ndjson --profiles fast,balanced,thorough --time-limit 30
+
+对每个实例，先取所有档位里最好的目标值，再看每个档位第一次达到它的时刻
+(time-to-best)；最快者胜出。按实例规模分档汇总胜出次数，写入调优表，
+之后 profile="auto" 就按规模选用胜出最多的档位。
+"""
+import argparse
+import json
+import math
+import os
+import sys
+from collections import Counter, defaultdict
+
+from .engine import normalize_spec, solve
+from .profiles import SOLVER_PROFILES, TUNING_FILE, size_bucket
+
+
+def time_to_best(incumbents, best, offset=0.0):
+    """第一次达到 best 的时刻。incumbents 的 wall_time 只算完整模型的求解，
+    offset 是之前分组计数模型已经用掉的秒数 (见 solve 的 aggregate 字段)，要加回去。"""
+    for inc in incumbents:
+        if inc["objective"] <= best + 1e-6: return offset + inc["wall_time"]
+    return math.inf
+
+
+def tune_instance(spec, profiles, time_limit=None):
+    ns = normalize_spec(spec)
+    runs = {}
+    for name in profiles:
+        result = solve(ns, profile=name, time_limit=time_limit)
+        runs[name] = {"status": result["status"], "objective": result["objective"],
+                      "gap": result["gap"], "wall_time": result["wall_time"], "incumbents": result["incumbents"],
+                      "aggregate_seconds": (result["aggregate"] or {}).get("seconds") or 0.0}
+    objs = [r["objective"] for r in runs.values() if r["objective"] is not None]
+    best = min(objs) if objs else None
+    for r in runs.values():
+        incumbents = r.pop("incumbents")
+        r["time_to_best"] = time_to_best(incumbents, best, r["aggregate_seconds"]) if best is not None else math.inf
+    winner = min(runs, key=lambda n: runs[n]["time_to_best"]) if best is not None else None
+    return {"store": ns["store"], "bucket": size_bucket(ns), "best_objective": best, "winner": winner,
+            "runs": runs}
+
+
+def recommend(rows):
+    """每个规模档里胜出次数最多的档位。"""
+    wins = defaultdict(Counter)
+    for row in rows:
+        if row["winner"]: wins[row["bucket"]][row["winner"]] += 1
+    return {bucket: counter.most_common(1)[0][0] for bucket, counter in wins.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m scheduler.tune", description="求解档位调优")
+    parser.add_argument("input", nargs="?", default="-", help="基准实例 NDJSON，缺省为 stdin")
+    parser.add_argument("--profiles", default=",".join(SOLVER_PROFILES), help="参与比较的档位，逗号分隔")
+    parser.add_argument("--time-limit", type=float, default=None, help="统一的单次时间上限，缺省用各档位设定")
+    parser.add_argument("-o", "--output", default=TUNING_FILE, help="调优表输出路径")
+    args = parser.parse_args(argv)
+
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    unknown = [p for p in profiles if p not in SOLVER_PROFILES]
+    if unknown: parser.error(f"未知档位: {', '.join(unknown)}")
+
+    src = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    rows = []
+    try:
+        for text in src:
+            if not text.strip(): continue
+            row = tune_instance(json.loads(text), profiles, args.time_limit)
+            rows.append(row)
+            ttb = {n: r["time_to_best"] for n, r in row["runs"].items()}
+            print(f"{row['store'] or '-'} [{row['bucket']}] 胜出: {row['winner']}  time-to-best: {ttb}", file=sys.stderr)
+    finally:
+        if src is not sys.stdin: src.close()
+
+    report = {"profiles": profiles, "rows": rows, "recommend": recommend(rows)}
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        # json 不认 inf，未达到最优的记为 null
+        json.dump(_finite(report), f, ensure_ascii=False, indent=2)
+    print(json.dumps(report["recommend"], ensure_ascii=False))
+    return 0
+
+
+def _finite(obj):
+    if isinstance(obj, float) and math.isinf(obj): return None
+    if isinstance(obj, dict): return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, list): return [_finite(v) for v in obj]
+    return obj
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,26 @@
+"""测试公用：结果缓存 / 调优表 / 任务库 / 运行日志 / 排班历史都指到临时目录，不碰本机 ~/.cache。"""
+import os
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="schedule-ai-tests-")
+os.environ.setdefault("SCHEDULE_AI_CACHE_DIR", os.path.join(_TMP, "solutions"))
+os.environ.setdefault("SCHEDULE_AI_TUNING_FILE", os.path.join(_TMP, "tuning.json"))
+os.environ.setdefault("SCHEDULE_AI_JOBS_DB", os.path.join(_TMP, "jobs.sqlite3"))
+os.environ.setdefault("SCHEDULE_AI_RUN_LOG", os.path.join(_TMP, "runs.jsonl"))
+os.environ.setdefault("SCHEDULE_AI_HISTORY_DB", os.path.join(_TMP, "history.sqlite3"))
+
+import pytest  # noqa: E402
+
+from scheduler.bench import generate  # noqa: E402
+
+
+@pytest.fixture
+def small_spec():
+    """8 人 × 7 天、三个工作班次，带少量活动和个人需求，零点几秒解到最优。"""
+    return generate(8, 7, seed=1)
+
+
+@pytest.fixture
+def plain_spec():
+    """没有活动和个人需求的 8 人 × 7 天。"""
+    return generate(8, 7, seed=1, activity_density=0, preference_density=0)
@@ -0,0 +1,38 @@
+import numpy as np
+
+from scheduler.aggregate import equivalent_groups, expand, worth_aggregating
+from scheduler.audit import failures
+from scheduler.bench import generate
+from scheduler.engine import normalize_spec, solve
+
+
+def test_identical_employees_share_a_group(plain_spec):
+    name = plain_spec["employees"][3]
+    plain_spec["preferences"] = [{"姓名": name, "拒绝班次(强)": "晚班"}]
+    ns = normalize_spec(plain_spec)
+    groups = equivalent_groups(ns)
+    assert sorted(map(len, groups)) == [1, 7] and [3] in groups
+    # 有热启动提示的员工各自单独成组
+    assert len(equivalent_groups(ns, [(0, 0, 0), (1, 0, 0)])) == 4
+    assert not worth_aggregating(groups)
+
+
+def test_expand_reproduces_group_counts(plain_spec):
+    ns = normalize_spec(plain_spec)
+    groups = equivalent_groups(ns)
+    D, S = ns["num_days"], len(ns["shifts"])
+    counts = np.zeros((1, D, S), dtype=np.int64)
+    counts[0, :, :3] = 2
+    counts[0, :, ns["off_idx"]] = 2
+    arr = expand(ns, groups, counts)
+    for d in range(D):
+        assert np.bincount(arr[:, d], minlength=S).tolist() == counts[0, d].tolist()
+
+
+def test_solve_with_aggregate_warm_start():
+    spec = generate(40, 7, seed=5, activity_density=0.2, preference_density=0.1)
+    result = solve(spec, time_limit=20, profile="fast", aggregate=True)
+    info = result["aggregate"]
+    assert info["groups"] < 40 and info["status"] in ("OPTIMAL", "FEASIBLE")
+    assert result["matrix"] is not None
+    assert not [r for r in failures(result["audit"]) if r["check"] in ("baseline", "rest", "activity")]
@@ -0,0 +1,38 @@
+import numpy as np
+
+from scheduler.alternatives import default_min_diff, solve_alternatives
+from scheduler.audit import failures, schedule_array
+from scheduler.engine import matrix_to_hint, normalize_spec, solve
+
+
+def test_alternatives_differ_by_min_diff(small_spec):
+    ns = normalize_spec(small_spec)
+    assert default_min_diff(ns) == 3
+    results = solve_alternatives(small_spec, k=3, min_diff=6, time_limit=5, profile="fast")
+    assert [r["alternative"] for r in results] == [1, 2, 3]
+    arrs = [schedule_array(ns, r["matrix"]) for r in results]
+    for i in range(len(arrs)):
+        for j in range(i):
+            assert (arrs[i] != arrs[j]).sum() >= 6
+    assert all(r["distance"] >= 6 for r in results[1:])
+    # 后面的方案是在多样性约束下求的，罚分不会比第一个更低
+    assert all(r["objective"] >= results[0]["objective"] for r in results[1:])
+    assert all(not [f for f in failures(r["audit"]) if f["check"] in ("baseline", "rest")] for r in results)
+    assert np.array_equal(arrs[0], schedule_array(ns, results[0]["matrix"]))
+
+
+def test_later_alternatives_keep_hint_and_objective_mode(small_spec):
+    ns = normalize_spec(small_spec)
+    base = solve(small_spec, time_limit=5, profile="fast")
+    hint = matrix_to_hint(ns, base["matrix"])
+    results = solve_alternatives(small_spec, k=2, min_diff=6, time_limit=5, profile="fast", hint=hint,
+                                 objective="lexicographic")
+    assert len(results) == 2
+    second = results[1]
+    assert second["objective_mode"] == "lexicographic" and second["stages"]
+    assert second["bound"] is None and second["gap"] is None
+    # 热启动的稳定性惩罚照样算在后面的方案里：被迫改动的格子都记成罚分
+    cells = len(ns["employees"]) * ns["num_days"]
+    assert second["hint"]["cells"] == cells and second["hint"]["kept"] <= cells - 6
+    stability = {p["family"]: p["value"] for p in second["stats"]["penalties"]}.get("stability")
+    assert stability == second["hint"]["cells"] - second["hint"]["kept"]
@@ -0,0 +1,47 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("streamlit.testing.v1")
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+from scheduler.engine import FAMILY_LABELS, PENALTY_FAMILIES  # noqa: E402
+from scheduler.jobs import ACTIVE, JobQueue  # noqa: E402
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def test_page_submits_job_and_collects_result():
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    assert not at.exception
+    assert at.session_state.solve_job is None and at.session_state.result_df is None
+    next(n for n in at.number_input if n.label == "时间上限(秒)").set_value(3).run()
+    next(b for b in at.button if b.label.startswith("🚀")).click().run()
+    assert not at.exception
+    job_id = at.query_params["job"]
+    job_id = job_id[0] if isinstance(job_id, list) else job_id
+    assert at.session_state.solve_job["id"] == job_id
+    # 运算中整页只渲染进度卡片，结果区还没有内容
+    assert at.session_state.result_df is None
+
+    queue = JobQueue(path=os.environ["SCHEDULE_AI_JOBS_DB"])
+    deadline = time.monotonic() + 60
+    while queue.get(job_id)["status"] in ACTIVE and time.monotonic() < deadline: time.sleep(0.2)
+    assert queue.get(job_id)["status"] == "done"
+    # 任务结束后的那次整页重跑取回结果、清掉任务
+    at.run()
+    assert not at.exception
+    assert at.session_state.solve_job is None and at.session_state.result_df is not None
+    assert any(b.label.startswith("📌") for b in at.button)
+
+
+def test_weight_list_follows_penalty_families():
+    at = AppTest.from_file(APP, default_timeout=60)
+    at.run()
+    text = next(m.value for m in at.markdown if "硬约束" in m.value)
+    lines = text.splitlines()
+    assert [line.split(".", 1)[0] for line in lines] == [str(i) for i in range(1, len(lines) + 1)]
+    for family, weight in PENALTY_FAMILIES:
+        assert f"**{FAMILY_LABELS[family]}** ({weight:,})" in text
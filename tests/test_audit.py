@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from scheduler.audit import CHECKS, audit, failures, max_runs, render_html, schedule_array, shift_counts, shift_names
+from scheduler.bench import generate
+from scheduler.engine import normalize_spec
+
+
+def loop_audit(ns, arr):
+    """逐人逐天的参考实现：只输出 error 记录的 (check, employee, day, shift) 集合，用来对照向量化的审计。"""
+    E, D = arr.shape
+    shifts, off = ns["shifts"], ns["off_idx"]
+    out = set()
+    for a in ns["activities"]:
+        if sum(arr[e, a["day"]] == a["shift"] for e in range(E)) < a["req"]:
+            out.add(("activity", None, a["day"], shifts[a["shift"]]))
+    for d in range(D):
+        for s, v in ns["min_staff"].items():
+            if v > 0 and sum(arr[e, d] == s for e in range(E)) < v:
+                out.add(("baseline", None, d, shifts[s]))
+    for e in range(E):
+        name = ns["employees"][e]
+        if sum(arr[e, d] == off for d in range(D)) != ns["rest_targets"][e]:
+            out.add(("rest", name, None, None))
+        for d in ns["req_off"].get(e, []):
+            if arr[e, d] != off: out.add(("req_off", name, d, shifts[arr[e, d]]))
+        run, best = ns["history_run"][e], 0
+        for d in range(D):
+            run = run + 1 if arr[e, d] != off else 0
+            best = max(best, run)
+        if best > ns["max_consecutive"]: out.add(("consecutive", name, None, None))
+        if ns["no_night_to_day"]:
+            prev_night = ns["last_shift"][e] == shifts[ns["night_idx"]]
+            for d in range(D):
+                if prev_night and arr[e, d] == ns["day_idx"]:
+                    out.add(("fatigue", name, d - 1, shifts[ns["night_idx"]]))
+                prev_night = arr[e, d] == ns["night_idx"]
+    return out
+
+
+@pytest.mark.parametrize("seed", range(12))
+def test_vectorized_audit_matches_loop_reference(seed):
+    spec = generate(15, 14, seed=seed, activity_density=0.4, preference_density=0.6)
+    spec["history"] = {spec["employees"][0]: ["早班"] * 5, spec["employees"][1]: ["中班"] * 8,
+                       spec["employees"][2]: ["晚班"]}
+    ns = normalize_spec(spec)
+    arr = np.random.default_rng(seed).integers(0, len(ns["shifts"]), size=(15, 14)).astype(np.int16)
+    got = {(r["check"], r["employee"], r["day"], r["shift"]) for r in failures(audit(ns, arr))
+           if r["check"] not in ("daily_balance", "period_balance")}
+    assert got == loop_audit(ns, arr)
+
+
+def test_balance_checks_use_prior_counts(plain_spec):
+    ns = normalize_spec(plain_spec)
+    arr = np.full((8, 7), ns["off_idx"], dtype=np.int16)
+    arr[:, :6] = np.arange(8)[:, None] % 3
+    early = ns["shifts"][0]
+    rec = {r["shift"]: r for r in audit(ns, arr) if r["check"] == "period_balance"}
+    assert rec[early]["actual"] == 6
+    ns2 = normalize_spec({**plain_spec, "prior_counts": {n: {early: 6} for n in plain_spec["employees"][1:]}})
+    rec2 = {r["shift"]: r for r in audit(ns2, arr) if r["check"] == "period_balance"}
+    assert rec2[early]["actual"] == 6 and rec2[early]["severity"] == "error"
+
+
+def test_max_runs_with_history_carry():
+    work = np.array([[1, 1, 0, 1, 1, 1], [0, 0, 0, 0, 0, 0], [1, 1, 1, 1, 1, 1]], dtype=bool)
+    assert max_runs(work).tolist() == [3, 0, 6]
+    # 历史连班只接到本期开头的连续段上，本期第一天就休息的不算
+    assert max_runs(work, [4, 9, 1]).tolist() == [6, 0, 7]
+    assert max_runs(work[:, :0]).tolist() == [0, 0, 0]
+
+
+def test_array_and_name_matrix_round_trip(small_spec):
+    ns = normalize_spec(small_spec)
+    arr = np.random.default_rng(0).integers(0, len(ns["shifts"]), size=(8, 7)).astype(np.int16)
+    names = shift_names(ns, arr)
+    assert (schedule_array(ns, names) == arr).all()
+    per_emp, per_day = shift_counts(ns, arr)
+    assert per_emp.sum(axis=1).tolist() == [7] * 8 and per_day.sum(axis=1).tolist() == [8] * 7
+    assert audit(ns, names) == audit(ns, arr)
+
+
+def test_render_html_groups_records_by_check(small_spec):
+    ns = normalize_spec(small_spec)
+    arr = np.zeros((8, 7), dtype=np.int16)
+    logs = render_html(ns, audit(ns, arr))
+    headers = [line for line in logs if "log-header" in line]
+    # 没有时段需求 / 周末补休目标时不显示对应的一节
+    shown = [title for check, title in CHECKS if check not in ("coverage", "weekend_relief")]
+    assert [h.split(">")[1].split("<")[0] for h in headers] == shown
+    assert any("log-err" in line for line in logs)
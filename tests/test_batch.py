@@ -0,0 +1,40 @@
+import io
+import json
+
+from openpyxl import load_workbook
+
+from scheduler.batch import main, run_batch
+from scheduler.bench import generate
+
+
+def _ndjson(*specs):
+    return "".join(json.dumps(s, ensure_ascii=False) + "\n" for s in specs)
+
+
+def test_run_batch_streams_one_result_per_line(tmp_path):
+    a, b = generate(8, 7, seed=1), generate(6, 7, seed=2)
+    src = io.StringIO(_ndjson(a) + "\n" + "{不是 JSON\n" + _ndjson(b))
+    out = io.StringIO()
+    failed = run_batch(src, out, jobs=1, time_limit=10, cache_dir=str(tmp_path / "cache"),
+                       run_log=str(tmp_path / "runs.jsonl"), xlsx=str(tmp_path / "all.xlsx"))
+    rows = {r["line"]: r for r in map(json.loads, out.getvalue().splitlines())}
+    assert failed == 1
+    assert set(rows) == {1, 3, 4}
+    assert rows[3]["status"] == "ERROR" and "JSONDecodeError" in rows[3]["error"]
+    assert rows[1]["store"] == a["store"] and len(rows[1]["matrix"]) == 8
+    assert rows[4]["status"] in ("OPTIMAL", "FEASIBLE")
+    assert len((tmp_path / "runs.jsonl").read_text(encoding="utf-8").splitlines()) == 2
+    assert len(load_workbook(tmp_path / "all.xlsx", read_only=True).sheetnames) == 2
+    # 同一批再跑一遍全部命中缓存
+    again = io.StringIO()
+    run_batch(io.StringIO(_ndjson(a, b)), again, jobs=1, time_limit=10, cache_dir=str(tmp_path / "cache"))
+    assert all(json.loads(line)["cached"] for line in again.getvalue().splitlines())
+
+
+def test_cli_exit_code_reflects_failures(tmp_path):
+    good = tmp_path / "good.ndjson"
+    good.write_text(_ndjson(generate(6, 7, seed=2)), encoding="utf-8")
+    assert main([str(good), "-o", str(tmp_path / "out.ndjson"), "-j", "1", "--time-limit", "10"]) == 0
+    bad = tmp_path / "bad.ndjson"
+    bad.write_text('{"employees": []}\n', encoding="utf-8")
+    assert main([str(bad), "-o", str(tmp_path / "out2.ndjson"), "-j", "1"]) == 1
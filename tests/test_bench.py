@@ -0,0 +1,52 @@
+import json
+
+from scheduler.bench import best_at, compare, generate, main, measure
+from scheduler.engine import normalize_spec
+
+
+def test_generate_is_deterministic():
+    assert generate(20, 14, seed=3) == generate(20, 14, seed=3)
+    assert generate(20, 14, seed=3) != generate(20, 14, seed=4)
+    ns = normalize_spec(generate(20, 14, n_shifts=5, seed=3))
+    assert len(ns["employees"]) == 20 and ns["num_days"] == 14 and len(ns["work_idx"]) == 5
+
+
+def test_best_at_takes_best_so_far():
+    stamps = [(0.5, 100), (2.0, 80), (6.0, 50)]
+    assert [best_at(stamps, t) for t in (0.1, 1, 5, 10)] == [None, 100, 80, 50]
+
+
+def test_measure_reports_first_solution(small_spec):
+    row = measure(small_spec, time_limit=5, profile="fast")
+    assert row["status"] == "OPTIMAL" and row["first_solution"] is not None
+    assert row["objective_at"]["5"] == row["objective"]
+
+
+def test_first_solution_includes_aggregate_time():
+    row = measure(generate(40, 7, seed=5, activity_density=0.2, preference_density=0.1), time_limit=10,
+                  profile="fast")
+    assert row["aggregate_seconds"] > 0
+    assert row["first_solution"] >= row["aggregate_seconds"] + row["build_seconds"]
+
+
+def _report(**row):
+    return {"meta": {}, "rows": [{"name": "A", "status": "OPTIMAL", "objective": 100, "objective_at": {"1": 120},
+                                  "build_seconds": 1.0, "first_solution": 0.5, "peak_rss_mb": 100, **row}]}
+
+
+def test_compare_flags_regressions_only():
+    old = _report()
+    assert compare(old, _report()) == []
+    assert compare(old, _report(build_seconds=1.05)) == []
+    found = {key for _, key, _, _ in compare(old, _report(objective=110, objective_at={"1": None}, peak_rss_mb=200))}
+    assert found == {"objective", "objective@1s", "peak_rss_mb"}
+    assert compare(old, _report(objective=None, status="INFEASIBLE")) == [("A", "status", "OPTIMAL", "INFEASIBLE")]
+
+
+def test_compare_cli_exit_code(tmp_path):
+    old, new = tmp_path / "old.json", tmp_path / "new.json"
+    old.write_text(json.dumps(_report()), encoding="utf-8")
+    new.write_text(json.dumps(_report()), encoding="utf-8")
+    assert main(["compare", str(old), str(new)]) == 0
+    new.write_text(json.dumps(_report(objective=200)), encoding="utf-8")
+    assert main(["compare", str(old), str(new)]) == 1
@@ -0,0 +1,67 @@
+from scheduler.bench import generate
+from scheduler.cache import SolutionCache, cache_key, covers
+from scheduler.engine import normalize_spec, solve
+
+
+def _budget(time_limit=5.0, gap_limit=0.0, stage_time_limit=None, no_improve_seconds=None):
+    return {"time_limit": time_limit, "stage_time_limit": stage_time_limit, "gap_limit": gap_limit,
+            "no_improve_seconds": no_improve_seconds}
+
+
+def test_cache_key_ignores_store_but_not_content(small_spec):
+    ns = normalize_spec(small_spec)
+    assert cache_key(ns) == cache_key({**ns, "store": "另一家店"})
+    assert cache_key(ns) != cache_key({**ns, "max_consecutive": ns["max_consecutive"] + 1})
+    assert cache_key(ns, profile="fast") != cache_key(ns, profile="thorough")
+
+
+def test_memory_and_disk_layers(tmp_path):
+    cache = SolutionCache(max_entries=1, cache_dir=str(tmp_path))
+    cache.put("a" * 64, {"status": "OPTIMAL", "matrix": [["早班"]]})
+    cache.put("b" * 64, {"status": "OPTIMAL", "matrix": [["休"]]})
+    assert list(cache._mem) == ["b" * 64]
+    # 挤出内存的条目从磁盘读回
+    assert cache.get("a" * 64)["matrix"] == [["早班"]]
+    assert SolutionCache(cache_dir=str(tmp_path)).get("b" * 64)["matrix"] == [["休"]]
+    assert cache.get("c" * 64) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_feasible_entries_only_cover_smaller_budgets():
+    optimal = {"status": "OPTIMAL", "budget": _budget(1.0)}
+    feasible = {"status": "FEASIBLE", "budget": _budget(5.0, gap_limit=0.01)}
+    assert covers(optimal, _budget(100.0))
+    assert covers(feasible, _budget(3.0, gap_limit=0.05))
+    assert not covers(feasible, _budget(10.0))
+    assert not covers(feasible, _budget(5.0, gap_limit=0.0))
+    assert not covers({"status": "FEASIBLE"}, _budget())
+    assert covers({"status": "FEASIBLE", "budget": _budget(no_improve_seconds=None)}, _budget(no_improve_seconds=3))
+    assert not covers({"status": "FEASIBLE", "budget": _budget(no_improve_seconds=3)}, _budget())
+
+
+def test_solve_hits_cache_and_rebuilds_audit(small_spec, tmp_path):
+    cache = SolutionCache(cache_dir=str(tmp_path))
+    first = solve(small_spec, time_limit=10, profile="fast", cache=cache)
+    again = solve({**small_spec, "store": "别的门店"}, time_limit=10, profile="fast", cache=cache)
+    assert not first["cached"] and again["cached"]
+    assert again["matrix"] == first["matrix"] and again["audit"] == first["audit"]
+    assert again["store"] == "别的门店"
+    other = solve(small_spec, time_limit=10, profile="fast", cache=cache, params={"num_search_workers": 1})
+    assert not other["cached"]
+
+
+def test_unproven_result_is_not_reused_for_a_bigger_budget(tmp_path):
+    spec = generate(40, 28, seed=3)
+    cache = SolutionCache(cache_dir=str(tmp_path))
+    # 第一个解就停：结果是 FEASIBLE，与机器快慢无关
+    kw = dict(profile="fast", cache=cache, params={"stop_after_first_solution": True})
+    assert solve(spec, time_limit=5, **kw)["status"] == "FEASIBLE"
+    assert solve(spec, time_limit=5, **kw)["cached"]
+    assert solve(spec, time_limit=3, gap_limit=0.1, **kw)["cached"]
+    assert not solve(spec, time_limit=10, **kw)["cached"]
+
+
+def test_gap_limited_optimal_is_not_reused_for_a_tighter_gap():
+    gap_optimal = {"status": "OPTIMAL", "budget": _budget(5.0, gap_limit=0.5)}
+    assert covers(gap_optimal, _budget(100.0, gap_limit=0.5))
+    assert not covers(gap_optimal, _budget(1.0))
@@ -0,0 +1,22 @@
+from scheduler.engine import find_conflicts, solve
+
+
+def test_conflict_core_is_one_overfull_day(plain_spec):
+    plain_spec["min_staff_per_shift"] = {"早班": 3, "中班": 3, "晚班": 3}
+    rows = find_conflicts(plain_spec)
+    # 8 人撑不起一天 9 人的基线：同一天三个班次的基线就足以无解，去掉任何一个都能排下
+    assert len(rows) == 3
+    assert {r["kind"] for r in rows} == {"baseline"} and len({r["day"] for r in rows}) == 1
+    assert {r["shift"] for r in rows} == {"早班", "中班", "晚班"}
+    assert all("基线 3 人" in r["message"] for r in rows)
+
+
+def test_feasible_input_has_no_conflicts(plain_spec):
+    assert find_conflicts(plain_spec) is None
+
+
+def test_precheck_failure_carries_conflict_core(plain_spec):
+    plain_spec["min_staff_per_shift"] = {"早班": 3, "中班": 3, "晚班": 3}
+    result = solve(plain_spec, time_limit=5, profile="fast")
+    assert result["status"] == "PRECHECK_FAILED"
+    assert {r["kind"] for r in result["conflicts"]} == {"baseline"}
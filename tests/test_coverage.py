@@ -0,0 +1,103 @@
+import datetime
+
+import numpy as np
+import pytest
+from ortools.sat.python import cp_model
+
+from scheduler.audit import failures, schedule_array, shift_counts
+from scheduler.coverage import (coverage_matrix, coverage_rows, demand_curves, parse_clock, parse_span, shift_slots,
+                                slot_staffing, understaffed)
+from scheduler.engine import build_model, normalize_spec, solve
+from scheduler.precheck import precheck
+
+TIMES = {"早班": "08:00-16:00", "中班": "12:00-20:00", "晚班": "16:00-24:00"}
+
+
+def test_parse_clock_and_span():
+    assert parse_clock("8:30") == 510 and parse_clock("24:00") == 1440
+    assert parse_span("22:00-06:00") == (1320, 1800)
+    assert parse_span("10:00～14:00") == (600, 840)
+    for bad in ("25:00", "8:60", "abc"):
+        with pytest.raises(ValueError):
+            parse_clock(bad)
+
+
+def test_overnight_shift_covers_next_morning():
+    slots = shift_slots({0: parse_span("22:00-06:00")}, 60)
+    assert slots[0] == list(range(22, 30))
+    C = coverage_matrix(slots, 1, 24)
+    need = np.zeros((2, 24), dtype=np.int64)
+    need[:, 2] = 1
+    need[1, 23] = 1
+    rows = coverage_rows(need, C, carry=np.zeros(24, dtype=np.int64))
+    # 第一天 02:00 只能靠上期末班，第二天 02:00 由前一天的通宵覆盖
+    assert [(r["day"], r["start"], r["cover"]) for r in rows] == [(1, 2, [[0, 0]]), (1, 23, [[1, 0]])]
+
+
+def test_equal_cover_and_demand_slots_merge_into_one_row():
+    C = coverage_matrix(shift_slots({0: (480, 960), 1: (720, 1200)}, 60), 2, 24)
+    need = np.zeros((1, 24), dtype=np.int64)
+    need[0, 8:12], need[0, 10] = 2, 3
+    need[0, 12:14] = 1
+    rows = coverage_rows(need, C, np.zeros(24, dtype=np.int64))
+    # 需求变了就另起一行，行内每个时段的缺口才一样
+    assert [(r["start"], r["end"], r["req"], r["cover"]) for r in rows] == [
+        (8, 10, 2, [[0, 0]]), (10, 11, 3, [[0, 0]]), (11, 12, 2, [[0, 0]]), (12, 14, 1, [[0, 0], [0, 1]])]
+
+
+def test_coverage_shortfall_is_penalized_per_slot(plain_spec):
+    # 两段缺口只有早班能补：10-12 两个时段，13-16 三个时段，需求高到一定会缺人
+    spec = {**plain_spec, "shift_times": TIMES, "slot_minutes": 60,
+            "min_staff_per_shift": {"早班": 2, "中班": 0, "晚班": 2},
+            "demand": [{"日期": "", "开始": "10:00", "结束": "12:00", "人数": 20},
+                       {"日期": "", "开始": "13:00", "结束": "16:00", "人数": 20}]}
+    ns = normalize_spec(spec)
+    assert [(r["start"], r["end"]) for r in ns["coverage"] if r["day"] == 0] == [(10, 12), (13, 16)]
+    arr = schedule_array(ns, solve(spec, time_limit=10, profile="fast")["matrix"])
+    # 把排班固定下来，缺口变量取到最小值，罚分就是 Σ 每个时段缺的人数
+    model, shift_vars, penalties = build_model(ns)
+    for (e, d, s), var in shift_vars.items():
+        model.Add(var == int(arr[e, d] == s))
+    solver = cp_model.CpSolver()
+    assert solver.Solve(model) == cp_model.OPTIMAL
+    early = (arr == ns["shifts"].index("早班")).sum(axis=0)
+    assert solver.Value(cp_model.LinearExpr.Sum(penalties["coverage"])) == int(((20 - early) * (2 + 3)).sum())
+
+
+def test_demand_rows_by_weekday_take_max():
+    lookup = {"2026-01-10": 5}
+    rows = [{"日期": "", "开始": "10:00", "结束": "12:00", "人数": 1}, {"日期": "周六", "时段": "11:00-13:00", "人数": 3},
+            {"日期": "2026-01-10", "时段": "23:00-01:00", "人数": 2}]
+    need = demand_curves(rows, datetime.date(2026, 1, 5), 7, 24, 60, lookup)
+    assert need[0, 10:12].tolist() == [1, 1] and need[0, 12] == 0
+    assert need[5, 10:13].tolist() == [1, 3, 3]
+    assert need[5, 23] == 2 and need[6, 0] == 2
+
+
+def _demand_spec(plain_spec, enables):
+    return {**plain_spec, "shift_times": TIMES, "min_staff_per_shift": {"早班": 2, "中班": 0, "晚班": 2},
+            "demand": [{"日期": "", "开始": "12:00", "结束": "20:00", "人数": 4}], "demand_enables_zero": enables}
+
+
+def test_zero_baseline_shift_stays_banned_by_default(plain_spec):
+    spec = _demand_spec(plain_spec, False)
+    ns = normalize_spec(spec)
+    mid = ns["shifts"].index("中班")
+    assert mid not in ns["shift_slots"] and ns["demand_shifts"] != [] and mid not in ns["demand_shifts"]
+    arr = schedule_array(ns, solve(spec, time_limit=10, profile="fast")["matrix"])
+    assert not (arr == mid).any()
+
+
+def test_demand_enables_zero_baseline_shift(plain_spec):
+    spec = _demand_spec(plain_spec, True)
+    ns = normalize_spec(spec)
+    mid = ns["shifts"].index("中班")
+    assert mid in ns["demand_shifts"]
+    assert not [i for i in precheck(ns) if i["kind"] == "uncovered_slot"]
+    result = solve(spec, time_limit=10, profile="fast")
+    arr = schedule_array(ns, result["matrix"])
+    assert (arr == mid).any()
+    _, per_day = shift_counts(ns, arr)
+    assert not understaffed(ns, per_day)
+    assert (slot_staffing(ns, per_day) >= np.asarray(ns["demand"])).all()
+    assert not [r for r in failures(result["audit"]) if r["check"] == "coverage"]
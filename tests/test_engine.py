@@ -0,0 +1,170 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from scheduler.audit import failures, schedule_array
+from scheduler.bench import generate
+from scheduler.engine import (FAMILY_WEIGHTS, LEX_TIERS, build_model, matrix_to_hint, normalize_hint, normalize_spec,
+                              solve)
+from scheduler.profiles import SOLVER_PROFILES, resolve_profile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# --- 规格归一化 ---
+def test_normalize_spec_is_idempotent(small_spec):
+    ns = normalize_spec(small_spec)
+    assert normalize_spec(ns) is ns
+    assert ns["num_days"] == 7 and len(ns["employees"]) == 8
+    assert ns["shifts"][ns["off_idx"]] == "休"
+
+
+def test_normalize_spec_survives_json_round_trip(small_spec):
+    ns = normalize_spec(small_spec)
+    again = normalize_spec(json.loads(json.dumps(small_spec, ensure_ascii=False)))
+    assert again == ns
+    # 归一化结果本身也必须能序列化 (批量 CLI 逐行输出)
+    json.dumps(ns, ensure_ascii=False)
+
+
+def test_normalize_spec_rejects_bad_input(small_spec):
+    with pytest.raises(ValueError):
+        normalize_spec({**small_spec, "employees": []})
+    with pytest.raises(ValueError):
+        normalize_spec({**small_spec, "shifts": ["早班", "晚班"]})
+
+
+def test_normalize_spec_rejects_unknown_history_shift(small_spec):
+    small_spec["history"] = {small_spec["employees"][0]: ["夜宵班"]}
+    with pytest.raises(ValueError):
+        normalize_spec(small_spec)
+
+
+def test_req_off_days_are_one_based_and_range_checked(plain_spec):
+    name = plain_spec["employees"][0]
+    plain_spec["preferences"] = [{"姓名": name, "指定休息日": "1,3,9"}]
+    ns = normalize_spec(plain_spec)
+    assert ns["req_off"] == {0: [0, 2]}
+    assert ns["req_off_ignored"] == {0: [8]}
+
+
+# --- 求解 ---
+def test_solve_returns_full_schedule(small_spec):
+    result = solve(small_spec, time_limit=10)
+    assert result["status"] == "OPTIMAL"
+    assert len(result["matrix"]) == 8 and all(len(row) == 7 for row in result["matrix"])
+    ns = normalize_spec(small_spec)
+    # 每人恰好休满目标天数
+    assert all(row.count("休") == ns["target_off_days"] for row in result["matrix"])
+    json.dumps(result, ensure_ascii=False)
+
+
+def test_warm_start_from_previous_result_is_kept(small_spec):
+    first = solve(small_spec, time_limit=10)
+    ns = normalize_spec(small_spec)
+    again = solve(small_spec, time_limit=10, hint=matrix_to_hint(ns, first["matrix"]))
+    assert again["hint"]["cells"] == 8 * 7
+    assert again["objective"] == first["objective"]
+    # 同分方案里稳定性惩罚让求解器留在旧排班上
+    assert again["hint"]["ratio"] == 1.0
+
+
+def test_normalize_hint_accepts_lists_and_dated_dicts(small_spec):
+    ns = normalize_spec(small_spec)
+    name = ns["employees"][1]
+    cells = normalize_hint(ns, {name: ["早班", "休"], "不存在的人": ["早班"],
+                                ns["employees"][2]: {ns["start_date"]: "晚班", "2099-01-01": "早班"}})
+    assert cells == [(1, 0, ns["shifts"].index("早班")), (1, 1, ns["off_idx"]), (2, 0, ns["shifts"].index("晚班"))]
+
+
+def test_stop_event_returns_current_incumbent():
+    stop = threading.Event()
+    seen = []
+
+    def on_solution(info):
+        seen.append(info)
+        stop.set()
+
+    result = solve(generate(12, 14, seed=4), time_limit=30, on_solution=on_solution, stop_event=stop)
+    assert seen and result["stopped"]
+    assert result["matrix"] is not None
+    assert result["wall_time"] < 30
+    assert [i["objective"] for i in result["incumbents"]] == sorted((i["objective"] for i in result["incumbents"]),
+                                                                    reverse=True)
+
+
+
+def test_profiles_resolve_and_reject_unknown(small_spec):
+    assert resolve_profile("fast")[0] == "fast"
+    assert resolve_profile(None)[0] in SOLVER_PROFILES
+    with pytest.raises(ValueError):
+        resolve_profile("turbo")
+    with pytest.raises(ValueError):
+        solve(small_spec, profile="turbo")
+
+
+def test_lexicographic_mode_reports_each_tier(small_spec):
+    weighted = solve(small_spec, time_limit=10, profile="fast")
+    result = solve(small_spec, time_limit=10, profile="fast", objective="lexicographic")
+    assert result["status"] == "OPTIMAL"
+    order = [LEX_TIERS.index(st["tier"]) for st in result["stages"]]
+    assert order == sorted(order) and len(order) == len(set(order))
+    # 分层的总罚分不可能低于加权口径的最优值
+    assert result["objective"] >= weighted["objective"]
+    with pytest.raises(ValueError):
+        solve(small_spec, objective="pareto")
+
+
+def test_lexicographic_warm_start_runs_in_a_clean_process():
+    # 分层 + 热启动曾偶发让 CP-SAT 断言失败、整个进程中止，放到子进程里多跑几遍
+    code = """
+from scheduler.bench import generate
+from scheduler.engine import matrix_to_hint, normalize_spec, solve
+spec = generate(8, 7, seed=1)
+ns = normalize_spec(spec)
+hint = matrix_to_hint(ns, solve(spec, time_limit=5, profile="fast")["matrix"])
+for _ in range(5):
+    assert solve(spec, time_limit=5, profile="fast", hint=hint, objective="lexicographic", aggregate=False)["matrix"]
+"""
+    env = {**os.environ, "PYTHONPATH": ROOT}
+    proc = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, timeout=120)
+    assert proc.returncode == 0, proc.stderr[-2000:]
+
+
+def test_penalty_families_have_weights():
+    assert all(FAMILY_WEIGHTS[f] > 0 for tier in LEX_TIERS for f in tier)
+    assert len({f for tier in LEX_TIERS for f in tier}) == len(FAMILY_WEIGHTS)
+
+
+def test_build_profile_lists_constraint_families(small_spec):
+    result = solve(small_spec, time_limit=10, profile="fast")
+    families = {f["family"] for f in result["build"]["families"]}
+    assert {"S0 连班", "S1 每日基线", "S2 休息模式"} <= families
+    assert result["build"]["variables"] > 0
+
+
+def test_consecutive_limit_continues_from_history(plain_spec):
+    name = plain_spec["employees"][0]
+    plain_spec["history"] = {name: ["休"] + ["早班"] * 6}
+    ns = normalize_spec(plain_spec)
+    assert ns["history_run"][0] == 6 and ns["max_consecutive"] == 6
+    result = solve(plain_spec, time_limit=10, profile="fast")
+    arr = schedule_array(ns, result["matrix"])
+    assert arr[0, 0] == ns["off_idx"]
+    assert not [r for r in failures(result["audit"]) if r["check"] == "consecutive"]
+
+
+def test_unavailable_shifts_get_no_variables(plain_spec):
+    name = plain_spec["employees"][0]
+    plain_spec["preferences"] = [{"姓名": name, "不可排班次": "晚班"}]
+    ns = normalize_spec(plain_spec)
+    night = ns["shifts"].index("晚班")
+    _, shift_vars, _ = build_model(ns)
+    assert not any((0, d, night) in shift_vars for d in range(ns["num_days"]))
+    assert all((1, d, night) in shift_vars for d in range(ns["num_days"]))
+    arr = schedule_array(ns, solve(plain_spec, time_limit=10, profile="fast")["matrix"])
+    assert not (arr[0] == night).any()
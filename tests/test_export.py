@@ -0,0 +1,45 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from scheduler.audit import schedule_array, shift_counts
+from scheduler.engine import hint_from_frame, normalize_hint, normalize_spec
+from scheduler.export import sheet_name, to_xlsx_bytes, workbook_bytes
+
+
+def _matrix(ns):
+    arr = np.random.default_rng(0).integers(0, len(ns["shifts"]), size=(len(ns["employees"]), ns["num_days"]))
+    return arr.astype(np.int16), [[ns["shifts"][s] for s in row] for row in arr]
+
+
+def test_exported_sheet_reads_back_as_hint(small_spec):
+    ns = normalize_spec(small_spec)
+    arr, matrix = _matrix(ns)
+    df = pd.read_excel(io.BytesIO(to_xlsx_bytes(ns, matrix)))
+    assert df.columns[1] == "01-05\n周一" and df.columns[-1] == "工时统计\n休息天数"
+    # 员工行之后每个班次一行当日人数
+    per_emp, per_day = shift_counts(ns, arr)
+    assert df.iloc[8:, 0].tolist() == [f"【{s}】" for s in ns["shifts"]]
+    assert df.iloc[8 + ns["off_idx"], 1:8].astype(int).tolist() == per_day[:, ns["off_idx"]].tolist()
+    assert df.iloc[:8, -1].astype(int).tolist() == per_emp[:, ns["off_idx"]].tolist()
+
+    cells = normalize_hint(ns, hint_from_frame(df.iloc[:8]))
+    back = np.full_like(arr, -1)
+    for e, d, s in cells: back[e, d] = s
+    assert (back == arr).all()
+    assert (schedule_array(ns, matrix) == arr).all()
+
+
+def test_sheet_names_are_sanitized_and_unique():
+    used = set()
+    assert sheet_name("门店/A:1", used) == "门店_A_1"
+    assert sheet_name("门店/A:1", used) == "门店_A_1(2)"
+    assert sheet_name("", used) == "排班"
+    assert len(sheet_name("x" * 40, used)) == 31
+
+
+def test_workbook_has_one_sheet_per_store(small_spec, plain_spec):
+    ns1, ns2 = normalize_spec(small_spec), normalize_spec(plain_spec)
+    data = workbook_bytes([("甲店", ns1, _matrix(ns1)[1]), ("甲店", ns2, _matrix(ns2)[1])])
+    assert list(pd.read_excel(io.BytesIO(data), sheet_name=None)) == ["甲店", "甲店(2)"]
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from scheduler.audit import audit, schedule_array, shift_names
+from scheduler.bench import generate
+from scheduler.engine import normalize_spec, solve
+from scheduler.history import ScheduleHistory, fairness_targets
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ScheduleHistory(path=str(tmp_path / "history.sqlite3"))
+
+
+def week(start="2026-01-05", end="2026-01-11"):
+    return {**generate(8, 7, seed=1, activity_density=0, preference_density=0), "start_date": start, "end_date": end,
+            "store": "甲店"}
+
+
+def weekend_heavy(ns):
+    """员工0 两个周末日都上晚班，其余人周末轮流休。"""
+    arr = np.zeros((8, 7), dtype=np.int16)
+    arr[:, 5:] = ns["off_idx"]
+    arr[0, 5:] = ns["night_idx"]
+    arr[0, 0] = ns["off_idx"]
+    return arr
+
+
+def test_publish_keeps_totals_incremental(store):
+    ns = normalize_spec(week())
+    arr = weekend_heavy(ns)
+    out = store.publish(ns, shift_names(ns, arr))
+    assert out == {"store": "甲店", "start_date": "2026-01-05", "end_date": "2026-01-11", "cells": 56, "replaced": 0}
+    night = ns["shifts"][ns["night_idx"]]
+    assert store.totals("甲店")[ns["employees"][0]][night] == (2, 2)
+    # 同一期重新发布：旧格子整段扣掉再写新的，累计量不翻倍
+    arr2 = arr.copy()
+    arr2[0, 1] = ns["night_idx"]
+    assert store.publish(ns, shift_names(ns, arr2))["replaced"] == 56
+    totals = store.totals("甲店")
+    assert totals[ns["employees"][0]][night] == (3, 2)
+    assert sum(n for per in totals.values() for n, _ in per.values()) == 56
+    assert [p["start_date"] for p in store.publishes("甲店")] == ["2026-01-05", "2026-01-05"]
+    # 重排已发布过的周期时，本期旧排班不算历史
+    assert store.totals("甲店", before="2026-01-05") == {e: {s: (0, 0) for s in per} for e, per in totals.items()}
+
+
+def test_carry_over_targets_weekend_surplus(store):
+    ns = normalize_spec(week())
+    store.publish(ns, shift_names(ns, weekend_heavy(ns)))
+    spec = week("2026-01-12", "2026-01-18")
+    extra = store.carry_over(spec)
+    first = ns["employees"][0]
+    assert extra["weekend_relief"] == {first: 1}
+    # 连班尾巴是上期末尾往回连续有排班的一段，连班天数由 normalize_spec 从末尾数
+    assert extra["history"][first] == ["休"] + ["早班"] * 4 + ["晚班"] * 2
+    assert len(extra["history"][ns["employees"][1]]) == 7
+    assert first in extra["prior_counts"] and "晚班" in extra["prior_counts"][first]
+
+    # 已手填 history 的人不覆盖
+    assert first not in store.carry_over({**spec, "history": {first: ["休"]}})["history"]
+
+    # 员工0 上期末尾连上 6 天，本期第一天必须休；每人休 2 天才有余地把另一天放到周末
+    spec.update(extra, target_off_days=2, min_staff_per_shift={"早班": 2, "中班": 1, "晚班": 2})
+    ns2 = normalize_spec(spec)
+    assert ns2["weekend_relief"] == {0: 1} and ns2["req_off"].get(0) is None
+    result = solve(spec, time_limit=10, profile="fast")
+    arr = schedule_array(ns2, result["matrix"])
+    assert arr[0, 0] == ns2["off_idx"] and (arr[0, 5:] == ns2["off_idx"]).any()
+    rec = [r for r in audit(ns2, arr) if r["check"] == "weekend_relief"]
+    assert rec and rec[0]["severity"] == "pass"
+
+
+def test_weekend_relief_shortfall_is_a_warning(plain_spec):
+    plain_spec["weekend_relief"] = {plain_spec["employees"][0]: 2}
+    ns = normalize_spec(plain_spec)
+    arr = np.zeros((8, 7), dtype=np.int16)
+    arr[:, 0] = ns["off_idx"]
+    rec = [r for r in audit(ns, arr) if r["check"] == "weekend_relief"]
+    assert [(r["severity"], r["employee"], r["actual"], r["target"]) for r in rec] == \
+        [("warn", ns["employees"][0], 0, 2)]
+
+
+def test_fairness_targets_ignore_new_staff_and_unknown_shifts():
+    ns = normalize_spec(week())
+    a, b = ns["employees"][:2]
+    totals = {a: {"晚班": (10, 4), "早班": (2, 0), "休": (4, 0)}, b: {"晚班": (2, 0), "早班": (10, 0), "休": (4, 4)}}
+    out = fairness_targets(ns, totals, {a: ["夜宵班", "晚班"], "离职的人": ["早班"]})
+    assert out["prior_counts"][a] == {"晚班": 7} and out["prior_counts"][b] == {"早班": 7}
+    assert out["history"] == {a: ["晚班"]}
+    # 周末多上 2 天，本期只有 2 个周末日，最多要求休 1 天
+    assert out["weekend_relief"] == {a: 1}
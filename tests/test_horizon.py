@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from scheduler.audit import failures, schedule_array
+from scheduler.bench import generate
+from scheduler.engine import normalize_spec
+from scheduler.horizon import solve_rolling, window_rest_targets, window_spec, windows
+
+
+def test_windows_cover_period_and_commit_in_order():
+    plan = windows(30, window=14, overlap=7)
+    assert plan[0] == (0, 14, 7) and plan[-1][1:] == (30, 30)
+    commits = [0] + [keep for _, _, keep in plan]
+    assert all(a == c for (a, _, _), c in zip(plan, commits))
+    assert all(b - a <= 14 for a, b, _ in plan)
+    assert windows(10, window=14) == [(0, 10, 10)]
+    with pytest.raises(ValueError):
+        windows(30, window=7, overlap=7)
+
+
+def test_window_rest_targets_leave_room_for_the_rest():
+    ns = normalize_spec(generate(4, 28, seed=0, activity_density=0, preference_density=0))
+    committed = np.zeros((4, 28), dtype=np.int16)
+    targets = window_rest_targets(ns, committed, 7, 14)
+    remaining = np.asarray(ns["rest_targets"])
+    assert all(0 <= t <= 7 for t in targets)
+    assert all(r - t <= 28 - 14 for r, t in zip(remaining, targets))
+    # 前 21 天一天没休，最后一个窗口能补多少补多少
+    assert window_rest_targets(ns, committed, 21, 28) == np.clip(remaining, 0, 7).tolist()
+    committed[:, 0] = ns["off_idx"]
+    assert window_rest_targets(ns, committed, 21, 28) == np.clip(remaining - 1, 0, 7).tolist()
+
+
+def test_window_history_carries_the_committed_seam():
+    spec = generate(4, 21, seed=0, activity_density=0, preference_density=0)
+    ns = normalize_spec(spec)
+    committed = np.full((4, 21), ns["off_idx"], dtype=np.int16)
+    committed[0, :7] = ns["night_idx"]
+    wspec = window_spec(ns, committed, 7, 14)
+    name = ns["employees"][0]
+    assert wspec["history"][name][-7:] == ["晚班"] * 7
+    assert normalize_spec(wspec)["history_run"][0] == 7
+    assert wspec["prior_counts"][name] == {"晚班": 7}
+    assert wspec["start_date"] == "2026-01-12" and wspec["end_date"] == "2026-01-18"
+
+
+def test_weekend_relief_share_is_carried_and_completed():
+    spec = generate(4, 28, seed=0, activity_density=0, preference_density=0)
+    name = spec["employees"][0]
+    spec["weekend_relief"] = {name: 4}
+    ns = normalize_spec(spec)
+    committed = np.zeros((4, 28), dtype=np.int16)
+    first = window_spec(ns, committed, 0, 14)["weekend_relief"][name]
+    assert 0 < first < 4
+    # 前 14 天一个周末都没休，最后一个窗口要把 4 天全补上
+    assert window_spec(ns, committed, 14, 28)["weekend_relief"][name] == 4
+
+
+def test_rolling_solve_keeps_hard_rules_across_seams():
+    spec = generate(8, 21, seed=2, activity_density=0.2, preference_density=0.3)
+    result = solve_rolling(spec, window=10, overlap=3, time_limit=10, profile="fast")
+    assert [w["status"] for w in result["windows"]] and result["matrix"] is not None
+    assert len(result["windows"]) == len(windows(21, 10, 3))
+    ns = normalize_spec(spec)
+    arr = schedule_array(ns, result["matrix"])
+    assert arr.shape == (8, 21)
+    hard = {"baseline", "rest", "activity", "consecutive", "fatigue"}
+    assert not [r for r in failures(result["audit"]) if r["check"] in hard]
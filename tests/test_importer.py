@@ -0,0 +1,78 @@
+import io
+
+from openpyxl import Workbook
+
+from scheduler.importer import import_files, read_tables, validate
+
+SHIFTS = ["早班", "中班", "晚班", "休"]
+
+
+def _xlsx(path, sheets):
+    book = Workbook()
+    book.remove(book.active)
+    for title, rows in sheets.items():
+        ws = book.create_sheet(title)
+        for row in rows: ws.append(row)
+    book.save(path)
+    return str(path)
+
+
+def test_employee_skill_and_activity_sheets(tmp_path):
+    path = _xlsx(tmp_path / "门店A.xlsx", {
+        "员工": [["员工", "指定休息日", "拒绝班次", "不可排班次", "备注"],
+                 ["张三", "1，3", "晚班", "", "x"], ["李四", "周一", "夜宵班", "中班,夜宵班", ""],
+                 ["", "2", "", "", ""], ["张三", "", "", "", ""]],
+        "技能": [["姓名", "早班", "中班", "晚班"], ["张三", "√", "是", ""], ["王五", 1, "", "1"]],
+        "活动": [["活动名称", "日期", "指定班次", "所需人数"], ["促销", "10-17 周六", "早班", 3],
+                 ["盘点", "2026-10-30", "早班", 2], ["上新", "10-18", "夜宵班", 2], ["培训", "10-19", "中班", 1.5]],
+    })
+    tables = read_tables(path)
+    assert [t["sheet"] for t in tables] == ["门店A.xlsx/员工", "门店A.xlsx/技能", "门店A.xlsx/活动"]
+    assert tables[0]["header"][:3] == ["姓名", "指定休息日", "拒绝班次(强)"]
+    assert tables[0]["row"] == [2, 3, 4, 5]
+    out = validate(tables, SHIFTS, "2026-10-12", "2026-10-25")
+    assert [s["kind"] for s in out["sheets"]] == ["employees", "availability", "activities"]
+    assert out["employees"] == ["张三", "李四"]
+    prefs = {p["姓名"]: p for p in out["preferences"]}
+    assert prefs["张三"] == {"姓名": "张三", "指定休息日": "1，3", "拒绝班次(强)": "晚班"}
+    assert prefs["李四"] == {"姓名": "李四"}
+    assert out["availability"] == {"张三": ["早班", "中班"]}
+    assert out["activities"] == [{"活动名称": "促销", "日期": "2026-10-17", "指定班次": "早班", "所需人数": 3}]
+
+    errors = {(e["sheet"].split("/")[1], e["row"], e["column"]) for e in out["errors"]}
+    assert errors == {("员工", 3, "指定休息日"), ("员工", 3, "拒绝班次(强)"), ("员工", 3, "不可排班次"),
+                      ("员工", 4, "姓名"), ("员工", 5, "姓名"), ("技能", 3, "姓名"),
+                      ("活动", 3, "日期"), ("活动", 4, "指定班次"), ("活动", 5, "所需人数")}
+
+
+def test_gbk_csv_and_unknown_table():
+    data = "姓名,可排班次\n张三,早班，晚班\n李四,\n".encode("gbk")
+    out = import_files([(io.BytesIO(data), "名单.csv"), (io.BytesIO("编号,备注\n1,x\n".encode()), "杂项.csv")], SHIFTS)
+    assert out["employees"] == ["张三", "李四"]
+    assert out["availability"] == {"张三": ["早班", "晚班"]}
+    assert [s["kind"] for s in out["sheets"]] == ["employees", None]
+    assert out["errors"][0]["sheet"] == "杂项.csv" and out["errors"][0]["row"] == 1
+
+
+def test_activity_dates_need_year_without_period():
+    data = "活动名称,日期,指定班次,所需人数\n促销,10-17,早班,3\n盘点,2026-10-17,早班,2\n".encode()
+    out = import_files([(io.BytesIO(data), "活动.csv")], SHIFTS)
+    assert [a["活动名称"] for a in out["activities"]] == ["盘点"]
+    assert out["errors"][0]["column"] == "日期" and out["errors"][0]["row"] == 2
+
+
+def test_demand_rows_and_curves(tmp_path):
+    path = _xlsx(tmp_path / "客流.xlsx", {
+        "按行": [["日期", "开始", "结束", "人数"], ["", "10:00", "14:00", 3], ["周六", "18:00", "02:00", 2],
+                 ["10-17", "9点", "", 1], ["2026-10-18", "", "", "x"]],
+        "曲线": [["日期", "10:00", "10:30", "11:00"], ["10-17", 2, "", 4], ["每天", 1, 1, 1]],
+    })
+    out = import_files([path], SHIFTS, "2026-10-12", "2026-10-25")
+    assert [s["kind"] for s in out["sheets"]] == ["demand", "demand"]
+    rows = [(d["日期"], d["时段"], d["人数"]) for d in out["demand"]]
+    assert rows[:2] == [("", "10:00-14:00", 3), ("周六", "18:00-02:00", 2)]
+    # 曲线格式按列展开，空格子跳过，最后一列沿用前一列的间隔
+    assert sorted(rows[2:]) == sorted([("2026-10-17", "10:00-10:30", 2), ("2026-10-17", "11:00-11:30", 4),
+                                       ("每天", "10:00-10:30", 1), ("每天", "10:30-11:00", 1),
+                                       ("每天", "11:00-11:30", 1)])
+    assert {(e["row"], e["column"]) for e in out["errors"]} == {(4, "时段"), (5, "时段")}
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from scheduler.bench import generate
+from scheduler.jobs import ACTIVE, JobQueue
+
+
+def wait(queue, job_id, until=("done", "failed", "cancelled"), timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in until: return job
+        time.sleep(0.1)
+    raise AssertionError(f"任务 {job_id} 超时: {job['status']}")
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(path=str(tmp_path / "jobs.sqlite3"), max_running=1, num_workers=1,
+                    cache_dir=str(tmp_path / "cache"), poll=0.05)
+
+
+def test_job_runs_in_subprocess_and_survives_new_queue(queue, small_spec):
+    job_id = queue.submit(small_spec, owner="店长A", time_limit=3, profile="fast")
+    job = wait(queue, job_id)
+    assert job["status"] == "done" and job["error"] is None
+    assert job["result"]["status"] in ("OPTIMAL", "FEASIBLE") and len(job["result"]["matrix"]) == 8
+    # 页面刷新 / 换进程后凭任务号取回
+    again = JobQueue(path=queue.path, max_running=1).get(job_id)
+    assert again["result"] == job["result"] and again["owner"] == "店长A"
+    assert [j["id"] for j in queue.list(owner="店长A")] == [job_id]
+    assert queue.get("nope") is None
+    with pytest.raises(ValueError):
+        queue.submit(small_spec, mode="magic")
+
+
+def test_queued_job_can_be_cancelled_and_running_job_stopped(queue):
+    first = queue.submit(generate(30, 14, seed=4), time_limit=60, profile="fast", aggregate=False)
+    second = queue.submit(generate(8, 7, seed=1), time_limit=3, profile="fast")
+    job = wait(queue, first, until=("running",))
+    assert queue.get(second)["status"] == "queued" and queue.get(second)["position"] == 0
+    assert queue.cancel(second) and queue.get(second)["status"] == "cancelled"
+    # 等到有了第一个解再要求收尾，已找到的方案照常保存
+    deadline = time.monotonic() + 30
+    while not queue.get(first)["solutions"] and time.monotonic() < deadline: time.sleep(0.1)
+    assert queue.stop(first)
+    job = wait(queue, first)
+    assert job["status"] == "done" and job["result"]["stopped"] and job["result"]["matrix"] is not None
+    assert not queue.stop(first) and not queue.cancel(first)
+
+
+def test_alternatives_mode_returns_every_plan(queue, small_spec):
+    job = wait(queue, queue.submit(small_spec, mode="alternatives", k=2, time_limit=2, profile="fast"))
+    assert [a["alternative"] for a in job["alternatives"]] == [1, 2]
+    assert job["result"] == job["alternatives"][0]
+
+
+def test_cached_solve_is_done_on_submit_without_a_subprocess(queue, small_spec):
+    first = wait(queue, queue.submit(small_spec, time_limit=3, profile="fast"))
+    assert first["status"] == "done" and not first["result"]["cached"]
+    # 子进程写了磁盘缓存；提交方进程查到后记在自己的内存 LRU 里，之后连磁盘都不用读
+    again = queue.get(queue.submit(small_spec, time_limit=3, profile="fast"))
+    assert again["status"] == "done" and again["pid"] is None and again["result"]["cached"]
+    assert again["result"]["matrix"] == first["result"]["matrix"]
+    assert len(queue.cache._mem) == 1
+    # 多方案每次都要真正求解，照常排队
+    job_id = queue.submit(small_spec, mode="alternatives", k=2, time_limit=3, profile="fast")
+    assert queue.get(job_id)["status"] in ACTIVE
+    wait(queue, job_id)
@@ -0,0 +1,33 @@
+from scheduler.engine import normalize_spec, solve
+from scheduler.precheck import errors, precheck
+
+
+def test_generated_spec_passes_precheck(small_spec):
+    assert not errors(precheck(normalize_spec(small_spec)))
+
+
+def test_day_capacity_is_reported_per_day(plain_spec):
+    plain_spec["min_staff_per_shift"] = {"早班": 3, "中班": 3, "晚班": 3}
+    issues = errors(precheck(normalize_spec(plain_spec)))
+    assert [i["day"] for i in issues if i["kind"] == "day_capacity"] == list(range(7))
+    assert any(i["kind"] == "period_capacity" for i in issues)
+
+
+def test_activity_on_banned_shift_is_an_error(plain_spec):
+    plain_spec["min_staff_per_shift"] = {"早班": 2, "中班": 0, "晚班": 2}
+    plain_spec["activities"] = [{"活动名称": "促销", "日期": plain_spec["start_date"], "指定班次": "中班", "所需人数": 2}]
+    issues = errors(precheck(normalize_spec(plain_spec)))
+    assert [(i["kind"], i["day"], i["shift"]) for i in issues] == [("banned_activity", 0, "中班")]
+
+
+def test_rest_target_longer_than_period(plain_spec):
+    plain_spec["target_off_days"] = 8
+    assert [i["kind"] for i in errors(precheck(normalize_spec(plain_spec)))] == ["rest"]
+
+
+def test_solve_stops_at_precheck_and_explains(plain_spec):
+    plain_spec["min_staff_per_shift"] = {"早班": 3, "中班": 3, "晚班": 3}
+    result = solve(plain_spec, time_limit=5, profile="fast")
+    assert result["status"] == "PRECHECK_FAILED" and result["matrix"] is None
+    assert errors(result["precheck"])
+
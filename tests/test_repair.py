@@ -0,0 +1,70 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from scheduler.audit import failures, schedule_array
+from scheduler.bench import generate
+from scheduler.engine import matrix_to_hint, normalize_spec, solve
+from scheduler.repair import repair, seam_faults
+
+HARD = {"baseline", "rest", "activity", "req_off"}
+
+
+def iso(ns, d):
+    return (datetime.date.fromisoformat(ns["start_date"]) + datetime.timedelta(days=int(d))).isoformat()
+
+
+@pytest.fixture(scope="module")
+def published():
+    spec = generate(8, 14, seed=3, activity_density=0.1, preference_density=0.2)
+    return spec, solve(spec, time_limit=10, profile="fast")["matrix"]
+
+
+def run_repair(spec, matrix, **kw):
+    return repair(spec, matrix_to_hint(normalize_spec(spec), matrix), **kw)
+
+
+def test_unchanged_schedule_is_returned_as_is(published):
+    spec, matrix = published
+    result = run_repair(spec, matrix)
+    assert result["rounds"] == [] and result["changes"] == []
+    assert result["matrix"] == matrix
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_absence_repair_never_worsens_the_audit(published, seed):
+    spec, matrix = published
+    ns = normalize_spec(spec)
+    pub = schedule_array(ns, matrix)
+    work = np.argwhere(pub != ns["off_idx"])
+    e, d = work[np.random.default_rng(seed).integers(len(work))]
+    name = ns["employees"][e]
+    result = run_repair(spec, matrix, absences={name: [iso(ns, d)]}, time_limit=2.0)
+    assert result["matrix"] is not None
+    arr = schedule_array(ns, result["matrix"])
+    assert arr[e, d] == ns["off_idx"]
+    leave = [c for c in result["changes"] if c["reason"] == "请假"]
+    assert [(c["employee"], c["day"]) for c in leave] == [(name, d)]
+
+    # 不比发布版 (请假格子排休) 多出晚转早 / 连班违规；请假补了休息额度，硬约束照常满足
+    filled = pub.copy()
+    filled[e, d] = ns["off_idx"]
+    before, after = seam_faults(ns, filled), seam_faults(ns, arr)
+    assert all(v <= before.get(k, 0) for k, v in after.items())
+    assert not [r for r in failures(result["audit"]) if r["check"] in HARD]
+    # 被改动的格子都在最后一轮放开的邻域里
+    last = result["rounds"][-1]
+    assert all(last["start"] <= c["day"] < last["end"] for c in result["changes"])
+
+
+def test_new_activity_row_is_staffed(published):
+    spec, matrix = published
+    spec = {**spec, "activities": spec["activities"] + [
+        {"活动名称": "临时促销", "日期": spec["start_date"], "指定班次": "中班", "所需人数": 4}]}
+    ns = normalize_spec(spec)
+    result = run_repair(spec, matrix, time_limit=2.0)
+    assert result["rounds"] and result["rounds"][0]["start"] == 0
+    arr = schedule_array(ns, result["matrix"])
+    assert (arr[:, 0] == ns["shifts"].index("中班")).sum() >= 4
+    assert result["changes"] and all(c["reason"] == "调整" for c in result["changes"])
@@ -0,0 +1,26 @@
+import json
+
+from scheduler.engine import normalize_spec, solve
+from scheduler.runlog import append, phase_record, run_record
+
+
+def test_run_record_merges_phases_and_appends(small_spec, tmp_path):
+    ns = normalize_spec(small_spec)
+    result = solve(small_spec, time_limit=5, profile="fast")
+    rec = run_record(ns, result, phases={"table": 0.25})
+    assert {"parse", "build", "solve", "audit"} <= set(rec["phases"]) and rec["phases"]["table"] == 0.25
+    assert rec["status"] == result["status"] and rec["model"]["variables"] == result["build"]["variables"]
+    # 各惩罚族加权罚分加起来就是目标值 (稳定性惩罚没有热启动时为 0)
+    assert sum(p["weighted"] for p in rec["penalties"]) == result["objective"]
+
+    path = tmp_path / "logs" / "runs.jsonl"
+    assert append(rec, str(path)) and append(phase_record(ns, {"export": 0.1}), str(path))
+    lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+    assert [line["phases"].get("export") for line in lines] == [None, 0.1]
+    assert lines[0]["store"] == ns["store"]
+
+
+def test_append_failure_is_swallowed(tmp_path):
+    blocker = tmp_path / "file"
+    blocker.write_text("x")
+    assert append({"a": 1}, str(blocker / "runs.jsonl")) is False
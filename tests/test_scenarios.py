@@ -0,0 +1,29 @@
+import pytest
+
+from scheduler.engine import normalize_spec, solve
+from scheduler.scenarios import run_scenarios, scenario_ns
+
+
+def test_scenario_ns_only_adjusts_positive_baselines(plain_spec):
+    ns = normalize_spec(plain_spec)
+    out = scenario_ns(ns, {"max_consecutive": 5, "min_staff_per_shift": {"早班": 3}})
+    assert out["max_consecutive"] == 5 and out["min_staff"][ns["shifts"].index("早班")] == 3
+    assert ns["max_consecutive"] == 6
+    with pytest.raises(ValueError):
+        scenario_ns(ns, {"min_staff_per_shift": {"休": 1}})
+    with pytest.raises(ValueError):
+        scenario_ns(ns, {"max_consecutive": 0})
+
+
+def test_scenarios_match_standalone_solves(plain_spec):
+    scenarios = [{"name": "当前设置"}, {"name": "连班4天", "max_consecutive": 4},
+                 {"name": "早班加人", "min_staff_per_shift": {"早班": 3}}]
+    rows = run_scenarios(plain_spec, scenarios, time_limit=10, jobs=2)
+    assert [r["name"] for r in rows] == [sc["name"] for sc in scenarios]
+    # 3 + 2 + 2 人 × 7 天超过 8 人各休 1 天后的人力，不求解
+    assert rows[2]["status"] == "PRECHECK_FAILED" and rows[2]["matrix"] is None
+    assert [r["status"] for r in rows[:2]] == ["OPTIMAL", "OPTIMAL"]
+    # 共用一个带旋钮的模型，每个场景的最优值与单独改 spec 求解一致
+    alone = solve({**plain_spec, "max_consecutive": 4}, time_limit=10, profile="fast", aggregate=False)
+    assert rows[1]["objective"] == pytest.approx(alone["objective"])
+    assert rows[1]["objective"] > rows[0]["objective"] and rows[1]["failures"] > 0
@@ -0,0 +1,52 @@
+import json
+import math
+import os
+
+from scheduler.bench import generate
+from scheduler.engine import normalize_spec
+from scheduler.profiles import resolve_profile, size_bucket
+from scheduler.tune import main, recommend, time_to_best, tune_instance
+
+
+def test_time_to_best_takes_first_incumbent_reaching_best():
+    incumbents = [{"objective": 300, "wall_time": 0.1}, {"objective": 120, "wall_time": 0.4},
+                  {"objective": 100, "wall_time": 0.9}]
+    assert time_to_best(incumbents, 120) == 0.4
+    assert time_to_best(incumbents, 100) == 0.9
+    assert time_to_best(incumbents, 50) == math.inf
+    # 分组计数模型先用掉的时间算在里面
+    assert time_to_best(incumbents, 120, offset=1.5) == 1.9
+    assert time_to_best(incumbents, 50, offset=1.5) == math.inf
+
+
+def test_tune_instance_counts_aggregate_time():
+    spec = generate(40, 7, seed=5, activity_density=0.2, preference_density=0.1)
+    row = tune_instance(spec, ["fast"], time_limit=10)
+    run = row["runs"]["fast"]
+    assert run["aggregate_seconds"] > 0
+    assert run["time_to_best"] >= run["aggregate_seconds"]
+
+
+def test_recommend_counts_wins_per_bucket():
+    rows = [{"bucket": "≤1k", "winner": "fast"}, {"bucket": "≤1k", "winner": "fast"},
+            {"bucket": "≤1k", "winner": "balanced"}, {"bucket": "≤10k", "winner": None}]
+    assert recommend(rows) == {"≤1k": "fast"}
+
+
+def test_tune_instance_compares_profiles(small_spec):
+    row = tune_instance(small_spec, ["fast", "balanced"], time_limit=5)
+    assert set(row["runs"]) == {"fast", "balanced"} and row["winner"] in row["runs"]
+    assert row["best_objective"] == min(r["objective"] for r in row["runs"].values())
+    assert row["runs"][row["winner"]]["time_to_best"] < math.inf
+
+
+def test_auto_profile_follows_tuning_table(small_spec, tmp_path):
+    src = tmp_path / "instances.ndjson"
+    src.write_text(json.dumps(small_spec, ensure_ascii=False) + "\n", encoding="utf-8")
+    out = os.environ["SCHEDULE_AI_TUNING_FILE"]
+    assert main([str(src), "--profiles", "fast,balanced", "--time-limit", "5", "-o", out]) == 0
+    with open(out, encoding="utf-8") as f:
+        report = json.load(f)
+    ns = normalize_spec(small_spec)
+    winner = report["recommend"][size_bucket(ns)]
+    assert resolve_profile("auto", ns)[0] == winner